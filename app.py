@@ -7,37 +7,148 @@ XML Sentence Split Converter - Streamlit Webアプリケーション
 
 import streamlit as st
 import tempfile
-import shutil
+import time
+import uuid
 from pathlib import Path
-from datetime import datetime
-import zipfile
-import io
 
 # 既存のモジュールをインポート
-from xml_converter import convert_xml, process_folder
-from xml_content_validator_v2 import extract_values_from_xml_structure, compare_value_lists
+from xml_converter import ConsoleReporter
+from xml_result_cache import ResultCache
+from xml_batch_job import BatchJob, STATUS_MARKS, STATUS_PASSED, STATUS_DIFFERENT, convert_upload_bytes, diff_count
+from xml_content_validator_v2 import DIFFERENCE_KINDS, find_differences
+from xml_worker_pool import SharedWorkerPool
+from xml_preview import LineIndex
 
-# XMLプレビューの最大表示行数
-MAX_PREVIEW_LINES = 1000
-PREVIEW_HEAD_LINES = 500  # 最初に表示する行数
-PREVIEW_TAIL_LINES = 500  # 最後に表示する行数
+# 差異の一覧の1ページの件数
+DIFF_PAGE_ROWS = 100
 
-def truncate_xml_preview(xml_content, max_lines=MAX_PREVIEW_LINES, head_lines=PREVIEW_HEAD_LINES, tail_lines=PREVIEW_TAIL_LINES):
-    """XMLコンテンツをプレビュー用に切り詰める"""
-    lines = xml_content.split('\n')
-    total_lines = len(lines)
-    
-    if total_lines <= max_lines:
-        # 行数が少ない場合はそのまま返す
-        return xml_content, total_lines
-    
-    # 最初のN行と最後のM行を取得
-    head_part = '\n'.join(lines[:head_lines])
-    tail_part = '\n'.join(lines[-tail_lines:])
-    
-    truncated_content = f"{head_part}\n\n... （{total_lines - head_lines - tail_lines} 行を省略） ...\n\n{tail_part}"
+# XMLプレビューの1ページの行数と、行オフセット索引を保持するファイル数の上限（全セッション合計）
+PREVIEW_PAGE_LINES = 500
+PREVIEW_INDEX_ENTRIES = 8
+
+# 変換結果キャッシュ（サーバープロセスで共有。小さい結果はメモリに、大きい結果はファイルに保存）
+RESULT_CACHE_PATH = Path(tempfile.gettempdir()) / "xml_sentence_split_converter" / "result_cache.sqlite"
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # ファイルに保存する結果の合計サイズの上限
+RESULT_CACHE_MEMORY_BYTES = 64 * 1024 * 1024  # メモリに保持する結果の合計サイズの上限
+RESULT_CACHE_MEMORY_ENTRY_BYTES = 1024 * 1024  # これ以下の結果をメモリに保持
+
+# 全セッションで共有するワーカープールのプロセス数（Noneの場合はCPU数）と、同時に実行する変換数の上限
+# （Noneの場合はプロセス数）。上限を超えた変換はセッションごとに待ち、セッションを順番に回って実行する
+WORKER_POOL_SIZE = None
+WORKER_POOL_MAX_RUNNING = None
+
+# 一括変換の実行中に完了分を取り込む間隔（秒）
+BATCH_POLL_SECONDS = 0.5
+
+# 一括変換のZIP（完了したファイルから順に書き込む）の既定の圧縮レベルと、メモリに保持するサイズの上限
+BATCH_ZIP_COMPRESSLEVEL = 6
+BATCH_ZIP_SPOOL_BYTES = 32 * 1024 * 1024
+
+@st.cache_resource(max_entries=PREVIEW_INDEX_ENTRIES)
+def get_line_index(key, _load):
+    """プレビューするテキストの行オフセット索引（key ごとに1回だけ作成し、セッション間で共有）
+
+    Args:
+        key: テキストを識別するキー（変換結果キャッシュのキー、一括変換ジョブのファイルのパスなど）
+        _load: 索引を作成する関数（キャッシュにない場合のみ呼ばれる）
+    """
+    return _load()
+
+def _jump_to_line(key, total_lines):
+    """「行番号へ移動」で指定された行を含むページを表示する"""
+    line = min(max(1, st.session_state[f"{key}_line"]), max(1, total_lines))
+    st.session_state[f"{key}_page"] = (line - 1) // PREVIEW_PAGE_LINES + 1
+
+def render_xml_preview(title, line_index, key):
+    """XMLをページ単位でプレビューする（表示するページの行だけを索引から取り出す）
+
+    key はウィジェットの状態（表示中のページ）のキーで、プレビューするファイルごとに変えます。
+    """
+    total_lines = len(line_index)
+    pages = max(1, (total_lines + PREVIEW_PAGE_LINES - 1) // PREVIEW_PAGE_LINES)
+    with st.expander(f"{title} - {total_lines:,}行", expanded=False):
+        col_page, col_line = st.columns(2)
+        with col_page:
+            page = st.number_input(f"ページ（全 {pages:,} ページ）", min_value=1, max_value=pages, step=1,
+                                   key=f"{key}_page")
+        with col_line:
+            st.number_input("行番号へ移動", min_value=1, max_value=max(1, total_lines), step=1,
+                            key=f"{key}_line", on_change=_jump_to_line, args=(key, total_lines))
+        start = (page - 1) * PREVIEW_PAGE_LINES
+        st.caption(f"{start + 1:,}〜{min(start + PREVIEW_PAGE_LINES, total_lines):,} 行目を表示")
+        st.code(line_index.lines(start, PREVIEW_PAGE_LINES), language="xml")
+
+def render_differences(result, key):
+    """検証で検出された差異を、種類と値で絞り込める表としてページ単位で表示する
+
+    表示を選んだ場合のみ、表示するページの差異だけを取り出して表にします。
+    key はウィジェットの状態のキーで、結果ごとに変えます。
+    """
+    total = diff_count(result)
+    if not st.toggle(f"🔍 差異の一覧を表示（{total:,} 件）", key=f"{key}_show"):
+        return
+    col_kind, col_query = st.columns(2)
+    with col_kind:
+        kinds = st.multiselect("種類", DIFFERENCE_KINDS, default=list(DIFFERENCE_KINDS), key=f"{key}_kinds")
+    with col_query:
+        query = st.text_input("値で絞り込み（部分一致）", key=f"{key}_query")
+    matched, _ = find_differences(result, kinds, query, count=0)
+    pages = max(1, (matched + DIFF_PAGE_ROWS - 1) // DIFF_PAGE_ROWS)
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        # 絞り込みで件数が減った場合は最後のページを表示
+        st.session_state[f"{key}_page"] = pages
+    page = st.number_input(f"ページ（全 {pages:,} ページ、{matched:,} 件）", min_value=1, max_value=pages, step=1,
+                           key=f"{key}_page")
+    start = (page - 1) * DIFF_PAGE_ROWS
+    _, rows = find_differences(result, kinds, query, start, DIFF_PAGE_ROWS)
+    st.dataframe(
+        [{
+            "種類": row["kind"],
+            "位置（ファイル1）": row["position1"],
+            "位置（ファイル2）": row["position2"],
+            "ファイル1の値": row["file1"],
+            "ファイル2の値": row["file2"],
+        } for row in rows],
+        use_container_width=True,
+        hide_index=True
+    )
+
+@st.cache_resource
+def get_result_cache():
+    """サーバープロセスの全セッションで共有する変換結果キャッシュ"""
+    return ResultCache(RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MAX_BYTES,
+                       memory_max_bytes=RESULT_CACHE_MEMORY_BYTES,
+                       memory_entry_max_bytes=RESULT_CACHE_MEMORY_ENTRY_BYTES)
+
+@st.cache_resource
+def get_worker_pool():
+    """サーバープロセスの全セッションで共有するワーカープール（初回のみ作成してワーカーを起動）"""
+    return SharedWorkerPool(max_workers=WORKER_POOL_SIZE, max_running=WORKER_POOL_MAX_RUNNING)
+
+def session_executor():
+    """このセッションから共有ワーカープールにタスクを投入するエグゼキュータ"""
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return get_worker_pool().session(st.session_state["session_id"])
+
+def convert_upload(filename, data):
+    """アップロードされたファイルを共有ワーカープールで変換・検証し、結果をキャッシュする
+
+    同じ内容・同じ名前のファイルを変換済みで、変換・抽出ロジックも変わっていなければ、
+    変換せずにキャッシュの結果を返します。
+
+    Returns:
+        (ResultCache のエントリ, キャッシュの結果かどうか)
+    """
+    cache = get_result_cache()
+    key = ResultCache.key(data, filename)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry, True
     
-    return truncated_content, total_lines
+    entry = session_executor().submit(convert_upload_bytes, filename, data).result()
+    cache.put(key, entry)
+    return entry, False
 
 # ページ設定
 st.set_page_config(
@@ -78,200 +189,20 @@ with tab1:
     
     process_button = st.button("変換実行", type="primary", use_container_width=True)
     
+    # 表示する結果のキー（ボタンを押した後の再実行でも、同じファイルがアップロードされていれば結果を表示し続ける）
+    upload_key = None
+    if uploaded_file is not None:
+        upload_key = ResultCache.key(uploaded_file.getvalue(), uploaded_file.name)
+    
     if process_button and uploaded_file is not None:
         with st.spinner("変換処理中..."):
             try:
-                # 一時ディレクトリを作成
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    
-                    # アップロードされたファイルを一時ディレクトリに保存
-                    input_path = temp_path / uploaded_file.name
-                    with open(input_path, 'wb') as f:
-                        f.write(uploaded_file.getvalue())
-                    
-                    # 出力ファイル名を生成（入力ファイル名_split.xml）
-                    input_file_path = Path(uploaded_file.name)
-                    output_filename = f"{input_file_path.stem}_split{input_file_path.suffix}"
-                    output_path = temp_path / output_filename
-                    
-                    # XML変換を実行
-                    convert_xml(input_path, output_path)
-                    
-                    # 検証を自動実行
-                    validation_result = ""
-                    validation_report_data = None
-                    validation_error = False
-                    validation_error_details = ""
-                    
-                    try:
-                        values1 = extract_values_from_xml_structure(input_path)
-                        values2 = extract_values_from_xml_structure(output_path)
-                        result = compare_value_lists(values1, values2)
-                        
-                        if result['identical']:
-                            validation_result = "✅ **検証結果: 成功**\n\nすべての値が同一です。"
-                        else:
-                            validation_error = True
-                            validation_result = "❌ **検証結果: 差異検出**\n\n"
-                            if result['missing_in_2']:
-                                validation_result += f"- ファイル2に欠落している値: {len(result['missing_in_2'])} 件\n"
-                            if result['extra_in_2']:
-                                validation_result += f"- ファイル2に追加されている値: {len(result['extra_in_2'])} 件\n"
-                            if result['order_differences']:
-                                validation_result += f"- 順序または内容の差異: {len(result['order_differences'])} 件\n"
-                            
-                            # 検証レポートを生成
-                            report_lines = []
-                            report_lines.append("# XML値比較レポート (構造無視)")
-                            report_lines.append("")
-                            report_lines.append(f"- **ファイル1**: `{uploaded_file.name}` - {len(values1)} 個の値")
-                            report_lines.append(f"- **ファイル2**: `{output_filename}` - {len(values2)} 個の値")
-                            report_lines.append(f"- **比較日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                            report_lines.append("")
-                            report_lines.append("## ❌ 検証結果: 差異検出")
-                            report_lines.append("")
-                            report_lines.append("以下の差異が見つかりました:")
-                            report_lines.append("")
-                            
-                            if result['missing_in_2']:
-                                report_lines.append(f"### 📝 ファイル2に欠落している値 ({len(result['missing_in_2'])} 件)")
-                                report_lines.append("")
-                                for i, value in enumerate(result['missing_in_2'][:50]):  # 最大50件表示
-                                    report_lines.append(f"{i+1}. `{repr(value[:200])}`")
-                                if len(result['missing_in_2']) > 50:
-                                    report_lines.append(f"**... 他 {len(result['missing_in_2']) - 50} 件**")
-                                report_lines.append("")
-                            
-                            if result['extra_in_2']:
-                                report_lines.append(f"### 📝 ファイル2に追加されている値 ({len(result['extra_in_2'])} 件)")
-                                report_lines.append("")
-                                for i, value in enumerate(result['extra_in_2'][:50]):
-                                    report_lines.append(f"{i+1}. `{repr(value[:200])}`")
-                                if len(result['extra_in_2']) > 50:
-                                    report_lines.append(f"**... 他 {len(result['extra_in_2']) - 50} 件**")
-                                report_lines.append("")
-                            
-                            if result['order_differences']:
-                                report_lines.append(f"### 🔄 順序または内容の差異 ({len(result['order_differences'])} 件)")
-                                report_lines.append("")
-                                for diff in result['order_differences'][:50]:
-                                    report_lines.append(f"**位置 {diff['position']}:**")
-                                    report_lines.append(f"- ファイル1: `{repr(diff['file1'][:200])}`")
-                                    report_lines.append(f"- ファイル2: `{repr(diff['file2'][:200])}`")
-                                    report_lines.append("")
-                                if len(result['order_differences']) > 50:
-                                    report_lines.append(f"**... 他 {len(result['order_differences']) - 50} 件**")
-                                    report_lines.append("")
-                            
-                            report_lines.append("## 📋 検証完了")
-                            report_lines.append("")
-                            report_lines.append(f"- 総差異数: {len(result['missing_in_2']) + len(result['extra_in_2']) + len(result['order_differences'])} 件")
-                            
-                            validation_report_data = '\n'.join(report_lines).encode('utf-8')
-                            
-                    except Exception as e:
-                        validation_error = True
-                        import traceback
-                        error_traceback = traceback.format_exc()
-                        validation_result = f"⚠️ **検証中にエラーが発生しました**\n\n**エラーメッセージ:** {str(e)}\n\n詳細はエラー詳細ファイルをダウンロードして確認してください。"
-                        validation_error_details = error_traceback
-                        
-                        # エラー詳細レポートを生成
-                        error_report_lines = []
-                        error_report_lines.append("# XML検証エラー詳細レポート")
-                        error_report_lines.append("")
-                        error_report_lines.append(f"- **入力ファイル**: `{uploaded_file.name}`")
-                        error_report_lines.append(f"- **出力ファイル**: `{output_filename}`")
-                        error_report_lines.append(f"- **エラー発生日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                        error_report_lines.append("")
-                        error_report_lines.append("## ❌ エラー情報")
-                        error_report_lines.append("")
-                        error_report_lines.append(f"**エラータイプ**: `{type(e).__name__}`")
-                        error_report_lines.append(f"**エラーメッセージ**: `{str(e)}`")
-                        error_report_lines.append("")
-                        error_report_lines.append("## 📋 エラー詳細（Traceback）")
-                        error_report_lines.append("")
-                        error_report_lines.append("```")
-                        error_report_lines.append(error_traceback)
-                        error_report_lines.append("```")
-                        
-                        validation_report_data = '\n'.join(error_report_lines).encode('utf-8')
-                    
-                    # 出力ファイルを読み込む
-                    with open(output_path, 'rb') as f:
-                        output_data = f.read()
-                    
-                    # XMLファイルを読み込んでプレビュー用に取得
-                    with open(input_path, 'r', encoding='utf-8') as f:
-                        input_xml_full = f.read()
-                    with open(output_path, 'r', encoding='utf-8') as f:
-                        output_xml_full = f.read()
-                    
-                    # XMLプレビュー用に切り詰め
-                    input_xml_preview, input_total_lines = truncate_xml_preview(input_xml_full)
-                    output_xml_preview, output_total_lines = truncate_xml_preview(output_xml_full)
-                    
-                    # 結果を表示
-                    st.success(f"✅ **変換完了**\n\n- 入力ファイル: {uploaded_file.name}\n- 出力ファイル: {output_filename}")
-                    
-                    # 検証結果を表示
-                    if validation_error:
-                        st.warning(validation_result)
-                    else:
-                        st.markdown(validation_result)
-                    
-                    # 検証エラーまたは差異検出の場合、エラー詳細ファイルをダウンロード可能にする
-                    if validation_error and validation_report_data:
-                        if validation_error_details:
-                            # 検証エラーの場合
-                            validation_report_filename = f"{input_file_path.stem}_validation_error.md"
-                            st.download_button(
-                                label="📄 検証エラー詳細をダウンロード",
-                                data=validation_report_data,
-                                file_name=validation_report_filename,
-                                mime="text/markdown",
-                                use_container_width=True
-                            )
-                        else:
-                            # 差異検出の場合
-                            validation_report_filename = f"{input_file_path.stem}_validation_report.md"
-                            st.download_button(
-                                label="📄 検証レポートをダウンロード",
-                                data=validation_report_data,
-                                file_name=validation_report_filename,
-                                mime="text/markdown",
-                                use_container_width=True
-                            )
-                    
-                    # XMLプレビュー
-                    col_preview1, col_preview2 = st.columns(2)
-                    
-                    with col_preview1:
-                        preview_label = f"📄 変換前のXML（プレビュー）"
-                        if input_total_lines > MAX_PREVIEW_LINES:
-                            preview_label += f" - {input_total_lines:,}行中 {PREVIEW_HEAD_LINES}+{PREVIEW_TAIL_LINES}行を表示"
-                        with st.expander(preview_label, expanded=False):
-                            st.code(input_xml_preview, language="xml")
-                    
-                    with col_preview2:
-                        preview_label = f"📄 変換後のXML（プレビュー）"
-                        if output_total_lines > MAX_PREVIEW_LINES:
-                            preview_label += f" - {output_total_lines:,}行中 {PREVIEW_HEAD_LINES}+{PREVIEW_TAIL_LINES}行を表示"
-                        with st.expander(preview_label, expanded=False):
-                            st.code(output_xml_preview, language="xml")
-                    
-                    # ダウンロードボタン
-                    st.download_button(
-                        label="変換結果をダウンロード",
-                        data=output_data,
-                        file_name=output_filename,
-                        mime="application/xml",
-                        type="primary",
-                        use_container_width=True
-                    )
-                    
+                entry, cached = convert_upload(uploaded_file.name, uploaded_file.getvalue())
+                # 再実行のたびにキャッシュから取り出さないよう、表示する結果はセッションに保持する
+                st.session_state["single_result"] = (upload_key, entry)
+                st.session_state["single_result_cached"] = cached
             except Exception as e:
+                st.session_state.pop("single_result", None)
                 st.error(f"❌ **エラーが発生しました**\n\n{str(e)}")
                 import traceback
                 with st.expander("エラー詳細"):
@@ -279,6 +210,103 @@ with tab1:
     
     elif process_button and uploaded_file is None:
         st.warning("⚠️ ファイルをアップロードしてください。")
+    
+    entry = None
+    result_key, result_entry = st.session_state.get("single_result", (None, None))
+    if upload_key is not None and result_key == upload_key:
+        entry = result_entry
+    elif result_key is not None:
+        # 別のファイルに変わった場合は、保持していた結果を手放す
+        st.session_state.pop("single_result", None)
+    
+    if entry is not None:
+        result = entry["result"]
+        input_file_path = Path(uploaded_file.name)
+        output_filename = f"{input_file_path.stem}_split{input_file_path.suffix}"
+        output_data = entry["output"]
+        
+        # 検証結果を整形
+        validation_error = False
+        if entry["error"]:
+            validation_error = True
+            error_message = entry["error"].strip().splitlines()[-1]
+            validation_result = f"⚠️ **検証中にエラーが発生しました**\n\n**エラーメッセージ:** {error_message}\n\n詳細はエラー詳細ファイルをダウンロードして確認してください。"
+        elif result['identical']:
+            validation_result = "✅ **検証結果: 成功**\n\nすべての値が同一です。"
+        else:
+            validation_error = True
+            validation_result = "❌ **検証結果: 差異検出**\n\n"
+            if result['missing_in_2']:
+                validation_result += f"- ファイル2に欠落している値: {len(result['missing_in_2'])} 件\n"
+            if result['extra_in_2']:
+                validation_result += f"- ファイル2に追加されている値: {len(result['extra_in_2'])} 件\n"
+            if result['order_differences']:
+                validation_result += f"- 順序または内容の差異: {len(result['order_differences'])} 件\n"
+        
+        # 結果を表示
+        st.success(f"✅ **変換完了**\n\n- 入力ファイル: {uploaded_file.name}\n- 出力ファイル: {output_filename}")
+        if st.session_state.get("single_result_cached"):
+            st.caption("♻️ 同じ内容のファイルの変換結果をキャッシュから表示しています")
+        
+        # 検証結果を表示
+        if validation_error:
+            st.warning(validation_result)
+        else:
+            st.markdown(validation_result)
+        
+        # 差異の一覧（表示を選んだ場合のみ作成）
+        if not result['identical'] and not entry["error"]:
+            render_differences(result, f"single_diff_{upload_key[:16]}")
+        
+        # 検証エラーまたは差異検出の場合、エラー詳細ファイルをダウンロード可能にする
+        if validation_error and entry["report"]:
+            if entry["error"]:
+                # 検証エラーの場合
+                validation_report_filename = f"{input_file_path.stem}_validation_error.md"
+                st.download_button(
+                    label="📄 検証エラー詳細をダウンロード",
+                    data=entry["report"],
+                    file_name=validation_report_filename,
+                    mime="text/markdown",
+                    use_container_width=True
+                )
+            else:
+                # 差異検出の場合
+                validation_report_filename = f"{input_file_path.stem}_validation_report.md"
+                st.download_button(
+                    label="📄 検証レポートをダウンロード",
+                    data=entry["report"],
+                    file_name=validation_report_filename,
+                    mime="text/markdown",
+                    use_container_width=True
+                )
+        
+        # XMLプレビュー
+        col_preview1, col_preview2 = st.columns(2)
+        
+        with col_preview1:
+            render_xml_preview(
+                "📄 変換前のXML（プレビュー）",
+                get_line_index(f"{upload_key}:input", lambda: LineIndex.from_bytes(uploaded_file.getvalue())),
+                f"single_input_preview_{upload_key[:16]}"
+            )
+        
+        with col_preview2:
+            render_xml_preview(
+                "📄 変換後のXML（プレビュー）",
+                get_line_index(f"{upload_key}:output", lambda: LineIndex.from_bytes(output_data)),
+                f"single_output_preview_{upload_key[:16]}"
+            )
+        
+        # ダウンロードボタン
+        st.download_button(
+            label="変換結果をダウンロード",
+            data=output_data,
+            file_name=output_filename,
+            mime="application/xml",
+            type="primary",
+            use_container_width=True
+        )
 
 with tab2:
     st.header("複数のXMLファイルを一括変換します")
@@ -290,236 +318,129 @@ with tab2:
         help="変換したいXMLファイルを複数選択してください"
     )
     
-    recursive_option = st.checkbox("再帰的検索（サブフォルダも含む）", value=False)
+    zip_compresslevel = st.select_slider(
+        "ZIPの圧縮レベル",
+        options=list(range(10)),
+        value=BATCH_ZIP_COMPRESSLEVEL,
+        help="0は無圧縮（最速）、9は最大圧縮（最小サイズ）"
+    )
     process_button_multi = st.button("一括変換実行", type="primary", use_container_width=True)
     
     if process_button_multi and uploaded_files:
-        with st.spinner("一括変換処理中..."):
-            try:
-                # 一時ディレクトリを作成
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    input_dir = temp_path / "input"
-                    output_dir = temp_path / "output"
-                    input_dir.mkdir()
-                    output_dir.mkdir()
-                    
-                    # アップロードされたファイルを一時ディレクトリにコピー
-                    uploaded_file_names = []
-                    for uploaded_file in uploaded_files:
-                        dest_path = input_dir / uploaded_file.name
-                        with open(dest_path, 'wb') as f:
-                            f.write(uploaded_file.getvalue())
-                        uploaded_file_names.append(uploaded_file.name)
-                    
-                    # 一括変換を実行
-                    process_folder(input_dir, output_dir, recursive=recursive_option)
-                    
-                    # 検証を自動実行
-                    validation_results = []
-                    validation_dir = output_dir / "validation_results"
-                    validation_dir.mkdir(exist_ok=True)
-                    
-                    for uploaded_file_name in uploaded_file_names:
-                        input_file = input_dir / uploaded_file_name
-                        output_file = output_dir / uploaded_file_name
-                        
-                        if output_file.exists():
-                            try:
-                                values1 = extract_values_from_xml_structure(input_file)
-                                values2 = extract_values_from_xml_structure(output_file)
-                                result = compare_value_lists(values1, values2)
-                                
-                                if result['identical']:
-                                    validation_results.append(f"✅ {uploaded_file_name}: 検証成功")
-                                else:
-                                    diff_count = len(result['missing_in_2']) + len(result['extra_in_2']) + len(result['order_differences'])
-                                    validation_results.append(f"❌ {uploaded_file_name}: 差異検出 ({diff_count}件)")
-                                    
-                                    # 検証レポートを生成
-                                    input_file_path = Path(uploaded_file_name)
-                                    report_lines = []
-                                    report_lines.append("# XML値比較レポート (構造無視)")
-                                    report_lines.append("")
-                                    report_lines.append(f"- **ファイル1**: `{uploaded_file_name}` - {len(values1)} 個の値")
-                                    report_lines.append(f"- **ファイル2**: `{uploaded_file_name}` - {len(values2)} 個の値")
-                                    report_lines.append(f"- **比較日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                                    report_lines.append("")
-                                    report_lines.append("## ❌ 検証結果: 差異検出")
-                                    report_lines.append("")
-                                    report_lines.append("以下の差異が見つかりました:")
-                                    report_lines.append("")
-                                    
-                                    if result['missing_in_2']:
-                                        report_lines.append(f"### 📝 ファイル2に欠落している値 ({len(result['missing_in_2'])} 件)")
-                                        report_lines.append("")
-                                        for i, value in enumerate(result['missing_in_2'][:50]):
-                                            report_lines.append(f"{i+1}. `{repr(value[:200])}`")
-                                        if len(result['missing_in_2']) > 50:
-                                            report_lines.append(f"**... 他 {len(result['missing_in_2']) - 50} 件**")
-                                        report_lines.append("")
-                                    
-                                    if result['extra_in_2']:
-                                        report_lines.append(f"### 📝 ファイル2に追加されている値 ({len(result['extra_in_2'])} 件)")
-                                        report_lines.append("")
-                                        for i, value in enumerate(result['extra_in_2'][:50]):
-                                            report_lines.append(f"{i+1}. `{repr(value[:200])}`")
-                                        if len(result['extra_in_2']) > 50:
-                                            report_lines.append(f"**... 他 {len(result['extra_in_2']) - 50} 件**")
-                                        report_lines.append("")
-                                    
-                                    if result['order_differences']:
-                                        report_lines.append(f"### 🔄 順序または内容の差異 ({len(result['order_differences'])} 件)")
-                                        report_lines.append("")
-                                        for diff in result['order_differences'][:50]:
-                                            report_lines.append(f"**位置 {diff['position']}:**")
-                                            report_lines.append(f"- ファイル1: `{repr(diff['file1'][:200])}`")
-                                            report_lines.append(f"- ファイル2: `{repr(diff['file2'][:200])}`")
-                                            report_lines.append("")
-                                        if len(result['order_differences']) > 50:
-                                            report_lines.append(f"**... 他 {len(result['order_differences']) - 50} 件**")
-                                            report_lines.append("")
-                                    
-                                    report_lines.append("## 📋 検証完了")
-                                    report_lines.append("")
-                                    report_lines.append(f"- 総差異数: {diff_count} 件")
-                                    
-                                    # 検証レポートをファイルに保存
-                                    report_filename = f"{input_file_path.stem}_validation_report.md"
-                                    report_path = validation_dir / report_filename
-                                    with open(report_path, 'w', encoding='utf-8') as f:
-                                        f.write('\n'.join(report_lines))
-                                    
-                            except Exception as e:
-                                import traceback
-                                error_traceback = traceback.format_exc()
-                                validation_results.append(f"⚠️ {uploaded_file_name}: 検証エラー - {str(e)}")
-                                
-                                # エラー詳細レポートを生成
-                                input_file_path = Path(uploaded_file_name)
-                                error_report_lines = []
-                                error_report_lines.append("# XML検証エラー詳細レポート")
-                                error_report_lines.append("")
-                                error_report_lines.append(f"- **入力ファイル**: `{uploaded_file_name}`")
-                                error_report_lines.append(f"- **出力ファイル**: `{uploaded_file_name}`")
-                                error_report_lines.append(f"- **エラー発生日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                                error_report_lines.append("")
-                                error_report_lines.append("## ❌ エラー情報")
-                                error_report_lines.append("")
-                                error_report_lines.append(f"**エラータイプ**: `{type(e).__name__}`")
-                                error_report_lines.append(f"**エラーメッセージ**: `{str(e)}`")
-                                error_report_lines.append("")
-                                error_report_lines.append("## 📋 エラー詳細（Traceback）")
-                                error_report_lines.append("")
-                                error_report_lines.append("```")
-                                error_report_lines.append(error_traceback)
-                                error_report_lines.append("```")
-                                
-                                # エラー詳細レポートをファイルに保存
-                                error_report_filename = f"{input_file_path.stem}_validation_error.md"
-                                error_report_path = validation_dir / error_report_filename
-                                with open(error_report_path, 'w', encoding='utf-8') as f:
-                                    f.write('\n'.join(error_report_lines))
-                    
-                    # ZIPファイルを作成（ファイル名を入力ファイル名_split.xml形式に変更）
-                    zip_buffer = io.BytesIO()
-                    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                        # XMLファイルを追加
-                        for file_path in output_dir.rglob("*.xml"):
-                            # 元のファイル名から出力ファイル名を生成
-                            original_filename = file_path.name
-                            # 入力ファイル名と一致するものを探す
-                            for uploaded_file_name in uploaded_file_names:
-                                if original_filename == uploaded_file_name:
-                                    # 入力ファイル名_split.xml形式に変更
-                                    input_file_path = Path(uploaded_file_name)
-                                    output_filename = f"{input_file_path.stem}_split{input_file_path.suffix}"
-                                    zipf.write(file_path, output_filename)
-                                    break
-                            else:
-                                # 一致しない場合はそのまま
-                                zipf.write(file_path, file_path.relative_to(output_dir))
-                        
-                        # 検証レポートとエラー詳細ファイルを追加
-                        for report_path in validation_dir.rglob("*.md"):
-                            zipf.write(report_path, f"validation_results/{report_path.name}")
-                    
-                    zip_buffer.seek(0)
-                    
-                    # 結果を表示
-                    st.success(f"✅ **一括変換完了**\n\n- 処理ファイル数: {len(uploaded_file_names)} 個\n- 出力フォルダ: output/")
-                    
-                    # 検証結果を表示
-                    st.markdown("**検証結果:**")
-                    for result in validation_results:
-                        if "⚠️" in result:
-                            st.warning(result)
-                        elif "❌" in result:
-                            st.error(result)
-                        else:
-                            st.markdown(f"- {result}")
-                    
-                    # 検証エラーや差異検出がある場合、ZIPに検証レポートが含まれていることを通知
-                    has_validation_issues = any("⚠️" in r or "❌" in r for r in validation_results)
-                    if has_validation_issues:
-                        st.info("ℹ️ 検証エラーや差異検出があったファイルの詳細レポートは、ZIPファイル内の `validation_results/` フォルダに含まれています。")
-                    
-                    # XMLプレビュー（最初のファイルのみ）
-                    if uploaded_file_names:
-                        first_file_name = uploaded_file_names[0]
-                        first_input_file = input_dir / first_file_name
-                        first_output_file = output_dir / first_file_name
-                        
-                        if first_output_file.exists():
-                            try:
-                                with open(first_input_file, 'r', encoding='utf-8') as f:
-                                    first_input_xml_full = f.read()
-                                with open(first_output_file, 'r', encoding='utf-8') as f:
-                                    first_output_xml_full = f.read()
-                                
-                                # XMLプレビュー用に切り詰め
-                                first_input_xml_preview, first_input_total_lines = truncate_xml_preview(first_input_xml_full)
-                                first_output_xml_preview, first_output_total_lines = truncate_xml_preview(first_output_xml_full)
-                                
-                                st.markdown("---")
-                                st.markdown(f"### 📄 XMLプレビュー（{first_file_name}）")
-                                
-                                col_preview1, col_preview2 = st.columns(2)
-                                
-                                with col_preview1:
-                                    preview_label = f"📄 変換前のXML（プレビュー）"
-                                    if first_input_total_lines > MAX_PREVIEW_LINES:
-                                        preview_label += f" - {first_input_total_lines:,}行中 {PREVIEW_HEAD_LINES}+{PREVIEW_TAIL_LINES}行を表示"
-                                    with st.expander(preview_label, expanded=False):
-                                        st.code(first_input_xml_preview, language="xml")
-                                
-                                with col_preview2:
-                                    preview_label = f"📄 変換後のXML（プレビュー）"
-                                    if first_output_total_lines > MAX_PREVIEW_LINES:
-                                        preview_label += f" - {first_output_total_lines:,}行中 {PREVIEW_HEAD_LINES}+{PREVIEW_TAIL_LINES}行を表示"
-                                    with st.expander(preview_label, expanded=False):
-                                        st.code(first_output_xml_preview, language="xml")
-                            except Exception as e:
-                                st.info(f"⚠️ プレビューの表示中にエラーが発生しました: {str(e)}")
-                    
-                    # ダウンロードボタン
+        try:
+            # 実行中・完了済みの前回のジョブは破棄する
+            previous_job = st.session_state.pop("batch_job", None)
+            if previous_job is not None:
+                previous_job.close()
+            
+            # ワーカープールに投入（変換と検証はバックグラウンドで実行され、再実行のたびに完了分を取り込む）
+            st.session_state["batch_job"] = BatchJob(
+                ((uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files),
+                executor=session_executor(),
+                observers=[ConsoleReporter()],
+                compresslevel=zip_compresslevel,
+                spool_bytes=BATCH_ZIP_SPOOL_BYTES
+            )
+        except Exception as e:
+            st.error(f"❌ **エラーが発生しました**\n\n{str(e)}")
+            import traceback
+            with st.expander("エラー詳細"):
+                st.code(traceback.format_exc())
+    
+    elif process_button_multi and not uploaded_files:
+        st.warning("⚠️ ファイルをアップロードしてください。")
+    
+    batch_job = st.session_state.get("batch_job")
+    if batch_job is not None:
+        batch_job.poll()
+        
+        # 進捗
+        st.progress(
+            batch_job.finished / batch_job.total if batch_job.total else 1.0,
+            text=f"{batch_job.finished}/{batch_job.total} 件完了（経過 {batch_job.elapsed:.0f} 秒）"
+        )
+        if not batch_job.done:
+            pool_stats = get_worker_pool().stats(st.session_state.get("session_id"))
+            st.caption(
+                f"共有ワーカー: 実行中 {pool_stats['running']}/{pool_stats['max_running']}・"
+                f"待ち {pool_stats['queued']} 件（このセッション {pool_stats['session_queued']} 件、"
+                f"待ちのあるセッション {pool_stats['sessions']} 個）"
+            )
+        status_counts = batch_job.counts()
+        st.markdown("　".join(f"{STATUS_MARKS[status]} {status}: {count} 件" for status, count in status_counts.items()))
+        
+        # ファイルごとの状態
+        st.dataframe(batch_job.rows(), use_container_width=True, hide_index=True)
+        
+        # 完了したファイルから順にダウンロード可能にする
+        completed_names = batch_job.completed_names()
+        if completed_names:
+            selected_name = st.selectbox("完了したファイル", completed_names, key="batch_selected_file")
+            col_download1, col_download2 = st.columns(2)
+            with col_download1:
+                st.download_button(
+                    label="変換結果をダウンロード",
+                    data=batch_job.output_path(selected_name).read_bytes(),
+                    file_name=f"{Path(selected_name).stem}_split{Path(selected_name).suffix}",
+                    mime="application/xml",
+                    use_container_width=True
+                )
+            report_path = batch_job.report_path(selected_name)
+            if report_path is not None:
+                with col_download2:
                     st.download_button(
-                        label="変換結果ZIPファイルをダウンロード",
-                        data=zip_buffer.getvalue(),
-                        file_name="converted_files.zip",
-                        mime="application/zip",
-                        type="primary",
+                        label="📄 検証レポートをダウンロード",
+                        data=report_path.read_bytes(),
+                        file_name=report_path.name,
+                        mime="text/markdown",
                         use_container_width=True
                     )
-                    
+            
+            # 差異の一覧（選択したファイル、表示を選んだ場合のみ作成）
+            if batch_job.status(selected_name) == STATUS_DIFFERENT:
+                render_differences(batch_job.results[selected_name]["result"],
+                                   f"batch_diff_{id(batch_job)}_{selected_name}")
+            
+            # XMLプレビュー（選択したファイル）
+            try:
+                col_preview1, col_preview2 = st.columns(2)
+                input_path = batch_job.input_dir / selected_name
+                output_path = batch_job.output_path(selected_name)
+                with col_preview1:
+                    render_xml_preview(
+                        "📄 変換前のXML（プレビュー）",
+                        get_line_index(str(input_path), lambda: LineIndex.from_file(input_path)),
+                        f"batch_input_preview_{id(batch_job)}_{selected_name}"
+                    )
+                with col_preview2:
+                    render_xml_preview(
+                        "📄 変換後のXML（プレビュー）",
+                        get_line_index(str(output_path), lambda: LineIndex.from_file(output_path)),
+                        f"batch_output_preview_{id(batch_job)}_{selected_name}"
+                    )
             except Exception as e:
-                st.error(f"❌ **エラーが発生しました**\n\n{str(e)}")
-                import traceback
-                with st.expander("エラー詳細"):
-                    st.code(traceback.format_exc())
-    
-    elif process_button_multi and not uploaded_files:
-        st.warning("⚠️ ファイルをアップロードしてください。")
+                st.info(f"⚠️ プレビューの表示中にエラーが発生しました: {str(e)}")
+        
+        if batch_job.done:
+            # 結果を表示
+            st.success(f"✅ **一括変換完了**\n\n- 処理ファイル数: {batch_job.total} 個\n- 処理時間: {batch_job.elapsed:.1f} 秒")
+            
+            # 検証エラーや差異検出がある場合、ZIPに検証レポートが含まれていることを通知
+            has_validation_issues = any(status != STATUS_PASSED for status in status_counts)
+            if has_validation_issues:
+                st.info("ℹ️ 検証エラーや差異検出があったファイルの詳細レポートは、ZIPファイル内の `validation_results/` フォルダに含まれています。")
+            if batch_job.error_report_path is not None:
+                st.info("ℹ️ 変換エラーになったファイルは、ZIPファイル内の `validation_results/conversion_errors.md` に記録されています。")
+            
+            # ダウンロードボタン
+            st.download_button(
+                label=f"変換結果ZIPファイルをダウンロード（{batch_job.zip_size / 1024 / 1024:.1f} MB）",
+                data=batch_job.read_zip(),
+                file_name="converted_files.zip",
+                mime="application/zip",
+                type="primary",
+                use_container_width=True
+            )
 
 with tab3:
     st.markdown(
@@ -536,9 +457,9 @@ with tab3:
         ### 複数ファイル一括処理
         1. 「複数ファイル一括処理」タブを開く
         2. 複数のXMLファイルを選択（Ctrl/Cmd+クリックで複数選択）
-        3. 必要に応じてオプションを設定
-        4. 「一括変換実行」ボタンをクリック
-        5. ZIPファイルをダウンロード
+        3. 「一括変換実行」ボタンをクリック
+        4. 進捗とファイルごとの状態を確認（完了したファイルから個別にダウンロード可能）
+        5. すべて完了したらZIPファイルをダウンロード
         
         ## 変換ルール
         - ParagraphSentence内にSentence要素が**10個以上**ある場合のみ変換
@@ -554,3 +475,27 @@ with tab3:
 # サイドバー
 with st.sidebar:
     st.markdown("**バージョン:** 1.1.0")
+    
+    # 変換結果キャッシュの状況
+    result_cache = get_result_cache()
+    st.caption(
+        f"変換結果キャッシュ: メモリ {result_cache.memory_bytes / 1024 / 1024:.1f} MB・"
+        f"ファイル {result_cache.total_bytes / 1024 / 1024:.1f} MB"
+        f"（ヒット {result_cache.hits} 回 / ミス {result_cache.misses} 回）"
+    )
+    # 共有ワーカープールの状況（全セッションの合計）
+    pool_stats = get_worker_pool().stats(st.session_state.get("session_id"))
+    st.caption(
+        f"共有ワーカー: 実行中 {pool_stats['running']}/{pool_stats['max_running']}・"
+        f"待ち {pool_stats['queued']} 件（{pool_stats['sessions']} セッション）"
+    )
+    if st.button("キャッシュを削除", use_container_width=True):
+        result_cache.clear()
+        st.session_state.pop("single_result", None)
+        st.rerun()
+
+# 一括変換の実行中は、完了したファイルを取り込んで表示を更新するために定期的に再実行する
+batch_job = st.session_state.get("batch_job")
+if batch_job is not None and not batch_job.done:
+    time.sleep(BATCH_POLL_SECONDS)
+    st.rerun()
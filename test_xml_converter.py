@@ -6,10 +6,40 @@ import xml.etree.ElementTree as ET
 from xml.dom import minidom
 from pathlib import Path
 import tempfile
+import sys
+import multiprocessing
+import io
 import os
+import shutil
+import subprocess
+import time
+from contextlib import redirect_stdout
+from unittest import mock
 
 # テスト対象のモジュールをインポート
-from xml_converter import convert_sentence_to_list, convert_xml
+import xml_converter
+from xml_converter import convert_sentence_to_list, convert_xml, process_folder, read_file_pairs, watch_folder
+
+
+def build_law_xml(sentence_count=10):
+    """テスト用の最小構成のLaw XMLを生成"""
+    sentences = ''.join(
+        f'<Sentence Num="{i}">（{i}）　項目{i}</Sentence>' for i in range(1, sentence_count + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Law Era="Reiwa" Lang="ja" LawType="Misc" Num="1" Year="1">'
+        '<LawNum>テスト</LawNum><LawBody><MainProvision>'
+        '<Paragraph Num="1"><ParagraphNum/>'
+        f'<ParagraphSentence>{sentences}</ParagraphSentence>'
+        '</Paragraph></MainProvision></LawBody></Law>\n'
+    )
+
+
+def _slow_convert_xml(input_file, output_file, cache=None, on_paragraph=None):
+    """タイムアウト検証用: 変換が終わらないファイルを模擬"""
+    time.sleep(60)
+
 
 class TestXMLConverter(unittest.TestCase):
 
@@ -326,5 +356,1313 @@ class TestXMLConverter(unittest.TestCase):
                 os.unlink(output_file_path)
 
 
+class TestProcessFolderLimits(unittest.TestCase):
+    """ワーカープロセスによる一括変換（処理時間・メモリ上限）のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = Path(self.temp_dir.name) / "input"
+        self.output_dir = Path(self.temp_dir.name) / "output"
+        self.input_dir.mkdir()
+        (self.input_dir / "ok.xml").write_text(build_law_xml(), encoding='utf-8')
+        (self.input_dir / "broken.xml").write_text("<Law><LawBody>", encoding='utf-8')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_isolated_batch_records_errors_and_continues(self):
+        """ワーカー経由でも変換結果とエラー記録が逐次処理と同じになること"""
+        process_folder(self.input_dir, self.output_dir, jobs=2, timeout=30, max_inflight_mb=1)
+
+        self.assertTrue((self.output_dir / "ok.xml").exists())
+        self.assertFalse((self.output_dir / "broken.xml").exists())
+        report = (self.output_dir / "validation_results" / "conversion_errors.md").read_text(encoding='utf-8')
+        self.assertIn("broken.xml", report)
+        self.assertIn("XML構文エラー", report)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', "forkでのみワーカーに差し替えが引き継がれる")
+    def test_timeout_kills_worker_and_records_error(self):
+        """処理時間上限を超えたファイルは中断され、専用のエラータイプで記録されること"""
+        (self.input_dir / "broken.xml").unlink()
+        with mock.patch.object(xml_converter, 'convert_xml', _slow_convert_xml):
+            started = time.monotonic()
+            process_folder(self.input_dir, self.output_dir, timeout=0.5)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 30)
+        report = (self.output_dir / "validation_results" / "conversion_errors.md").read_text(encoding='utf-8')
+        self.assertIn(xml_converter.TIMEOUT_ERROR_TYPE, report)
+        self.assertIn("ok.xml", report)
+
+
+class RecordingObserver(xml_converter.ConversionObserver):
+    """受け取ったイベントを記録するテスト用オブザーバ"""
+
+    def __init__(self):
+        self.events = []
+
+    def batch_started(self, total):
+        self.events.append(("batch_started", total))
+
+    def file_started(self, name):
+        self.events.append(("file_started", name))
+
+    def file_converted(self, name, seconds, converted_count):
+        self.events.append(("file_converted", name, converted_count))
+
+    def file_failed(self, name, error):
+        self.events.append(("file_failed", name, error["error_type"]))
+
+    def batch_finished(self, success_count, errors):
+        self.events.append(("batch_finished", success_count, len(errors)))
+
+
+class TestConversionObservers(unittest.TestCase):
+    """process_folder の進捗イベント通知のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = Path(self.temp_dir.name) / "input"
+        self.output_dir = Path(self.temp_dir.name) / "output"
+        self.input_dir.mkdir()
+        (self.input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+        (self.input_dir / "b.xml").write_text(build_law_xml(sentence_count=3), encoding='utf-8')
+        (self.input_dir / "c.xml").write_text("<Law>", encoding='utf-8')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_events_are_delivered_in_order(self):
+        """開始・完了・失敗のイベントが変換箇所数とともに通知されること"""
+        observer = RecordingObserver()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            process_folder(self.input_dir, self.output_dir, observers=[observer])
+
+        events = sorted(observer.events[1:-1])
+        self.assertEqual(observer.events[0], ("batch_started", 3))
+        self.assertEqual(observer.events[-1], ("batch_finished", 2, 1))
+        self.assertIn(("file_converted", "a.xml", 1), events)
+        self.assertIn(("file_converted", "b.xml", 0), events)
+        self.assertIn(("file_failed", "c.xml", "XML構文エラー"), events)
+        self.assertEqual(sum(1 for e in events if e[0] == "file_started"), 3)
+        # ConsoleReporterを渡していないので進捗は表示されない
+        self.assertNotIn("処理中", out.getvalue())
+
+    def test_isolated_workers_report_same_events(self):
+        """ワーカープロセス経由でも同じイベントが通知されること"""
+        metrics = xml_converter.ConversionMetrics()
+        with redirect_stdout(io.StringIO()):
+            process_folder(self.input_dir, self.output_dir, jobs=2, observers=[metrics])
+        summary = metrics.as_dict()
+        self.assertEqual((summary["total"], summary["converted"], summary["failed"]), (3, 2, 1))
+        self.assertEqual(summary["converted_paragraphs"], 1)
+
+
+def build_articles_xml(article_texts):
+    """Article要素を複数含むテスト用のLaw XMLを生成（article_texts: 各ArticleのSentence接頭辞）"""
+    articles = ''
+    for num, prefix in enumerate(article_texts, 1):
+        sentences = ''.join(
+            f'<Sentence Num="{i}">（{i}）　{prefix}{i}</Sentence>' for i in range(1, 11)
+        )
+        articles += (
+            f'<Article Num="{num}"><ArticleTitle>第{num}条</ArticleTitle>'
+            f'<Paragraph Num="1"><ParagraphNum/><ParagraphSentence>{sentences}</ParagraphSentence></Paragraph>'
+            '</Article>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Law Era="Reiwa" Lang="ja" LawType="Misc" Num="1" Year="1">'
+        '<LawNum>テスト</LawNum><LawBody><MainProvision>'
+        f'{articles}'
+        '</MainProvision></LawBody></Law>\n'
+    )
+
+
+def track_iterparse_tree(run):
+    """run() の間に iterparse が作る木を観察する
+
+    Returns:
+        (end イベントごとのルート以下の要素数の最大値, 終了後のルートの子の数)
+    """
+    real_iterparse = ET.iterparse
+    roots = []
+    sizes = []
+
+    def tracking(source, events=None):
+        for event, elem in real_iterparse(source, events=events):
+            if not roots:
+                roots.append(elem)
+            yield event, elem
+            if event == 'end':
+                sizes.append(sum(1 for _ in roots[0].iter()))
+
+    with mock.patch.object(ET, 'iterparse', tracking):
+        run()
+    return max(sizes), len(roots[0])
+
+
+class TestIncrementalConversion(unittest.TestCase):
+    """断片キャッシュを使った差分変換のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _convert_both(self, xml_text, cache):
+        input_file = self.temp_path / "in.xml"
+        input_file.write_text(xml_text, encoding='utf-8')
+        convert_xml(input_file, self.temp_path / "full.xml")
+        converted_count = convert_xml(input_file, self.temp_path / "incremental.xml", cache=cache)
+        self.assertEqual((self.temp_path / "incremental.xml").read_bytes(),
+                         (self.temp_path / "full.xml").read_bytes())
+        return converted_count
+
+    def test_output_identical_and_unchanged_articles_reused(self):
+        """出力は通常の変換と同一で、変更のないArticleだけがキャッシュから再利用されること"""
+        from xml_fragment_cache import FragmentCache
+
+        with FragmentCache(self.temp_path / "cache.sqlite") as cache:
+            self.assertEqual(self._convert_both(build_articles_xml(["甲", "乙", "丙"]), cache), 3)
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+            # 2条目だけを変更
+            self.assertEqual(self._convert_both(build_articles_xml(["甲", "丁", "丙"]), cache), 3)
+            self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+            # 条がないParagraph直下の文書も同一の出力になる
+            self.assertEqual(self._convert_both(build_law_xml(), cache), 1)
+            self.assertEqual(self._convert_both(build_law_xml(), cache), 1)
+
+    def test_eviction_keeps_cache_under_limit(self):
+        """上限サイズを超えると古い断片から削除されること"""
+        from xml_fragment_cache import FragmentCache
+
+        with FragmentCache(self.temp_path / "cache.sqlite", max_bytes=4096) as cache:
+            for i in range(20):
+                self._convert_both(build_articles_xml([f"版{i}"]), cache)
+            self.assertLessEqual(cache.total_bytes, 4096)
+            count = cache.conn.execute("SELECT COUNT(*) FROM fragments").fetchone()[0]
+            self.assertLess(count, 20)
+
+    def test_replaced_fragments_keep_total_in_sync(self):
+        """同じキーの断片を保存し直しても、合計サイズは保存されている断片のサイズと一致すること"""
+        from xml_fragment_cache import FragmentCache
+
+        with FragmentCache(self.temp_path / "cache.sqlite") as cache:
+            cache.put_many([("a", "あ" * 10, 1), ("b", "b" * 5, 0), ("a", "a" * 20, 1)])
+            cache.put_many([("b", "b" * 7, 0)])
+            self.assertEqual(cache.total_bytes, 27)
+            self.assertEqual(cache.get_many(["a", "b"]), {"a": ("a" * 20, 1), "b": ("b" * 7, 0)})
+
+
+class TestSentenceIndex(unittest.TestCase):
+    """文索引（SQLite）のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.input_dir = self.temp_path / "input"
+        self.input_dir.mkdir()
+        (self.input_dir / "fired.xml").write_text(build_articles_xml(["甲"]), encoding='utf-8')
+        (self.input_dir / "short.xml").write_text(build_law_xml(sentence_count=3), encoding='utf-8')
+        self.index_path = self.temp_path / "index.sqlite"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_index_records_split_positions_during_conversion(self):
+        """変換と同時に各文の分割位置・Column・変換条件が記録されること"""
+        from xml_sentence_index import SentenceIndex
+
+        with redirect_stdout(io.StringIO()):
+            process_folder(self.input_dir, self.temp_path / "output", index_path=self.index_path)
+
+        with SentenceIndex(self.index_path) as index:
+            self.assertEqual(index.fired_files(), ["fired.xml"])
+            rows = index.conn.execute(
+                "SELECT path, sentence_num, split_position, column1, column2 FROM sentences"
+                " WHERE file = 'fired.xml' ORDER BY sentence_index").fetchall()
+            self.assertEqual(len(rows), 10)
+            self.assertEqual(rows[0], ("/Law/LawBody[1]/MainProvision[1]/Article[@Num='1']"
+                                       "/Paragraph[@Num='1']/ParagraphSentence[1]", "1", 3, "（1）", "甲1"))
+            short = index.conn.execute(
+                "SELECT COUNT(*), SUM(threshold_fired), COUNT(split_position) FROM sentences"
+                " WHERE file = 'short.xml'").fetchone()
+            self.assertEqual(short, (3, 0, 0))
+            self.assertEqual(index.search("甲10")[0][:3],
+                             ("fired.xml", rows[0][0], "10"))
+
+    def test_build_reindexes_only_changed_files(self):
+        """build_index は変更・削除のあったファイルだけを反映すること"""
+        from xml_sentence_index import build_index
+
+        self.assertEqual(build_index(self.input_dir, self.index_path)[:3], (2, 0, 0))
+        self.assertEqual(build_index(self.input_dir, self.index_path)[:3], (0, 2, 0))
+
+        (self.input_dir / "short.xml").write_text(build_law_xml(), encoding='utf-8')
+        (self.input_dir / "fired.xml").unlink()
+        self.assertEqual(build_index(self.input_dir, self.index_path)[:3], (1, 0, 1))
+
+        from xml_sentence_index import SentenceIndex
+        with SentenceIndex(self.index_path) as index:
+            self.assertEqual(index.fired_files(), ["short.xml"])
+
+
+class TestDryRunStats(unittest.TestCase):
+    """--dry-run の集計のテスト"""
+
+    def test_stats_match_conversion_without_writing(self):
+        """集計結果が実際の変換と一致し、解析エラーも記録されること"""
+        from xml_corpus_stats import analyze_corpus
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            (temp_path / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            (temp_path / "b.xml").write_text(build_law_xml(sentence_count=3), encoding='utf-8')
+            (temp_path / "c.xml").write_text(build_law_xml(sentence_count=12).replace("（11）　", "（11）"),
+                                             encoding='utf-8')
+            (temp_path / "broken.xml").write_text("<Law><ParagraphSentence>", encoding='utf-8')
+
+            stats = analyze_corpus(sorted(temp_path.glob("*.xml")), jobs=2)
+
+            self.assertEqual(stats["total_files"], 4)
+            self.assertEqual(stats["failed_files"], 1)
+            self.assertEqual(stats["errors"][0]["error_type"], "XML構文エラー")
+            self.assertEqual(stats["files_with_conversion"], 2)
+            self.assertEqual(stats["paragraph_sentences"], 3)
+            self.assertEqual(stats["fired_paragraph_sentences"], 2)
+            self.assertEqual(stats["sentences"], 22)
+            self.assertEqual(stats["split_sentences"], 21)
+            self.assertEqual(stats["split_positions"], {"3": 18, "4": 3})
+            self.assertEqual(sorted(path.name for path in temp_path.iterdir()),
+                             ["a.xml", "b.xml", "broken.xml", "c.xml"])
+
+    def test_analyze_file_discards_finished_elements(self):
+        """読み終えた要素は木から外され、保持する要素数が文書の大きさに比例しないこと"""
+        from xml_corpus_stats import analyze_file
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = Path(temp_dir) / "large.xml"
+            article_count = 1000
+            input_file.write_text(build_articles_xml([f"条{i}" for i in range(article_count)]), encoding='utf-8')
+            stats = {}
+            max_elements, leftover_children = track_iterparse_tree(
+                lambda: stats.update(analyze_file(input_file)))
+
+        self.assertEqual(stats["fired_paragraph_sentences"], article_count)
+        self.assertEqual(leftover_children, 0)
+        self.assertLess(max_elements, article_count)
+
+
+class TestCompareValueLists(unittest.TestCase):
+    """検証の値リスト比較のテスト"""
+
+    def test_identical_lists(self):
+        """同一のリストでは差異が報告されないこと"""
+        from xml_content_validator_v2 import compare_value_lists
+
+        result = compare_value_lists(["a", "b", "a"], ["a", "b", "a"])
+        self.assertTrue(result['identical'])
+        self.assertEqual((result['missing_in_2'], result['extra_in_2'], result['order_differences'], result['hunks']),
+                         ([], [], [], []))
+
+    def test_insertion_reported_as_single_hunk(self):
+        """途中に1つ挿入されても、以降の全位置ではなく1つの挿入ハンクとして報告されること"""
+        from xml_content_validator_v2 import compare_value_lists
+
+        values1 = [f"値{i}" for i in range(1000)]
+        values2 = values1[:10] + ["追加"] + values1[10:500] + ["置換"] + values1[501:]
+        result = compare_value_lists(values1, values2)
+
+        self.assertFalse(result['identical'])
+        self.assertEqual(result['missing_in_2'], ["値500"])
+        self.assertEqual(result['extra_in_2'], ["追加", "置換"])
+        self.assertEqual([(h['tag'], h['file1_start'], h['file1_end'], h['file2_start'], h['file2_end'])
+                          for h in result['hunks']],
+                         [('insert', 10, 10, 10, 11), ('replace', 500, 501, 501, 502)])
+        self.assertEqual(len(result['order_differences']), 2)
+
+    def test_alignment_is_minimal(self):
+        """重複の多いリストでも挿入・削除の数が最小になること"""
+        from xml_content_validator_v2 import diff_value_lists
+
+        values1 = list("abcabba")
+        values2 = list("cbabac")
+        edits = sum((i2 - i1) + (j2 - j1) for tag, i1, i2, j1, j2 in diff_value_lists(values1, values2)
+                    if tag != 'equal')
+        # 最長共通部分列は長さ4（例: "baba"）
+        self.assertEqual(edits, len(values1) + len(values2) - 2 * 4)
+
+    def test_find_differences_filters_and_pages(self):
+        """差異を種類と値で絞り込み、件数の上限なしで任意の範囲を取り出せること"""
+        from xml_content_validator_v2 import (compare_value_lists, find_differences,
+                                              DIFFERENCE_EXTRA, DIFFERENCE_MISSING, DIFFERENCE_ORDER)
+
+        values1 = [f"値{i}" for i in range(300)]
+        values2 = [f"値{i}" if i % 3 else f"変更{i}" for i in range(300)]
+        result = compare_value_lists(values1, values2)
+        total, everything = find_differences(result, count=len(values1) + len(values2))
+        self.assertEqual((total, len(everything)), (300, 300))
+        self.assertEqual(everything[0], {"kind": DIFFERENCE_MISSING, "position1": None, "position2": None,
+                                         "file1": "値0", "file2": None})
+
+        total, rows = find_differences(result, start=250, count=100)
+        self.assertEqual((total, rows), (300, everything[250:]))
+
+        total, rows = find_differences(result, [DIFFERENCE_EXTRA], query="変更29", count=2)
+        self.assertEqual(total, 3)
+        self.assertEqual([(row["kind"], row["file2"]) for row in rows],
+                         [(DIFFERENCE_EXTRA, "変更291"), (DIFFERENCE_EXTRA, "変更294")])
+
+        total, rows = find_differences(result, [DIFFERENCE_ORDER], query="値1", start=0, count=0)
+        self.assertEqual(rows, [])
+        self.assertEqual(total, sum(1 for row in everything
+                                    if row["kind"] == DIFFERENCE_ORDER and "値1" in row["file1"]))
+
+
+class TestStreamCompare(unittest.TestCase):
+    """ストリーミング検証のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+        self.original = self.temp_path / "original.xml"
+        self.original.write_text(build_articles_xml(["甲", "乙", "丙"]), encoding='utf-8')
+        self.converted = self.temp_path / "converted.xml"
+        convert_xml(self.original, self.converted)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_identical_and_resync_after_insertion(self):
+        """一致する場合は成功し、値が1つ挿入されても以降の比較は再開されること"""
+        from xml_content_validator_v2 import stream_compare
+
+        result = stream_compare(self.original, self.converted)
+        self.assertTrue(result['identical'])
+        self.assertEqual(result['compared'], 30)
+
+        modified = self.temp_path / "modified.xml"
+        modified.write_text(build_articles_xml(["甲", "乙", "丙"]).replace(
+            '<Sentence Num="1">（1）　乙1</Sentence>',
+            '<Sentence Num="1">追加</Sentence><Sentence Num="1">（1）　乙1</Sentence>'), encoding='utf-8')
+        result = stream_compare(self.original, modified, window=5)
+        self.assertFalse(result['identical'])
+        self.assertEqual(result['mismatch_count'], 1)
+        self.assertEqual(result['mismatches'][0],
+                         {'file1_start': 10, 'file2_start': 10, 'file1': [], 'file2': ["追加"]})
+        self.assertEqual(result['compared'], 30)
+
+    def test_streaming_discards_finished_elements(self):
+        """読み終えた要素は木から外され、保持する要素数が文書の大きさに比例しないこと"""
+        from xml_content_validator_v2 import extract_values_from_xml_structure, iter_values_streaming
+
+        original = self.temp_path / "large.xml"
+        article_count = 1000
+        original.write_text(build_articles_xml([f"条{i}" for i in range(article_count)]), encoding='utf-8')
+        converted = self.temp_path / "large_converted.xml"
+        convert_xml(original, converted)
+        values = []
+        max_elements, leftover_children = track_iterparse_tree(
+            lambda: values.extend(iter_values_streaming(converted)))
+
+        self.assertEqual(values, extract_values_from_xml_structure(converted))
+        self.assertEqual(leftover_children, 0)
+        # 中身を消しただけの要素が親に残ると、Articleごとに1要素ずつ増えていく
+        self.assertLess(max_elements, article_count)
+
+    def test_fail_fast_stops_at_first_mismatch(self):
+        """fail_fast では最初の差異で打ち切られること"""
+        from xml_content_validator_v2 import stream_compare
+
+        modified = self.temp_path / "modified.xml"
+        modified.write_text(build_articles_xml(["甲", "乙", "丙"]).replace("甲", "丁"), encoding='utf-8')
+        result = stream_compare(self.original, modified, fail_fast=True)
+        self.assertFalse(result['identical'])
+        self.assertTrue(result['stopped_early'])
+        self.assertEqual(result['mismatch_count'], 1)
+        self.assertEqual(result['compared'], 0)
+
+
+class TestValidateDirectories(unittest.TestCase):
+    """フォルダ同士の一括検証のテスト"""
+
+    def test_recursive_tree_reports_and_summary(self):
+        """サブフォルダも同じ構成で検証され、個別レポートとサマリーが出力されること"""
+        from xml_content_validator_v2 import validate_directories
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            (input_dir / "sub").mkdir(parents=True)
+            (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            (input_dir / "sub" / "b.xml").write_text(build_law_xml(), encoding='utf-8')
+            with redirect_stdout(io.StringIO()):
+                process_folder(input_dir, output_dir, recursive=True)
+                self.assertEqual(validate_directories(input_dir, output_dir, recursive=True, jobs=2), 0)
+
+            validation_dir = output_dir / "validation_results"
+            self.assertTrue((validation_dir / "a_validation.md").exists())
+            self.assertTrue((validation_dir / "sub" / "b_validation.md").exists())
+            summary = (validation_dir / "validation_summary.md").read_text(encoding='utf-8')
+            self.assertIn("[検証結果詳細](sub/b_validation.md)", summary)
+            self.assertIn("**✅ 検証成功**: 2 ファイル", summary)
+
+            # 出力の値を書き換えると検証失敗になる
+            b_output = output_dir / "sub" / "b.xml"
+            b_output.write_text(b_output.read_text(encoding='utf-8').replace("項目3", "項目X"), encoding='utf-8')
+            with redirect_stdout(io.StringIO()) as stdout:
+                self.assertEqual(validate_directories(input_dir, output_dir, recursive=True, jobs=1), 1)
+            self.assertIn("❌ 検証失敗: sub/b.xml", stdout.getvalue())
+
+    def test_summary_labels_unreported_results(self):
+        """レポートを作成しなかったファイルは検証方法を、検証中のエラーはエラー内容をサマリーに記録すること"""
+        import xml_content_validator_v2 as validator
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            summary_path = output_dir / "validation_results" / "validation_summary.md"
+            with redirect_stdout(io.StringIO()):
+                process_folder(input_dir, output_dir)
+                validator.validate_directories(input_dir, output_dir, jobs=1, fail_fast=True)
+                self.assertIn("a.xml**: 検証成功（ストリーミング検証）", summary_path.read_text(encoding='utf-8'))
+                validator.validate_directories(input_dir, output_dir, jobs=1, fail_fast=True, round_trip=True)
+                self.assertIn("a.xml**: 検証成功（逆変換検証）", summary_path.read_text(encoding='utf-8'))
+
+                with mock.patch.object(validator, 'compare_files', side_effect=ValueError("壊れた出力")):
+                    self.assertEqual(validator.validate_directories(input_dir, output_dir, jobs=1), 1)
+            summary = summary_path.read_text(encoding='utf-8')
+            self.assertIn("a.xml** ❌: 検証エラー（ValueError: 壊れた出力）", summary)
+            self.assertNotIn("a_validation.md", summary)
+            self.assertFalse((output_dir / "validation_results" / "a_validation.md").exists())
+
+
+class TestStructureVerification(unittest.TestCase):
+    """Merkle木のハッシュによる文書全体の構造検証のテスト"""
+
+    def test_only_converted_sentences_may_differ(self):
+        """変換対象の文以外の要素が一致すれば成功し、差異は要素パスで特定されること"""
+        from xml_content_validator_v2 import compare_structure
+
+        source = ET.fromstring(build_law_xml())
+        converted = ET.fromstring(build_law_xml())
+        xml_converter.transform_tree(converted)
+        result = compare_structure(source, converted)
+        self.assertTrue(result['identical'])
+        self.assertEqual((result['converted_1'], result['converted_2']), (1, 1))
+
+        # ParagraphSentence外の要素の変更は検出される
+        converted.find('LawNum').text = "変更"
+        converted.find('.//ParagraphNum').set('Extra', '1')
+        result = compare_structure(source, converted)
+        self.assertEqual([m['path'] for m in result['mismatches']],
+                         ["/Law/LawNum[1]", "/Law/LawBody[1]/MainProvision[1]/Paragraph[@Num='1']/ParagraphNum[1]"])
+
+        # 変換されるべき段落が変換されていない場合も検出される
+        result = compare_structure(source, ET.fromstring(build_law_xml()))
+        self.assertEqual([m['reason'] for m in result['mismatches']], ["変換の有無が異なる"])
+        self.assertEqual(result['converted_2'], 0)
+
+
+class TestChangeLog(unittest.TestCase):
+    """変換時の変更ログを使った検証のテスト"""
+
+    def test_validation_with_change_log_skips_source_parse(self):
+        """変更ログがあれば比較元を解析せずに同一と判定し、差異がある場合は通常の比較になること"""
+        import xml_content_validator_v2 as validator
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            (input_dir / "b.xml").write_text(build_law_xml(9), encoding='utf-8')
+            with redirect_stdout(io.StringIO()):
+                process_folder(input_dir, output_dir, change_log=True)
+
+            change_log = validator.load_change_log(output_dir / "a.xml")
+            self.assertEqual(change_log["paragraph_count"], 1)
+            self.assertEqual([paragraph["items"] for paragraph in change_log["paragraphs"]], [10])
+            self.assertEqual(validator.load_change_log(output_dir / "b.xml")["paragraphs"], [])
+
+            expected = validator.compare_files(input_dir / "a.xml", output_dir / "a.xml")
+            with mock.patch.object(validator.ET, 'parse', wraps=validator.ET.parse) as parse:
+                compared = validator.compare_files(input_dir / "a.xml", output_dir / "a.xml",
+                                                   change_log=change_log)
+            self.assertEqual(compared, expected)
+            self.assertEqual([call.args[0] for call in parse.call_args_list], [output_dir / "a.xml"])
+
+            # 変換した段落の記録と比較先の構造が一致しない場合は、変更ログでは判定しない
+            moved = dict(change_log, paragraphs=[])
+            self.assertIsNone(validator.compare_with_change_log(input_dir / "a.xml", output_dir / "a.xml", moved))
+
+            # 空や途中で切れたダイジェストは一致とみなさない
+            for digest in ("", change_log["digests"][0][:8]):
+                truncated = dict(change_log, digests=[digest])
+                self.assertIsNone(validator.compare_with_change_log(input_dir / "a.xml", output_dir / "a.xml",
+                                                                    truncated))
+
+            # 出力の値を書き換えると通常の比較で差異が報告される
+            a_output = output_dir / "a.xml"
+            a_output.write_text(a_output.read_text(encoding='utf-8').replace("項目3", "項目X"), encoding='utf-8')
+            _, _, result = validator.compare_files(input_dir / "a.xml", a_output, change_log=change_log)
+            self.assertEqual(result['missing_in_2'], ["（3）　項目3"])
+
+
+class TestRoundTrip(unittest.TestCase):
+    """逆変換（List → Sentence）による検証のテスト"""
+
+    def test_restores_separators_and_attributes_from_change_log(self):
+        """変更ログに記録した区切り文字・属性で逆変換すると変換前と一致し、差異は要素パスで報告されること"""
+        import xml_content_validator_v2 as validator
+
+        # 3番目の文は分割点の空白が子要素の中にあるため取り除かれず、5番目の文は半角空白で分割される
+        source = build_law_xml().replace(
+            '<Sentence Num="3">（3）　項目3</Sentence>',
+            '<Sentence Num="3" WritingFormat="normal">（3）<Sup>a　b</Sup>項目3</Sentence>'
+        ).replace('（5）　項目5', '（5） 項目5')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = Path(temp_dir) / "in.xml"
+            output_file = Path(temp_dir) / "out.xml"
+            input_file.write_text(source, encoding='utf-8')
+            recorder = xml_converter.ChangeLogRecorder()
+            convert_xml(input_file, output_file, on_paragraph=recorder)
+            recorder.write(input_file, output_file)
+            change_log = validator.load_change_log(output_file)
+            self.assertEqual(change_log['paragraphs'][0]['separators'][2:5], [None, '　', ' '])
+
+            compared, result = validator.compare_with_round_trip(input_file, output_file, change_log)
+            self.assertTrue(result['identical'])
+            self.assertEqual(result['restored'], 1)
+            self.assertTrue(compared[2]['identical'])
+
+            # 変更ログがない場合は全角空白を戻し、Numを振り直すため、記録と異なる文だけが差異になる
+            _, result = validator.compare_with_round_trip(input_file, output_file)
+            self.assertEqual({mismatch['path'].rsplit('/', 1)[-1] for mismatch in result['mismatches']},
+                             {"Sentence[@Num='3']", "Sentence[@Num='5']"})
+
+            # 出力の書き換えは逆変換後の差異として報告され、値の比較にもフォールバックする
+            output_file.write_text(output_file.read_text(encoding='utf-8').replace("項目7", "項目X"),
+                                   encoding='utf-8')
+            _, _, result = validator.compare_files(input_file, output_file, change_log=change_log, round_trip=True)
+            self.assertFalse(result['identical'])
+            self.assertEqual([mismatch['reason'] for mismatch in result['round_trip']['mismatches']],
+                             ['テキストが異なる'])
+
+
+class TestSampling(unittest.TestCase):
+    """抽出検証のテスト"""
+
+    def test_selection_is_deterministic_and_covers_strata(self):
+        """同じシードなら入力の順序によらず同じ対象を選び、すべての層から抽出すること"""
+        from xml_sampling import SamplingPlan
+
+        keys = [f"f{i:03d}.xml" for i in range(200)]
+        sizes = [i * 37 % 1000 for i in range(200)]
+        densities = [0.0 if i % 3 == 0 else (i % 7) / 7 for i in range(200)]
+        plan = SamplingPlan(rate=0.1, seed=7)
+        sample = plan.select(keys, sizes, densities)
+        self.assertEqual(len(sample), 20)
+        self.assertEqual(set(sample.strata[index] for index in sample.indices), set(sample.strata.values()))
+
+        order = list(reversed(range(200)))
+        reordered = plan.select([keys[i] for i in order], [sizes[i] for i in order], [densities[i] for i in order])
+        self.assertEqual(sorted(keys[order[i]] for i in reordered.indices), sorted(keys[i] for i in sample.indices))
+        self.assertNotEqual(SamplingPlan(rate=0.1, seed=8).select(keys, sizes, densities).indices, sample.indices)
+        self.assertEqual(len(SamplingPlan(count=500).select(keys, sizes, densities)), 200)
+
+    def test_failure_bound(self):
+        """失敗がなくても信頼区間の上限は0にならず、全件を抽出した場合は区間の幅が0になること"""
+        from xml_sampling import SamplingPlan, wilson_interval
+
+        low, high = wilson_interval(0, 100)
+        self.assertEqual(low, 0.0)
+        self.assertAlmostEqual(high, 0.037, places=3)
+
+        keys = [str(i) for i in range(50)]
+        sample = SamplingPlan(count=10).select(keys, list(range(50)), [0.0] * 50)
+        bound = sample.failure_bound([sample.indices[0]])
+        self.assertEqual((bound['sampled'], bound['failures'], bound['population']), (10, 1, 50))
+        self.assertLess(bound['low'], bound['rate'])
+        self.assertLess(bound['rate'], bound['high'])
+        full = SamplingPlan(rate=1.0).select(keys, list(range(50)), [0.0] * 50).failure_bound([3])
+        self.assertEqual((full['low'], full['rate'], full['high']), (0.02, 0.02, 0.02))
+
+        # 抽出されなかった層がある場合は、抽出した対象の失敗率を使う
+        few = SamplingPlan(count=1).select(keys[:10], list(range(10)), [0.0] * 10)
+        bound = few.failure_bound(few.indices)
+        self.assertEqual((bound['sampled'], bound['failures'], bound['rate']), (1, 1, 1.0))
+        self.assertLess(bound['low'], 1.0)
+        self.assertEqual(bound['high'], 1.0)
+
+    def test_validate_directories_with_sampling(self):
+        """抽出したファイルだけを検証し、サマリーに抽出検証の結果が記録されること"""
+        from xml_content_validator_v2 import validate_directories
+        from xml_sampling import SamplingPlan
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            for i in range(8):
+                (input_dir / f"f{i}.xml").write_text(build_law_xml(5 + i), encoding='utf-8')
+            with redirect_stdout(io.StringIO()):
+                process_folder(input_dir, output_dir)
+                exit_code = validate_directories(input_dir, output_dir, jobs=1, sampling=SamplingPlan(count=3))
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(len(list((output_dir / "validation_results").glob("*_validation.md"))), 3)
+            summary = (output_dir / "validation_results" / "validation_summary.md").read_text(encoding='utf-8')
+            self.assertIn("抽出検証: 3/8 ファイル", summary)
+
+
+class TestValueCache(unittest.TestCase):
+    """抽出値キャッシュのテスト"""
+
+    def test_reuses_values_and_skips_diff_when_digests_match(self):
+        """同じ内容のファイルは再抽出せず、ダイジェストが一致すれば差分計算を行わないこと"""
+        import xml_content_validator_v2 as validator
+        from xml_value_cache import ValueCache
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = Path(temp_dir) / "input.xml"
+            output_file = Path(temp_dir) / "output.xml"
+            input_file.write_text(build_law_xml(), encoding='utf-8')
+            convert_xml(input_file, output_file)
+            expected = validator.load_value_lists(input_file, output_file)
+
+            with ValueCache(Path(temp_dir) / "values.sqlite") as cache:
+                values1, values2, result = validator.compare_files(input_file, output_file, cache)
+                self.assertEqual((values1, values2), expected)
+                self.assertTrue(result['identical'])
+                self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+                with mock.patch.object(validator, 'compare_value_lists') as compare:
+                    _, _, result = validator.compare_files(input_file, output_file, cache)
+                compare.assert_not_called()
+                self.assertTrue(result['identical'])
+                self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+                # 順序だけが異なる値リストはダイジェストも異なる
+                self.assertNotEqual(validator.values_digest(["a", "b"]), validator.values_digest(["b", "a"]))
+                self.assertNotEqual(validator.values_digest(["ab"]), validator.values_digest(["a", "b"]))
+
+            # 抽出ロジックのバージョンが変わると保存済みの値は破棄される
+            with mock.patch.object(validator, '_extraction_version', 'changed'):
+                with ValueCache(Path(temp_dir) / "values.sqlite") as cache:
+                    self.assertEqual(cache.total_bytes, 0)
+
+    def test_eviction_keeps_cache_under_limit(self):
+        """合計サイズが上限を超えると古い値リストから削除されること"""
+        from xml_value_cache import ValueCache
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with ValueCache(Path(temp_dir) / "values.sqlite", max_bytes=2000) as cache:
+                for i in range(20):
+                    cache.put(f"key{i}", "digest", [f"値{i}-{j}" * 5 for j in range(20)])
+                self.assertLessEqual(cache.total_bytes, 2000)
+                keys = {row[0] for row in cache.conn.execute("SELECT key FROM entries")}
+                self.assertIn("key19", keys)
+                self.assertNotIn("key0", keys)
+
+
+class TestResultCache(unittest.TestCase):
+    """Webアプリ用の変換結果キャッシュのテスト"""
+
+    def _entry(self, size):
+        return {"output": b"x" * size, "result": {"identical": True, "missing_in_2": []},
+                "report": None, "error": None}
+
+    def test_key_depends_on_content_name_and_converter_version(self):
+        """内容・ファイル名・変換ロジックのバージョンのいずれかが変わるとキーも変わること"""
+        from xml_result_cache import ResultCache
+
+        key = ResultCache.key(b"<Law/>", "a.xml")
+        self.assertEqual(key, ResultCache.key(b"<Law/>", "a.xml"))
+        self.assertNotEqual(key, ResultCache.key(b"<Law />", "a.xml"))
+        self.assertNotEqual(key, ResultCache.key(b"<Law/>", "b.xml"))
+        with mock.patch.object(xml_converter, '_converter_version', 'changed'):
+            self.assertNotEqual(key, ResultCache.key(b"<Law/>", "a.xml"))
+
+    def test_memory_and_disk_tiers_stay_under_limits(self):
+        """小さい結果はメモリに、大きい結果はファイルに保存され、どちらも上限を超えないこと"""
+        from xml_result_cache import ResultCache
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "results.sqlite"
+            with ResultCache(path, max_bytes=20000, memory_max_bytes=2000,
+                             memory_entry_max_bytes=500) as cache:
+                report = {"output": b"<Law/>", "result": {"identical": False, "missing_in_2": ["値"]},
+                          "report": "# レポート".encode('utf-8'), "error": None}
+                cache.put("small", report)
+                self.assertEqual(cache.get("small"), report)
+                self.assertEqual(cache.total_bytes, 0)
+
+                for i in range(10):
+                    cache.put(f"memory{i}", self._entry(400))
+                self.assertLessEqual(cache.memory_bytes, 2000)
+                self.assertIsNone(cache.get("small"))
+                self.assertIsNotNone(cache.get("memory9"))
+
+                for i in range(20):
+                    cache.put(f"disk{i}", {"output": os.urandom(3000), "result": {"identical": True},
+                                           "report": None, "error": None})
+                self.assertLessEqual(cache.total_bytes, 20000)
+                self.assertIsNone(cache.get("disk0"))
+                self.assertEqual(len(cache.get("disk19")["output"]), 3000)
+
+            # ファイルに保存した結果は別のプロセス（インスタンス）からも使える
+            with ResultCache(path) as cache:
+                self.assertIsNotNone(cache.get("disk19"))
+                self.assertIsNone(cache.get("memory9"))
+
+                # 同じキーに保存し直しても合計サイズは置き換えた分だけ変わる
+                total = cache.total_bytes
+                cache.put("disk19", {"output": os.urandom(3000), "result": {"identical": True},
+                                     "report": None, "error": None})
+                self.assertEqual(cache.total_bytes, total)
+                self.assertEqual(cache.total_bytes, cache.conn.execute("SELECT SUM(size) FROM results").fetchone()[0])
+
+
+class TestBatchJob(unittest.TestCase):
+    """Webアプリの一括変換ジョブのテスト"""
+
+    def test_poll_collects_results_as_they_finish(self):
+        """完了したファイルから結果を取り込み、状態の表・レポート・ZIPに反映すること"""
+        import threading
+        import zipfile
+        from concurrent.futures import ThreadPoolExecutor
+        from xml_batch_job import BatchJob, STATUS_PASSED, STATUS_FAILED, STATUS_PENDING
+
+        uploads = [("a.xml", build_law_xml().encode('utf-8')), ("broken.xml", b"<Law>")]
+        metrics = xml_converter.ConversionMetrics()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            release = threading.Event()
+            with mock.patch('xml_batch_job.convert_upload_task', side_effect=lambda *args: release.wait(10)):
+                # ワーカーが空くまで実行されないファイルは待機中で、閉じると取り消される
+                pending = BatchJob(uploads, executor=executor)
+                self.assertEqual(pending.status("broken.xml"), STATUS_PENDING)
+                pending.close()
+                release.set()
+                self.assertTrue(pending.futures["broken.xml"].cancelled())
+                self.assertFalse(pending.work_dir.exists())
+
+            job = BatchJob(iter(uploads), executor=executor, observers=[metrics], compresslevel=0, spool_bytes=10)
+            with self.assertRaises(RuntimeError):
+                job.read_zip()
+            finished = []
+            with redirect_stdout(io.StringIO()):
+                while not job.done:
+                    finished.extend(job.poll())
+                    time.sleep(0.01)
+            self.assertEqual(finished, ["a.xml", "broken.xml"])
+            self.assertEqual(job.status("a.xml"), STATUS_PASSED)
+            self.assertEqual(job.status("broken.xml"), STATUS_FAILED)
+            self.assertEqual(job.completed_names(), ["a.xml"])
+            self.assertEqual((metrics.total, metrics.converted, metrics.failed), (2, 1, 1))
+            self.assertEqual([row["ファイル"] for row in job.rows()], ["a.xml", "broken.xml"])
+
+            # 完了したファイルは取り込んだ時点でZIPに追加され、すべて完了すると変換エラーの記録を加えて完成する
+            archive = zipfile.ZipFile(io.BytesIO(job.read_zip()))
+            self.assertEqual(archive.namelist(), ["a_split.xml", "validation_results/conversion_errors.md"])
+            self.assertIn("### 1. broken.xml",
+                          archive.read("validation_results/conversion_errors.md").decode('utf-8'))
+            self.assertEqual(job.zip_size, len(job.read_zip()))
+            job.close()
+
+    def test_difference_writes_report(self):
+        """差異が検出されたファイルは検証レポートが作成されること"""
+        from xml_batch_job import convert_upload_task, STATUS_DIFFERENT
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = Path(temp_dir) / "input.xml"
+            input_file.write_text(build_law_xml(), encoding='utf-8')
+            different = {"identical": False, "missing_in_2": ["値"], "extra_in_2": [], "order_differences": [],
+                         "total_values_1": 1, "total_values_2": 0}
+            with mock.patch('xml_batch_job.convert_and_validate', return_value=(1, different)):
+                entry = convert_upload_task(str(input_file), str(Path(temp_dir) / "output.xml"), temp_dir,
+                                            "input.xml")
+            self.assertEqual(entry["status"], STATUS_DIFFERENT)
+            self.assertEqual(entry["report"], "input_validation_report.md")
+            report = (Path(temp_dir) / entry["report"]).read_text(encoding='utf-8')
+            self.assertIn("ファイル2に欠落している値 (1 件)", report)
+
+
+class TestSharedWorkerPool(unittest.TestCase):
+    """セッション間で共有するワーカープールのテスト"""
+
+    def test_sessions_are_served_fairly_under_limit(self):
+        """同時実行数の上限を守り、待ちのあるセッションを交互に実行すること"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from xml_worker_pool import SharedWorkerPool
+
+        started = []
+        release = threading.Event()
+
+        def task(name):
+            started.append(name)
+            release.wait(10)
+            return name
+
+        with mock.patch.object(SharedWorkerPool, '_create_executor', return_value=ThreadPoolExecutor(4)):
+            pool = SharedWorkerPool(max_workers=4, max_running=1)
+        a_futures = [pool.submit("A", task, f"A{i}") for i in range(3)]
+        b_futures = [pool.submit("B", task, f"B{i}") for i in range(2)]
+        self.assertEqual(pool.stats("B"), {"running": 1, "max_running": 1, "queued": 4, "sessions": 2,
+                                            "session_queued": 2})
+
+        # 待ち行列にあるタスクは取り消せる
+        self.assertTrue(a_futures[2].cancel())
+        self.assertEqual(pool.stats("A")["session_queued"], 1)
+
+        release.set()
+        self.assertEqual([future.result(5) for future in b_futures], ["B0", "B1"])
+        self.assertEqual(a_futures[1].result(5), "A1")
+        self.assertEqual(started, ["A0", "B0", "A1", "B1"])
+        self.assertEqual(pool.stats()["running"], 0)
+        self.assertEqual((pool.served, pool.session_running), ({}, {}))
+        pool.shutdown()
+
+
+class TestLineIndex(unittest.TestCase):
+    """プレビュー用の行オフセット索引のテスト"""
+
+    def test_pages_match_split_lines(self):
+        """バイト列・ファイルのどちらから作成しても、行の切り出しが split の結果と一致すること"""
+        from xml_preview import LineIndex
+
+        text = build_law_xml(30).replace('><', '>\n<') + "末尾の行\n\n"
+        data = text.encode('utf-8')
+        expected = text.split('\n')[:-1]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "preview.xml"
+            path.write_bytes(data)
+            for index in (LineIndex.from_bytes(data), LineIndex.from_file(path, chunk_size=7)):
+                self.assertEqual(len(index), len(expected))
+                self.assertEqual(index.lines(0, len(expected)).split('\n'), expected)
+                self.assertEqual(index.lines(10, 5).split('\n'), expected[10:15])
+                self.assertEqual(index.lines(len(expected) - 2, 10).split('\n'), expected[-2:])
+                self.assertEqual(index.lines(len(expected), 10), "")
+
+        self.assertEqual(len(LineIndex.from_bytes(b"")), 0)
+        self.assertEqual(len(LineIndex.from_bytes(b"<Law/>")), 1)
+
+
+class TestSchemaValidation(unittest.TestCase):
+    """XSDスキーマ検証のテスト"""
+
+    def test_schema_allows_converted_lists(self):
+        """補ったスキーマではParagraphSentenceの子としてListを許可すること"""
+        import re
+        from xml_schema_validator import DEFAULT_SCHEMA, allow_converted_lists
+
+        patched = allow_converted_lists(DEFAULT_SCHEMA.read_text(encoding='utf-8'))
+        definition = re.search(r'<xs:element name="ParagraphSentence">.*?</xs:choice>', patched, re.DOTALL)
+        self.assertIn('ref="List"', definition.group(0))
+        self.assertIn('ref="Sentence"', definition.group(0))
+
+    def test_missing_library_is_reported_as_skipped(self):
+        """検証ライブラリがない場合はスキップとして通知され、検証失敗にはならないこと"""
+        import xml_schema_validator
+        from xml_content_validator_v2 import validate_files
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            input_dir.mkdir()
+            (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            metrics = xml_converter.ConversionMetrics()
+            recorder = RecordingObserver()
+            recorder.file_schema_checked = lambda name, result: recorder.events.append(("schema", result['status']))
+            with mock.patch.object(xml_schema_validator, 'schema_backend', return_value=None):
+                with redirect_stdout(io.StringIO()):
+                    process_folder(input_dir, Path(temp_dir) / "output", validate=True,
+                                   schema=xml_schema_validator.DEFAULT_SCHEMA, observers=[metrics, recorder])
+                    exit_code = validate_files(input_dir / "a.xml", Path(temp_dir) / "output" / "a.xml",
+                                               output=Path(temp_dir) / "report.md",
+                                               schema=xml_schema_validator.DEFAULT_SCHEMA)
+            self.assertIn(("schema", "skipped"), recorder.events)
+            self.assertEqual(metrics.as_dict()["schema_failed"], 0)
+            self.assertEqual(exit_code, 0)
+            self.assertIn("スキーマ検証を省略しました", (Path(temp_dir) / "report.md").read_text(encoding='utf-8'))
+
+    @unittest.skipUnless(__import__('xml_schema_validator').schema_backend() == 'xmlschema',
+                         "xmlschema がインストールされていません")
+    def test_converted_output_is_valid_and_violations_are_reported(self):
+        """変換後のXMLはスキーマに適合し、List以下の構造の誤りは違反として報告されること"""
+        from xml_schema_validator import DEFAULT_SCHEMA, validate_schema
+
+        # スキーマに適合する入力の最初の段落を、変換対象となる10文の段落に置き換える
+        tree = ET.parse(Path(__file__).parent / "unit_test" / "test_case_01_default_args" / "test_input.xml")
+        paragraph_sentence = tree.getroot().find('.//ParagraphSentence')
+        paragraph_sentence.clear()
+        for i in range(1, 11):
+            ET.SubElement(paragraph_sentence, 'Sentence', Num=str(i)).text = f"（{i}）　項目{i}"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = Path(temp_dir) / "in.xml"
+            tree.write(source, encoding='utf-8', xml_declaration=True)
+            self.assertEqual(validate_schema(source, allow_converted=False)['status'], 'passed')
+            output_file = Path(temp_dir) / "out.xml"
+            _, result = xml_converter.convert_and_validate(source, output_file, schema=DEFAULT_SCHEMA)
+            self.assertEqual(result['schema']['status'], 'passed')
+            self.assertEqual(validate_schema(output_file)['status'], 'passed')
+            # 元のスキーマ（List不可）では変換後のXMLは違反になる
+            self.assertEqual(validate_schema(output_file, allow_converted=False)['status'], 'failed')
+
+            root = ET.parse(output_file).getroot()
+            column = root.find('.//ListSentence/Column')
+            column.clear()
+            broken = validate_schema(root)
+            self.assertEqual(broken['status'], 'failed')
+            self.assertGreater(broken['error_count'], 0)
+
+
+class TestConvertAndValidate(unittest.TestCase):
+    """変換と検証を1回のパースで行う convert_and_validate のテスト"""
+
+    def test_output_identical_to_convert_xml_and_validated(self):
+        """出力はconvert_xmlと同一で、検証結果はファイルから検証した場合と一致すること"""
+        from xml_content_validator_v2 import load_value_lists, compare_value_lists
+
+        arith_input = Path(__file__).parent / "unit_test" / "test_case_06_child_elements_missing" / "test_with_arithformula.xml"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            input_file = temp_path / "in.xml"
+            input_file.write_text(build_law_xml(), encoding='utf-8')
+            for source in (input_file, arith_input):
+                converted_count, result = xml_converter.convert_and_validate(source, temp_path / "fused.xml")
+                self.assertEqual(converted_count, convert_xml(source, temp_path / "plain.xml"))
+                self.assertEqual((temp_path / "fused.xml").read_bytes(), (temp_path / "plain.xml").read_bytes())
+                expected = compare_value_lists(*load_value_lists(source, temp_path / "plain.xml"))
+                self.assertEqual(result, expected)
+
+    def test_process_folder_validate_notifies_results(self):
+        """process_folder(validate=True) で検証結果が通知されること（ワーカー経由でも同じ）"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            input_dir.mkdir()
+            (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            for jobs in (None, 2):
+                metrics = xml_converter.ConversionMetrics()
+                recorder = RecordingObserver()
+                recorder.file_validated = lambda name, identical: recorder.events.append(("validated", name, identical))
+                with redirect_stdout(io.StringIO()):
+                    process_folder(input_dir, Path(temp_dir) / "output", jobs=jobs, validate=True,
+                                   observers=[metrics, recorder])
+                self.assertIn(("validated", "a.xml", True), recorder.events)
+                self.assertEqual(metrics.as_dict()["validation_failed"], 0)
+
+    def test_main_folder_validate_mismatch_exits_nonzero(self):
+        """フォルダ処理の --validate で差異が検出された場合、終了コード3でエラーレポートに記録されること"""
+        real_convert_and_validate = xml_converter.convert_and_validate
+
+        def mismatched(*args, **kwargs):
+            converted_count, result = real_convert_and_validate(*args, **kwargs)
+            return converted_count, dict(result, identical=False)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            argv = ["xml_converter.py", str(input_dir), str(output_dir), "--validate"]
+            stdout = io.StringIO()
+            with mock.patch.object(sys, 'argv', argv), redirect_stdout(stdout):
+                self.assertEqual(xml_converter.main(), 0)
+                with mock.patch.object(xml_converter, 'convert_and_validate', mismatched):
+                    self.assertEqual(xml_converter.main(), xml_converter.EXIT_FILES_FAILED)
+
+            self.assertIn("検証で差異検出: 1 個", stdout.getvalue())
+            report = (output_dir / "validation_results" / "conversion_errors.md").read_text(encoding='utf-8')
+            self.assertIn("a.xml - 値の検証で差異検出", report)
+
+    def _folder_with_broken_file(self, temp_dir):
+        input_dir = Path(temp_dir) / "input"
+        input_dir.mkdir()
+        (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+        (input_dir / "broken.xml").write_text("<Law><Sentence>", encoding='utf-8')
+        return input_dir
+
+    def test_main_folder_with_broken_file_exits_files_failed(self):
+        """フォルダ内の1ファイルが変換エラーの場合、他のファイルを変換して終了コード3を返すこと"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = self._folder_with_broken_file(temp_dir)
+            output_dir = Path(temp_dir) / "output"
+            argv = ["xml_converter.py", str(input_dir), str(output_dir)]
+            with mock.patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()):
+                self.assertEqual(xml_converter.main(), xml_converter.EXIT_FILES_FAILED)
+            self.assertTrue((output_dir / "a.xml").exists())
+            report = (output_dir / "validation_results" / "conversion_errors.md").read_text(encoding='utf-8')
+            self.assertIn("broken.xml", report)
+
+    @unittest.skipUnless(shutil.which("bash"), "bash が必要")
+    def test_process_and_validate_script_continues_after_conversion_error(self):
+        """process_and_validate.sh は変換エラーがあっても検証まで実行し、サマリーに変換エラーを含めること"""
+        repo_dir = Path(__file__).resolve().parent
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = self._folder_with_broken_file(temp_dir)
+            output_dir = Path(temp_dir) / "output"
+            completed = subprocess.run(["bash", str(repo_dir / "process_and_validate.sh"), str(input_dir),
+                                        str(output_dir)], cwd=repo_dir, capture_output=True, text=True)
+            self.assertEqual(completed.returncode, 1, completed.stdout + completed.stderr)
+            self.assertIn("検証処理を続行します", completed.stdout)
+            summary = (output_dir / "validation_results" / "validation_summary.md").read_text(encoding='utf-8')
+            self.assertIn("conversion_errors.md", summary)
+
+
+class TestReadFilePairs(unittest.TestCase):
+    """--files-from のファイルリスト読み込みのテスト"""
+
+    def _write_list(self, data):
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.txt', delete=False) as f:
+            f.write(data.encode('utf-8'))
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def test_newline_delimited_pairs(self):
+        """改行区切り・タブ区切りの組を読み込み、空行は無視すること"""
+        list_path = self._write_list("a.xml\tout/a.xml\r\n\nsub dir/b.xml\tout/b.xml\n")
+        pairs = read_file_pairs(list_path)
+        self.assertEqual(pairs, [(Path("a.xml"), Path("out/a.xml")),
+                                 (Path("sub dir/b.xml"), Path("out/b.xml"))])
+
+    def test_null_delimited_pairs_allow_newlines(self):
+        """NUL区切りの場合はパス中の改行を保持すること"""
+        list_path = self._write_list("a\nb.xml\tout.xml\0")
+        self.assertEqual(read_file_pairs(list_path, null_delimited=True),
+                         [(Path("a\nb.xml"), Path("out.xml"))])
+
+    def test_missing_output_is_rejected(self):
+        """出力パスのないレコードはエラーになること"""
+        list_path = self._write_list("a.xml\n")
+        with self.assertRaises(ValueError):
+            read_file_pairs(list_path)
+
+
+class TestWatchFolder(unittest.TestCase):
+    """監視モード（変更ファイルのみの再変換）のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = Path(self.temp_dir.name) / "input"
+        self.output_dir = Path(self.temp_dir.name) / "output"
+        self.input_dir.mkdir()
+        (self.input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+        (self.input_dir / "b.xml").write_text(build_law_xml(), encoding='utf-8')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _watch(self, **kwargs):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            watch_folder(self.input_dir, self.output_dir, interval=0, debounce=0, max_polls=1, **kwargs)
+        return out.getvalue()
+
+    def test_converts_only_changed_files(self):
+        """初回は全ファイル、以降は変更されたファイルだけを変換すること"""
+        log = self._watch()
+        self.assertIn("完了: a.xml", log)
+        self.assertIn("完了: b.xml", log)
+        self.assertIn("検証成功", log)
+
+        # 変更のない状態で再起動しても再変換しない
+        self.assertNotIn("処理中", self._watch())
+
+        # 入力を更新したファイルだけを再変換する
+        a_input = self.input_dir / "a.xml"
+        a_input.write_text(build_law_xml(sentence_count=11), encoding='utf-8')
+        later = (self.output_dir / "a.xml").stat().st_mtime_ns + 1_000_000_000
+        os.utime(a_input, ns=(later, later))
+        log = self._watch(validate=False)
+        self.assertIn("完了: a.xml", log)
+        self.assertNotIn("b.xml", log)
+
+    def test_waits_for_writes_to_settle(self):
+        """debounce時間内に検出した変更はまだ変換しないこと"""
+        out = io.StringIO()
+        with redirect_stdout(out):
+            watch_folder(self.input_dir, self.output_dir, interval=0, debounce=60, max_polls=1)
+        self.assertNotIn("処理中", out.getvalue())
+        self.assertFalse((self.output_dir / "a.xml").exists())
+
+    def test_drops_files_deleted_before_settling(self):
+        """変更が落ち着く前に削除されたファイルは、エラーにせず変換対象から外すこと"""
+        real_sleep = time.sleep
+
+        def delete_then_sleep(seconds):
+            (self.input_dir / "a.xml").unlink(missing_ok=True)
+            real_sleep(seconds)
+
+        out = io.StringIO()
+        with redirect_stdout(out), mock.patch.object(time, 'sleep', delete_then_sleep):
+            watch_folder(self.input_dir, self.output_dir, interval=0.2, debounce=0.1, max_polls=2)
+        log = out.getvalue()
+        self.assertNotIn("a.xml", log)
+        self.assertNotIn("エラー", log)
+        self.assertIn("完了: b.xml", log)
+
+
+class TestPipeline(unittest.TestCase):
+    """段階パイプライン実行のテスト"""
+
+    def test_pipeline_matches_convert_xml_and_passes_errors_through(self):
+        """パイプラインの出力がconvert_xmlと同一で、失敗したファイルは後段をスキップすること"""
+        from xml_pipeline import run_pipeline
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            tasks = []
+            for i in range(6):
+                input_file = temp_path / f"in{i}.xml"
+                input_file.write_text(build_law_xml(sentence_count=9 + i % 2), encoding='utf-8')
+                tasks.append((input_file, temp_path / f"out{i}.xml", input_file.name))
+            broken = temp_path / "broken.xml"
+            broken.write_text("<Law>", encoding='utf-8')
+            tasks.append((broken, temp_path / "broken_out.xml", broken.name))
+
+            results, stats = run_pipeline(tasks, validate=True, queue_size=1)
+
+            self.assertEqual([stage.name for stage in stats],
+                             ["parse", "transform", "serialize", "write", "validate"])
+            self.assertEqual(len(results), len(tasks))
+            by_name = {item.display_name: item for item in results}
+            self.assertEqual(by_name["broken.xml"].error["error_type"], "XML構文エラー")
+            self.assertFalse((temp_path / "broken_out.xml").exists())
+            for i in range(6):
+                item = by_name[f"in{i}.xml"]
+                self.assertIsNone(item.error)
+                self.assertTrue(item.identical)
+                self.assertEqual(item.converted_count, i % 2)
+                expected = temp_path / f"expected{i}.xml"
+                convert_xml(temp_path / f"in{i}.xml", expected)
+                self.assertEqual((temp_path / f"out{i}.xml").read_bytes(), expected.read_bytes())
+            self.assertTrue(all(stage.queue_max <= 1 for stage in stats))
+
+    def test_pipeline_with_jobs_runs_cpu_stages_in_processes(self):
+        """jobs指定時はconvert段階にまとめてワーカープロセスで実行し、出力・失敗の扱いは同じであること"""
+        from xml_pipeline import run_pipeline
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            tasks = []
+            for i in range(4):
+                input_file = temp_path / f"in{i}.xml"
+                input_file.write_text(build_law_xml(sentence_count=9 + i % 2), encoding='utf-8')
+                tasks.append((input_file, temp_path / f"out{i}.xml", input_file.name))
+            broken = temp_path / "broken.xml"
+            broken.write_text("<Law>", encoding='utf-8')
+            tasks.insert(1, (broken, temp_path / "broken_out.xml", broken.name))
+
+            results, stats = run_pipeline(tasks, validate=True, queue_size=1, jobs=2)
+
+            self.assertEqual([stage.name for stage in stats], ["convert", "write", "validate"])
+            self.assertEqual([item.display_name for item in results], [task[2] for task in tasks])
+            by_name = {item.display_name: item for item in results}
+            self.assertEqual(by_name["broken.xml"].error["error_type"], "XML構文エラー")
+            self.assertFalse((temp_path / "broken_out.xml").exists())
+            for i in range(4):
+                item = by_name[f"in{i}.xml"]
+                self.assertIsNone(item.error)
+                self.assertTrue(item.identical)
+                self.assertEqual(item.converted_count, i % 2)
+                expected = temp_path / f"expected{i}.xml"
+                convert_xml(temp_path / f"in{i}.xml", expected)
+                self.assertEqual((temp_path / f"out{i}.xml").read_bytes(), expected.read_bytes())
+            self.assertEqual(stats[0].items, 5)
+            self.assertEqual(stats[2].items, 4)
+
+    def test_process_folder_pipeline_notifies_observers(self):
+        """process_folder の pipeline モードでも進捗イベントが通知されること"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            input_dir.mkdir()
+            (input_dir / "a.xml").write_text(build_law_xml(), encoding='utf-8')
+            observer = RecordingObserver()
+            with redirect_stdout(io.StringIO()):
+                process_folder(input_dir, Path(temp_dir) / "output", pipeline=True, observers=[observer])
+
+            self.assertIn(("file_converted", "a.xml", 1), observer.events)
+            self.assertEqual(observer.events[-1], ("batch_finished", 1, 0))
+
+
+class TestAsyncAPI(unittest.TestCase):
+    """asyncio APIのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_convert_bytes_async_matches_convert_xml(self):
+        """バイト列の非同期変換がファイル変換と同じ結果になること"""
+        import asyncio
+        from xml_converter_async import convert_bytes_async
+
+        input_file = self.temp_path / "in.xml"
+        input_file.write_text(build_law_xml(), encoding='utf-8')
+        convert_xml(input_file, self.temp_path / "out.xml")
+
+        converted = asyncio.run(convert_bytes_async(input_file.read_bytes()))
+        self.assertEqual(converted, (self.temp_path / "out.xml").read_bytes())
+
+    def test_convert_many_yields_results_and_errors(self):
+        """全ファイルの結果を返し、変換エラーは結果に記録されること"""
+        import asyncio
+        from xml_converter_async import convert_many
+
+        pairs = []
+        for i in range(5):
+            input_file = self.temp_path / f"in{i}.xml"
+            input_file.write_text(build_law_xml(), encoding='utf-8')
+            pairs.append((input_file, self.temp_path / f"out{i}.xml"))
+        broken = self.temp_path / "broken.xml"
+        broken.write_text("<Law>", encoding='utf-8')
+        pairs.append((broken, self.temp_path / "broken_out.xml"))
+
+        async def collect():
+            return [result async for result in convert_many(pairs, concurrency=2)]
+
+        results = asyncio.run(collect())
+        self.assertEqual(len(results), 6)
+        failed = [r for r in results if not r.ok]
+        self.assertEqual([r.input_file for r in failed], [broken])
+        self.assertEqual(failed[0].error["error_type"], "XML構文エラー")
+        for i in range(5):
+            self.assertTrue((self.temp_path / f"out{i}.xml").exists())
+        self.assertEqual(list(self.temp_path.glob(".*.tmp")), [])
+
+    def test_stopping_early_leaves_no_partial_outputs(self):
+        """途中で反復を終えても一時ファイルが残らないこと"""
+        import asyncio
+        from xml_converter_async import convert_many
+
+        pairs = []
+        for i in range(20):
+            input_file = self.temp_path / f"in{i}.xml"
+            input_file.write_text(build_law_xml(), encoding='utf-8')
+            pairs.append((input_file, self.temp_path / f"out{i}.xml"))
+
+        async def first_only():
+            results = convert_many(pairs, concurrency=4)
+            async for result in results:
+                await results.aclose()
+                return result
+
+        self.assertTrue(asyncio.run(first_only()).ok)
+        time.sleep(0.1)  # 書き込みスレッドの後始末を待つ
+        self.assertEqual(list(self.temp_path.glob(".*.tmp")), [])
+        self.assertLess(len(list(self.temp_path.glob("out*.xml"))), 20)
+
+
 if __name__ == '__main__':
     unittest.main()
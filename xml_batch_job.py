@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Webアプリの一括変換ジョブ
+
+アップロードされたファイルをワーカープール（concurrent.futures のエグゼキュータ）に投入し、
+完了したものから結果を取り込みます。Streamlitのスクリプトは再実行のたびに poll で完了分を取り込み、
+進捗と状態の表を描画するため、変換中も画面が固まらず、完了したファイルから順にダウンロードできます。
+ジョブの入出力は一時フォルダに置き、ジョブを閉じる（またはジョブが破棄される）と削除します。
+"""
+
+import shutil
+import tempfile
+import time
+import weakref
+from datetime import datetime
+from pathlib import Path
+
+from xml_converter import (convert_and_validate, write_conversion_error_report, _build_error_info,
+                           _format_error_message, _notify)
+
+# ファイルごとの状態
+STATUS_PENDING = "待機中"
+STATUS_RUNNING = "変換中"
+STATUS_PASSED = "検証成功"
+STATUS_DIFFERENT = "差異検出"
+STATUS_VALIDATION_ERROR = "検証エラー"
+STATUS_FAILED = "変換エラー"
+
+STATUS_MARKS = {
+    STATUS_PENDING: "⏳",
+    STATUS_RUNNING: "🔄",
+    STATUS_PASSED: "✅",
+    STATUS_DIFFERENT: "❌",
+    STATUS_VALIDATION_ERROR: "⚠️",
+    STATUS_FAILED: "⚠️",
+}
+
+def output_filename(filename):
+    """出力ファイル名（入力ファイル名_split.xml）"""
+    path = Path(filename)
+    return f"{path.stem}_split{path.suffix}"
+
+def build_validation_report(input_filename, output_filename, result):
+    """差異が検出された検証結果のMarkdownレポート（バイト列）を作成"""
+    report_lines = []
+    report_lines.append("# XML値比較レポート (構造無視)")
+    report_lines.append("")
+    report_lines.append(f"- **ファイル1**: `{input_filename}` - {result['total_values_1']} 個の値")
+    report_lines.append(f"- **ファイル2**: `{output_filename}` - {result['total_values_2']} 個の値")
+    report_lines.append(f"- **比較日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    report_lines.append("")
+    report_lines.append("## ❌ 検証結果: 差異検出")
+    report_lines.append("")
+    report_lines.append("以下の差異が見つかりました:")
+    report_lines.append("")
+
+    if result['missing_in_2']:
+        report_lines.append(f"### 📝 ファイル2に欠落している値 ({len(result['missing_in_2'])} 件)")
+        report_lines.append("")
+        for i, value in enumerate(result['missing_in_2'][:50]):  # 最大50件表示
+            report_lines.append(f"{i+1}. `{repr(value[:200])}`")
+        if len(result['missing_in_2']) > 50:
+            report_lines.append(f"**... 他 {len(result['missing_in_2']) - 50} 件**")
+        report_lines.append("")
+
+    if result['extra_in_2']:
+        report_lines.append(f"### 📝 ファイル2に追加されている値 ({len(result['extra_in_2'])} 件)")
+        report_lines.append("")
+        for i, value in enumerate(result['extra_in_2'][:50]):
+            report_lines.append(f"{i+1}. `{repr(value[:200])}`")
+        if len(result['extra_in_2']) > 50:
+            report_lines.append(f"**... 他 {len(result['extra_in_2']) - 50} 件**")
+        report_lines.append("")
+
+    if result['order_differences']:
+        report_lines.append(f"### 🔄 順序または内容の差異 ({len(result['order_differences'])} 件)")
+        report_lines.append("")
+        for diff in result['order_differences'][:50]:
+            report_lines.append(f"**位置 {diff['position']}:**")
+            report_lines.append(f"- ファイル1: `{repr(diff['file1'][:200])}`")
+            report_lines.append(f"- ファイル2: `{repr(diff['file2'][:200])}`")
+            report_lines.append("")
+        if len(result['order_differences']) > 50:
+            report_lines.append(f"**... 他 {len(result['order_differences']) - 50} 件**")
+            report_lines.append("")
+
+    report_lines.append("## 📋 検証完了")
+    report_lines.append("")
+    report_lines.append(f"- 総差異数: {diff_count(result)} 件")
+
+    return '\n'.join(report_lines).encode('utf-8')
+
+def build_error_report(input_filename, output_filename, error, error_traceback):
+    """検証中に発生したエラーの詳細レポート（バイト列）を作成"""
+    error_report_lines = []
+    error_report_lines.append("# XML検証エラー詳細レポート")
+    error_report_lines.append("")
+    error_report_lines.append(f"- **入力ファイル**: `{input_filename}`")
+    error_report_lines.append(f"- **出力ファイル**: `{output_filename}`")
+    error_report_lines.append(f"- **エラー発生日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    error_report_lines.append("")
+    error_report_lines.append("## ❌ エラー情報")
+    error_report_lines.append("")
+    error_report_lines.append(f"**エラータイプ**: `{type(error).__name__}`")
+    error_report_lines.append(f"**エラーメッセージ**: `{str(error)}`")
+    error_report_lines.append("")
+    error_report_lines.append("## 📋 エラー詳細（Traceback）")
+    error_report_lines.append("")
+    error_report_lines.append("```")
+    error_report_lines.append(error_traceback)
+    error_report_lines.append("```")
+
+    return '\n'.join(error_report_lines).encode('utf-8')
+
+def diff_count(result):
+    """検証結果の差異の総数"""
+    return len(result['missing_in_2']) + len(result['extra_in_2']) + len(result['order_differences'])
+
+def convert_upload_task(input_file, output_file, report_dir, filename):
+    """ワーカーで1ファイルを変換・検証し、差異やエラーがあればレポートを report_dir に書き込む
+
+    Returns:
+        {"status": 状態, "converted_count": 変換したParagraphSentence数, "seconds": 処理時間,
+         "result": compare_value_lists の結果, "report": レポートのファイル名, "error": エラー情報}
+        （プロセス間で受け渡し可能な辞書）
+    """
+    started = time.perf_counter()
+    entry = {"status": STATUS_FAILED, "converted_count": 0, "seconds": 0.0, "result": None,
+             "report": None, "error": None}
+    try:
+        entry["converted_count"], entry["result"] = convert_and_validate(input_file, output_file)
+    except Exception as e:
+        Path(output_file).unlink(missing_ok=True)
+        entry["error"] = _build_error_info(e)
+        entry["seconds"] = time.perf_counter() - started
+        return entry
+
+    stem = Path(filename).stem
+    try:
+        if entry["result"]['identical']:
+            entry["status"] = STATUS_PASSED
+        else:
+            entry["status"] = STATUS_DIFFERENT
+            entry["report"] = f"{stem}_validation_report.md"
+            report = build_validation_report(filename, output_filename(filename), entry["result"])
+            (Path(report_dir) / entry["report"]).write_bytes(report)
+    except Exception as e:
+        import traceback
+        entry["status"] = STATUS_VALIDATION_ERROR
+        entry["error"] = _build_error_info(e)
+        entry["report"] = f"{stem}_validation_error.md"
+        report = build_error_report(filename, output_filename(filename), e, traceback.format_exc())
+        (Path(report_dir) / entry["report"]).write_bytes(report)
+    entry["seconds"] = time.perf_counter() - started
+    return entry
+
+def convert_upload_bytes(filename, data):
+    """ワーカーでアップロードされた1ファイルを変換・検証し、変換結果キャッシュのエントリを返す
+
+    Returns:
+        {"output": 変換後のXML, "result": compare_value_lists の結果,
+         "report": 差異またはエラーのレポート（なければ None）, "error": 検証エラーのトレースバック（なければ None）}
+        （xml_result_cache.ResultCache のエントリ）
+    """
+    split_filename = output_filename(filename)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = Path(temp_dir) / Path(filename).name
+        input_path.write_bytes(data)
+        output_path = Path(temp_dir) / split_filename
+
+        # XML変換と検証を1回のパースで実行（出力ファイルは読み直さない）
+        _, result = convert_and_validate(input_path, output_path)
+        output_data = output_path.read_bytes()
+
+    report = None
+    error_details = None
+    try:
+        if not result['identical']:
+            report = build_validation_report(filename, split_filename, result)
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        report = build_error_report(filename, split_filename, e, error_details)
+    return {"output": output_data, "result": result, "report": report, "error": error_details}
+
+def _default_executor(max_workers):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Streamlitのサーバーはマルチスレッドのため、fork ではなく spawn でワーカーを起動する
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+class BatchJob:
+    """アップロードされたファイルの一括変換ジョブ
+
+    完了したファイルの出力と検証レポートは、poll で取り込むたびにZIPに追加します。ZIPは
+    spool_bytes まではメモリに、それを超えるとジョブの一時フォルダのファイルに書き込まれるため、
+    ファイル数が多くてもZIP全体をメモリに保持しません。
+
+    Args:
+        uploads: (ファイル名, 内容のバイト列) の反復可能オブジェクト（1件ずつ一時フォルダに書き込む。
+                 同じ名前は後のものが優先）
+        executor: 変換を実行するエグゼキュータ（Noneの場合はジョブ専用のプロセスプールを作成し、
+                  完了時に終了する）
+        max_workers: ジョブ専用のプロセスプールのワーカー数
+        observers: 進捗イベントを受け取る ConversionObserver のリスト（poll を呼んだスレッドから送られる）
+        compresslevel: ZIPの圧縮レベル（0〜9。0は無圧縮）
+        spool_bytes: ZIPをメモリに保持するサイズの上限（超えるとファイルに書き出す）
+    """
+
+    def __init__(self, uploads, executor=None, max_workers=None, observers=None, compresslevel=6,
+                 spool_bytes=32 * 1024 * 1024):
+        import zipfile
+
+        self.work_dir = Path(tempfile.mkdtemp(prefix="xml_batch_"))
+        self._cleanup = weakref.finalize(self, shutil.rmtree, str(self.work_dir), True)
+        self.input_dir = self.work_dir / "input"
+        self.output_dir = self.work_dir / "output"
+        self.report_dir = self.output_dir / "validation_results"
+        self.input_dir.mkdir()
+        self.report_dir.mkdir(parents=True)
+        self.observers = list(observers or [])
+        self.owns_executor = executor is None
+        self.executor = _default_executor(max_workers) if executor is None else executor
+        self.started = time.monotonic()
+        self.finished_at = None
+
+        self.zip_spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes, dir=self.work_dir)
+        compression = zipfile.ZIP_DEFLATED if compresslevel else zipfile.ZIP_STORED
+        self.zip = zipfile.ZipFile(self.zip_spool, 'w', compression,
+                                   compresslevel=compresslevel if compresslevel else None)
+
+        self.names = []
+        self.results = {}
+        self.futures = {}
+        for name, data in uploads:
+            name = Path(name).name
+            (self.input_dir / name).write_bytes(data)
+            if name not in self.names:
+                self.names.append(name)
+        _notify(self.observers, 'batch_started', len(self.names))
+        for name in self.names:
+            self.futures[name] = self.executor.submit(convert_upload_task, str(self.input_dir / name),
+                                                      str(self.output_dir / name), str(self.report_dir), name)
+
+    @property
+    def total(self):
+        return len(self.names)
+
+    @property
+    def finished(self):
+        return len(self.results)
+
+    @property
+    def done(self):
+        return len(self.results) == len(self.names)
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.started
+
+    def poll(self):
+        """完了したファイルの結果を取り込み、新たに完了したファイル名のリストを返す"""
+        newly_finished = []
+        for name in self.names:
+            if name in self.results or not self.futures[name].done():
+                continue
+            future = self.futures[name]
+            try:
+                entry = future.result()
+            except Exception as e:
+                # ワーカーの異常終了（BrokenProcessPool）やキャンセルもファイルの変換エラーとして扱う
+                entry = {"status": STATUS_FAILED, "converted_count": 0, "seconds": 0.0, "result": None,
+                         "report": None, "error": _build_error_info(e)}
+            self.results[name] = entry
+            newly_finished.append(name)
+            if entry["status"] != STATUS_FAILED:
+                self._add_to_zip(name)
+            if entry["status"] == STATUS_FAILED:
+                _notify(self.observers, 'file_failed', name, entry["error"])
+            else:
+                _notify(self.observers, 'file_converted', name, entry["seconds"], entry["converted_count"])
+                if entry["result"] is not None:
+                    _notify(self.observers, 'file_validated', name, entry["result"]['identical'])
+        if newly_finished and self.done:
+            self.finished_at = time.monotonic()
+            errors = [{"file": name, **entry["error"]} for name, entry in self.results.items()
+                      if entry["status"] == STATUS_FAILED]
+            _notify(self.observers, 'batch_finished', self.total - len(errors), errors)
+            self._release_executor()
+            if errors:
+                self._add_error_report(errors)
+            # 中央ディレクトリを書き込んでZIPを完成させる
+            self.zip.close()
+        return newly_finished
+
+    def status(self, name):
+        """ファイルの現在の状態"""
+        if name in self.results:
+            return self.results[name]["status"]
+        return STATUS_RUNNING if self.futures[name].running() else STATUS_PENDING
+
+    def counts(self):
+        """状態ごとのファイル数"""
+        counts = {}
+        for name in self.names:
+            status = self.status(name)
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def rows(self):
+        """状態の表（1ファイル1行の辞書のリスト、アップロード順）"""
+        rows = []
+        for name in self.names:
+            status = self.status(name)
+            entry = self.results.get(name)
+            detail = ""
+            if entry is not None:
+                if entry["status"] == STATUS_DIFFERENT:
+                    detail = f"{diff_count(entry['result'])} 件の差異"
+                elif entry["error"] is not None:
+                    detail = _format_error_message(entry["error"])
+            rows.append({
+                "ファイル": name,
+                "状態": f"{STATUS_MARKS[status]} {status}",
+                "変換数": entry["converted_count"] if entry is not None else None,
+                "処理時間（秒）": round(entry["seconds"], 2) if entry is not None else None,
+                "詳細": detail,
+            })
+        return rows
+
+    def completed_names(self):
+        """出力のあるファイル名のリスト（アップロード順）"""
+        return [name for name in self.names
+                if name in self.results and self.results[name]["status"] != STATUS_FAILED]
+
+    def output_path(self, name):
+        return self.output_dir / name
+
+    def report_path(self, name):
+        """検証レポートのパス（レポートがなければ None）"""
+        entry = self.results.get(name)
+        if entry is None or entry["report"] is None:
+            return None
+        return self.report_dir / entry["report"]
+
+    def _add_to_zip(self, name):
+        """完了したファイルの出力（入力ファイル名_split.xml）と検証レポートをZIPに追加する"""
+        self.zip.write(self.output_path(name), output_filename(name))
+        report_path = self.report_path(name)
+        if report_path is not None:
+            self.zip.write(report_path, f"validation_results/{report_path.name}")
+
+    def _add_error_report(self, errors):
+        """変換エラーのファイルを validation_results/conversion_errors.md に記録してZIPに追加する"""
+        write_conversion_error_report(self.output_dir, "アップロードされたファイル", self.total,
+                                      self.total - len(errors), errors)
+        self.zip.write(self.error_report_path, "validation_results/conversion_errors.md")
+
+    @property
+    def error_report_path(self):
+        """変換エラーの詳細レポートのパス（変換エラーがなければ None）"""
+        path = self.report_dir / "conversion_errors.md"
+        return path if path.exists() else None
+
+    @property
+    def zip_size(self):
+        """ZIPのサイズ（バイト数）"""
+        return self.zip_spool.tell() if self.zip.fp is not None else self.zip_spool.seek(0, 2)
+
+    def read_zip(self):
+        """完成したZIPの内容（すべてのファイルの完了後のみ）"""
+        if not self.done:
+            raise RuntimeError("一括変換が完了していないため、ZIPはまだ完成していません")
+        self.zip_spool.seek(0)
+        return self.zip_spool.read()
+
+    def _release_executor(self):
+        if self.owns_executor and self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def close(self):
+        """未実行のファイルを取り消し、一時フォルダを削除する"""
+        for future in self.futures.values():
+            future.cancel()
+        self._release_executor()
+        self.zip.close()
+        self.zip_spool.close()
+        self._cleanup()
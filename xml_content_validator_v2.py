@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
 import sys
-import argparse
 import re
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from datetime import datetime
 
 def extract_sentence_text(sentence_elem):
     """Sentence要素からテキストを抽出（子要素も含む）"""
@@ -94,39 +93,52 @@ def extract_list_text(list_elem):
     
     return text_parts
 
+def extract_values_from_root(root):
+    """パース済みのルート要素から比較用の値リストを抽出（構造変換を考慮）"""
+    values = []
+
+    # ParagraphSentence要素を探す
+    for paragraph_sentence in root.iter('ParagraphSentence'):
+        extract_paragraph_values(paragraph_sentence, values)
+
+    # ParagraphSentence以外の要素も処理（簡易的にテキストノードを抽出）
+    # 注意: これは補完的な処理で、主要な処理はParagraphSentence内で行われる
+    return values
+
+def extract_paragraph_values(paragraph_sentence, values):
+    """1つのParagraphSentenceの値を values に追加"""
+    for child in paragraph_sentence:
+        if child.tag == 'Sentence':
+            # Sentence要素のテキストを抽出
+            text = extract_sentence_text(child)
+            if text:
+                values.append(text)
+        elif child.tag == 'List':
+            # List構造からテキストを再構築
+            list_texts = extract_list_text(child)
+            values.extend(list_texts)
+        else:
+            # その他の要素は従来通り処理
+            if child.text and child.text.strip():
+                values.append(child.text.strip())
+
 def extract_values_from_xml_structure(file_path):
     """XML構造を理解してテキストを抽出（構造変換を考慮）"""
-    values = []
-    
     try:
         tree = ET.parse(file_path)
-        root = tree.getroot()
-        
-        # ParagraphSentence要素を探す
-        for paragraph_sentence in root.iter('ParagraphSentence'):
-            for child in paragraph_sentence:
-                if child.tag == 'Sentence':
-                    # Sentence要素のテキストを抽出
-                    text = extract_sentence_text(child)
-                    if text:
-                        values.append(text)
-                elif child.tag == 'List':
-                    # List構造からテキストを再構築
-                    list_texts = extract_list_text(child)
-                    values.extend(list_texts)
-                else:
-                    # その他の要素は従来通り処理
-                    if child.text and child.text.strip():
-                        values.append(child.text.strip())
-        
-        # ParagraphSentence以外の要素も処理（簡易的にテキストノードを抽出）
-        # 注意: これは補完的な処理で、主要な処理はParagraphSentence内で行われる
-    
     except ET.ParseError:
         # XMLパースエラーの場合、従来の方法にフォールバック
         return extract_values_from_lines(file_path)
-    
-    return values
+
+    return extract_values_from_root(tree.getroot())
+
+def extract_values_from_bytes(data, file_path):
+    """読み込み済みのファイル内容から比較用の値リストを抽出（パースに失敗した場合は行ベースにフォールバック）"""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError:
+        return extract_values_from_lines(file_path)
+    return extract_values_from_root(root)
 
 def extract_values_from_lines(file_path):
     """Extract values from XML file by removing tags from each line, ignoring XML structure."""
@@ -145,82 +157,291 @@ def extract_values_from_lines(file_path):
 
     return values
 
+# Myers法で許容する編集距離の上限（超えた区間は1つの置換ハンクとして報告）
+MAX_ALIGNMENT_EDITS = 2000
+
+def _append_opcode(opcodes, tag, i1, i2, j1, j2):
+    """オペコードを追加（隣接する差分同士は1つのハンクにまとめる）"""
+    if i1 == i2 and j1 == j2:
+        return
+    if opcodes:
+        last_tag, last_i1, last_i2, last_j1, last_j2 = opcodes[-1]
+        if (last_tag == 'equal') == (tag == 'equal') and last_i2 == i1 and last_j2 == j1:
+            i1, j1 = last_i1, last_j1
+            opcodes.pop()
+    if tag != 'equal':
+        tag = 'replace' if i1 < i2 and j1 < j2 else ('delete' if i1 < i2 else 'insert')
+    opcodes.append((tag, i1, i2, j1, j2))
+
+def _myers_diff(values1, values2, lo1, hi1, lo2, hi2, opcodes):
+    """Myers法 O((N+M)D) で最小編集の差分を求める（D が上限を超えた場合は False）"""
+    n = hi1 - lo1
+    m = hi2 - lo2
+    v = {1: 0}
+    trace = []
+    for d in range(n + m + 1):
+        if d > MAX_ALIGNMENT_EDITS:
+            return False
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and values1[lo1 + x] == values2[lo2 + y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+
+    # 経路を逆にたどり、1要素ずつの編集に分解
+    steps = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            steps.append(('equal', x, y))
+        if d > 0:
+            steps.append(('insert', x, prev_y) if x == prev_x else ('delete', prev_x, y))
+        x, y = prev_x, prev_y
+
+    for tag, x, y in reversed(steps):
+        i1, j1 = lo1 + x, lo2 + y
+        if tag == 'equal':
+            _append_opcode(opcodes, 'equal', i1, i1 + 1, j1, j1 + 1)
+        elif tag == 'delete':
+            _append_opcode(opcodes, 'delete', i1, i1 + 1, j1, j1)
+        else:
+            _append_opcode(opcodes, 'insert', i1, i1, j1, j1 + 1)
+    return True
+
+def _myers_diff_if_small(values1, values2, lo1, hi1, lo2, hi2, opcodes):
+    """編集数が上限以内に収まりうる区間だけ Myers法で揃える（揃えられなかった場合は False）"""
+    from collections import Counter
+
+    counts1 = Counter(values1[lo1:hi1])
+    counts2 = Counter(values2[lo2:hi2])
+    # 出現回数の差は編集数の下限なので、上限を超えることが明らかな区間では Myers法を試さない
+    lower_bound = sum((counts1 - counts2).values()) + sum((counts2 - counts1).values())
+    if lower_bound > MAX_ALIGNMENT_EDITS:
+        return False
+    return _myers_diff(values1, values2, lo1, hi1, lo2, hi2, opcodes)
+
+def _unique_anchors(values1, values2, lo1, hi1, lo2, hi2):
+    """両区間でそれぞれ1回だけ現れる値のうち、順序が一致する最長の組（patience diff の基準点）"""
+    from bisect import bisect_left
+    from collections import Counter
+
+    counts1 = Counter(values1[lo1:hi1])
+    counts2 = Counter(values2[lo2:hi2])
+    positions2 = {values2[j]: j for j in range(lo2, hi2) if counts2[values2[j]] == 1}
+    pairs = [(i, positions2[values1[i]]) for i in range(lo1, hi1)
+             if counts1[values1[i]] == 1 and values1[i] in positions2]
+
+    # ファイル2側の位置の最長増加部分列（patience sorting）
+    tails = []
+    tail_indices = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_indices.append(index)
+        else:
+            tails[pile] = j
+            tail_indices[pile] = index
+        previous[index] = tail_indices[pile - 1] if pile > 0 else None
+    anchors = []
+    index = tail_indices[-1] if tail_indices else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+def _align(values1, values2, lo1, hi1, lo2, hi2, opcodes):
+    """区間 [lo1, hi1) と [lo2, hi2) を揃え、オペコードを追加する"""
+    # 共通の先頭・末尾
+    start1, start2 = lo1, lo2
+    while lo1 < hi1 and lo2 < hi2 and values1[lo1] == values2[lo2]:
+        lo1 += 1
+        lo2 += 1
+    _append_opcode(opcodes, 'equal', start1, lo1, start2, lo2)
+    end1, end2 = hi1, hi2
+    while lo1 < hi1 and lo2 < hi2 and values1[hi1 - 1] == values2[hi2 - 1]:
+        hi1 -= 1
+        hi2 -= 1
+
+    if lo1 == hi1 or lo2 == hi2:
+        _append_opcode(opcodes, 'replace', lo1, hi1, lo2, hi2)
+    elif not _myers_diff_if_small(values1, values2, lo1, hi1, lo2, hi2, opcodes):
+        # 差異が多すぎる区間は、一意な値を基準点として分割してから揃える
+        anchors = _unique_anchors(values1, values2, lo1, hi1, lo2, hi2)
+        for i, j in anchors:
+            _align(values1, values2, lo1, i, lo2, j, opcodes)
+            _append_opcode(opcodes, 'equal', i, i + 1, j, j + 1)
+            lo1, lo2 = i + 1, j + 1
+        if anchors:
+            _align(values1, values2, lo1, hi1, lo2, hi2, opcodes)
+        else:
+            _append_opcode(opcodes, 'replace', lo1, hi1, lo2, hi2)
+
+    _append_opcode(opcodes, 'equal', hi1, end1, hi2, end2)
+
+def diff_value_lists(values1, values2):
+    """2つの値リストの差分を (tag, i1, i2, j1, j2) のオペコードで返す
+
+    tag は 'equal'・'replace'・'delete'・'insert' のいずれかで、difflib の get_opcodes と同じ形式です。
+    共通の先頭・末尾を除いた後、Myers法で挿入・削除が最小になるように揃えます。
+    編集数が MAX_ALIGNMENT_EDITS を超える区間は、両方で1回だけ現れる値を基準点として
+    分割してから揃えます（patience diff）。
+    """
+    opcodes = []
+    _align(values1, values2, 0, len(values1), 0, len(values2), opcodes)
+    return opcodes
+
+_extraction_version = None
+
+def extraction_version():
+    """値の抽出ロジックのバージョン（このモジュールのソースのハッシュ。抽出値キャッシュの無効化に使用）"""
+    global _extraction_version
+    if _extraction_version is None:
+        import hashlib
+        _extraction_version = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+    return _extraction_version
+
+def values_digest(values):
+    """値リストの順序を反映したダイジェスト（各値の長さと内容を順に連結したハッシュ）"""
+    import hashlib
+
+    digest = hashlib.sha256()
+    for value in values:
+        data = value.encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
+
+def _identical_result(total_values_1, total_values_2):
+    return {
+        'missing_in_2': [],
+        'extra_in_2': [],
+        'order_differences': [],
+        'hunks': [],
+        'total_values_1': total_values_1,
+        'total_values_2': total_values_2,
+        'identical': True
+    }
+
 def compare_value_lists(values1, values2):
-    """Compare two lists of values and report differences."""
-    # Find missing values in list2
-    missing_in_2 = []
-    for value in values1:
-        if values1.count(value) > values2.count(value):
-            missing_in_2.extend([value] * (values1.count(value) - values2.count(value)))
+    """Compare two lists of values and report differences.
+
+    欠落・追加は出現回数の多重集合（Counter）の差で、順序の差異は系列の整列（diff_value_lists）で求めます。
+    hunks には挿入・削除・置換のハンクが、order_differences にはそれを要素ごとに展開したものが入ります。
+    """
+    from collections import Counter
 
-    # Find extra values in list2
+    if values1 == values2:
+        return _identical_result(len(values1), len(values2))
+
+    counts1 = Counter(values1)
+    counts2 = Counter(values2)
+    # Find missing values in list2 / extra values in list2（最初に現れた順）
+    missing_in_2 = []
+    for value, count in (counts1 - counts2).items():
+        missing_in_2.extend([value] * count)
     extra_in_2 = []
-    for value in values2:
-        if values2.count(value) > values1.count(value):
-            extra_in_2.extend([value] * (values2.count(value) - values1.count(value)))
+    for value, count in (counts2 - counts1).items():
+        extra_in_2.extend([value] * count)
 
-    # Check order differences
+    hunks = []
     order_differences = []
-    min_len = min(len(values1), len(values2))
-    for i in range(min_len):
-        if values1[i] != values2[i]:
+    for tag, i1, i2, j1, j2 in diff_value_lists(values1, values2):
+        if tag == 'equal':
+            continue
+        hunks.append({
+            'tag': tag,
+            'file1_start': i1,
+            'file1_end': i2,
+            'file2_start': j1,
+            'file2_end': j2,
+            'file1': values1[i1:i2],
+            'file2': values2[j1:j2]
+        })
+        for offset in range(max(i2 - i1, j2 - j1)):
             order_differences.append({
-                'position': i,
-                'file1': values1[i],
-                'file2': values2[i]
+                'position': i1 + offset if i1 + offset < i2 else i2,
+                'position2': j1 + offset if j1 + offset < j2 else j2,
+                'file1': values1[i1 + offset] if i1 + offset < i2 else '<MISSING>',
+                'file2': values2[j1 + offset] if j1 + offset < j2 else '<MISSING>'
             })
 
-    # Check for values that appear in both but at different positions
-    if len(values1) != len(values2):
-        if len(values1) > len(values2):
-            order_differences.extend([{
-                'position': i,
-                'file1': values1[i],
-                'file2': '<MISSING>'
-            } for i in range(len(values2), len(values1))])
-        else:
-            order_differences.extend([{
-                'position': i,
-                'file1': '<MISSING>',
-                'file2': values2[i]
-            } for i in range(len(values1), len(values2))])
-
     return {
         'missing_in_2': missing_in_2,
         'extra_in_2': extra_in_2,
         'order_differences': order_differences,
+        'hunks': hunks,
         'total_values_1': len(values1),
         'total_values_2': len(values2),
-        'identical': values1 == values2
+        'identical': False
     }
 
-def main():
-    parser = argparse.ArgumentParser(description='XML値比較: 構造を無視して値の差分と順序差分のみを検証')
-    parser.add_argument('file1', help='比較元XMLファイル')
-    parser.add_argument('file2', help='比較先XMLファイル')
-    parser.add_argument('--max-diff', type=int, default=10, help='表示する差異の最大数')
-    parser.add_argument('--output', '-o', help='出力ファイルパス（.md拡張子推奨、指定しない場合は標準出力）')
+# 差異の種類（find_differences）
+DIFFERENCE_MISSING = "欠落"
+DIFFERENCE_EXTRA = "追加"
+DIFFERENCE_ORDER = "順序・内容"
+DIFFERENCE_KINDS = (DIFFERENCE_MISSING, DIFFERENCE_EXTRA, DIFFERENCE_ORDER)
 
-    args = parser.parse_args()
+def _difference_row(kind, item):
+    if kind == DIFFERENCE_ORDER:
+        return {"kind": kind, "position1": item['position'], "position2": item.get('position2'),
+                "file1": item['file1'], "file2": item['file2']}
+    if kind == DIFFERENCE_MISSING:
+        return {"kind": kind, "position1": None, "position2": None, "file1": item, "file2": None}
+    return {"kind": kind, "position1": None, "position2": None, "file1": None, "file2": item}
 
-    # 出力ファイルパスの処理
-    if args.output:
-        output_path = Path(args.output)
-        # 拡張子が指定されていない場合は.mdを付ける
-        if not output_path.suffix:
-            output_path = output_path.with_suffix('.md')
-        args.output = str(output_path)
+def find_differences(result, kinds=DIFFERENCE_KINDS, query="", start=0, count=50):
+    """差異を種類と値の部分一致で絞り込み、start 件目から count 件を取り出す
 
-    path1 = Path(args.file1)
-    path2 = Path(args.file2)
+    絞り込みのために全件を走査しますが、辞書を作るのは取り出す範囲の差異だけです
+    （差異の一覧をページ単位で表示するため）。差異は欠落・追加・順序/内容の順に並びます。
 
-    if not path1.exists():
-        print(f"❌ エラー: ファイルが見つかりません: {args.file1}", file=sys.stderr)
-        return 1
-    if not path2.exists():
-        print(f"❌ エラー: ファイルが見つかりません: {args.file2}", file=sys.stderr)
-        return 1
+    Returns:
+        (絞り込み後の総数, 差異のリスト)
+        差異は {"kind": 種類, "position1": ファイル1の位置, "position2": ファイル2の位置,
+        "file1": ファイル1の値, "file2": ファイル2の値}（欠落・追加の位置と、ない側の値は None）
+    """
+    total = 0
+    rows = []
+    for kind, items in ((DIFFERENCE_MISSING, result['missing_in_2']), (DIFFERENCE_EXTRA, result['extra_in_2']),
+                        (DIFFERENCE_ORDER, result['order_differences'])):
+        if kind not in kinds:
+            continue
+        for item in items:
+            if query:
+                values = (item['file1'], item['file2']) if kind == DIFFERENCE_ORDER else (item,)
+                if not any(query in value for value in values):
+                    continue
+            if start <= total < start + count:
+                rows.append(_difference_row(kind, item))
+            total += 1
+    return total, rows
 
+def load_value_lists(path1, path2):
+    """2つのXMLファイルから比較用の値リストを抽出（構造解析に失敗した場合は行ベースにフォールバック）"""
     # 構造変換を考慮した抽出を試行
     try:
         values1 = extract_values_from_xml_structure(path1)
@@ -230,16 +451,565 @@ def main():
         print(f"⚠️  警告: XML構造解析でエラーが発生しました。従来の方法を使用します: {e}", file=sys.stderr)
         values1 = extract_values_from_lines(path1)
         values2 = extract_values_from_lines(path2)
+    return values1, values2
 
-    # 出力先の設定
-    if args.output:
-        output_file = open(args.output, 'w', encoding='utf-8')
-        print_func = lambda msg: print(msg, file=output_file)
+def load_change_log(output_file):
+    """出力ファイルの変更ログ（xml_converter.ChangeLogRecorder が書き込むサイドカー）を読み込む（なければ None）"""
+    import json
+    from xml_converter import change_log_path
+
+    log_file = change_log_path(output_file)
+    if not log_file.exists():
+        return None
+    try:
+        return json.loads(log_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+def compare_with_change_log(path1, path2, change_log):
+    """変更ログを使って、比較元を解析せずに比較先を検証する
+
+    変更ログには変換時に比較元の各ParagraphSentenceから抽出した値のダイジェストと、変換した段落の
+    文書内の順番（paragraphs の index）が記録されています。比較元の内容がログと同じ（SHA-256が一致する）
+    ことを確認したうえで、比較先だけを解析し、段落ごとに次のように照合します。
+
+    - 変換した段落は List を含み、変換していない段落は List を含まないこと（記録された順番と照合）
+    - 段落の値（変換した段落だけListからテキストを再構築）のダイジェストが記録と一致すること
+
+    変換していない段落も値を抽出してダイジェストで照合します。整形で要素内の空白は取り除かれるため、
+    テキストをそのままハッシュしても比較元と一致せず、空白を除いてハッシュすると整形で値が変わった場合を
+    見逃すためです（値の抽出にかかる時間は比較先の解析の半分以下です）。
+
+    Returns:
+        すべての段落が一致した場合は (比較元の値リスト, 比較先の値リスト, compare_value_lists の結果)。
+        変更ログが比較元・抽出ロジックと一致しない場合や、一致しない段落がある場合は None
+        （詳細な差異は通常の比較で求める）
+    """
+    import hashlib
+    from xml_converter import ChangeLogRecorder
+
+    if (change_log.get('extraction_version') != extraction_version()
+            or change_log.get('source_sha256') != hashlib.sha256(Path(path1).read_bytes()).hexdigest()):
+        return None
+    paragraphs = list(ET.parse(path2).getroot().iter('ParagraphSentence'))
+    digests = change_log['digests']
+    if len(paragraphs) != len(digests):
+        return None
+    converted = {paragraph['index'] for paragraph in change_log['paragraphs']}
+    values = []
+    for index, (paragraph_sentence, digest) in enumerate(zip(paragraphs, digests)):
+        if (paragraph_sentence.find('List') is not None) != (index in converted):
+            # 記録と異なる段落が変換されている（または変換されていない）
+            return None
+        paragraph_values = []
+        extract_paragraph_values(paragraph_sentence, paragraph_values)
+        # 空や途中で切れたダイジェストを前方一致で受け入れないよう、記録時と同じ長さで比較する
+        if values_digest(paragraph_values)[:ChangeLogRecorder.DIGEST_LENGTH] != digest:
+            return None
+        values.extend(paragraph_values)
+    return values, values, _identical_result(len(values), len(values))
+
+def compare_with_round_trip(path1, path2, change_log=None):
+    """比較先を逆変換して比較元とMerkle木のハッシュで比較する（compare_round_trip）
+
+    change_log が比較元と一致する（SHA-256が同じ）場合は、記録された属性・区切り文字で逆変換します。
+
+    Returns:
+        (一致した場合は (比較元の値リスト, 比較元の値リスト, compare_value_lists の結果)、一致しない場合は None,
+         compare_round_trip の結果)
+    """
+    import hashlib
+
+    data1 = Path(path1).read_bytes()
+    root1 = ET.fromstring(data1)
+    root2 = ET.parse(path2).getroot()
+    if change_log is not None and change_log.get('source_sha256') != hashlib.sha256(data1).hexdigest():
+        change_log = None
+    round_trip_result = compare_round_trip(root1, root2, change_log)
+    if not round_trip_result['identical']:
+        return None, round_trip_result
+    values = extract_values_from_root(root1)
+    result = _identical_result(len(values), len(values))
+    result['round_trip'] = round_trip_result
+    return (values, values, result), round_trip_result
+
+def compare_files(path1, path2, cache=None, change_log=None, round_trip=False):
+    """2つのXMLファイルの値リストを抽出して比較する
+
+    cache（xml_value_cache.ValueCache）を指定した場合は、ファイル内容のハッシュで抽出済みの値を再利用し、
+    両ファイルのダイジェストが一致すれば差分計算を行わずに同一と判定します。
+    change_log（load_change_log の結果）を指定した場合は、まず compare_with_change_log で比較先だけを検証し、
+    一致しない場合に通常の比較で差異を求めます。
+    round_trip が True の場合は、最初に比較先を逆変換して構造のハッシュで比較し（compare_with_round_trip）、
+    一致すれば値の差分計算を行いません。一致しない場合は通常の比較を行い、結果の "round_trip" に
+    逆変換による比較の結果（差異のある要素）を格納します。
+
+    Returns:
+        (比較元の値リスト, 比較先の値リスト, compare_value_lists の結果)
+    """
+    round_trip_result = None
+    if round_trip:
+        try:
+            compared, round_trip_result = compare_with_round_trip(path1, path2, change_log)
+        except ET.ParseError:
+            compared = None
+        if compared is not None:
+            return compared
+    values1, values2, result = _compare_value_files(path1, path2, cache, change_log)
+    if round_trip_result is not None:
+        result['round_trip'] = round_trip_result
+    return values1, values2, result
+
+def _compare_value_files(path1, path2, cache, change_log):
+    if change_log is not None:
+        try:
+            compared = compare_with_change_log(path1, path2, change_log)
+        except ET.ParseError:
+            compared = None
+        if compared is not None:
+            return compared
+    if cache is None:
+        values1, values2 = load_value_lists(path1, path2)
+        return values1, values2, compare_value_lists(values1, values2)
+    digest1, values1 = cache.get(path1)
+    digest2, values2 = cache.get(path2)
+    if digest1 == digest2:
+        return values1, values2, _identical_result(len(values1), len(values2))
+    return values1, values2, compare_value_lists(values1, values2)
+
+# ストリーミング検証で差異の後に比較を再開する位置を探す先読み件数
+STREAM_WINDOW = 200
+
+def iter_values_streaming(file_path):
+    """iterparse で読みながら比較用の値を順に生成する（extract_values_from_xml_structure と同じ順序）
+
+    最も外側のParagraphSentenceが閉じるたびに値を取り出し、閉じた要素を親から外すため、
+    保持するのは処理中の1段落分と、その祖先の要素だけです。
+    """
+    depth = 0
+    open_elements = []
+    for event, elem in ET.iterparse(str(file_path), events=('start', 'end')):
+        if event == 'start':
+            open_elements.append(elem)
+            if elem.tag == 'ParagraphSentence':
+                depth += 1
+            continue
+        open_elements.pop()
+        if elem.tag == 'ParagraphSentence':
+            depth -= 1
+            if depth == 0:
+                yield from extract_values_from_root(elem)
+        if depth == 0:
+            _discard(elem, open_elements)
+
+def _discard(elem, open_elements):
+    """iterparse で閉じた要素を親から外す（ルートは中身を消す）"""
+    if open_elements:
+        open_elements[-1].remove(elem)
     else:
-        output_file = None
-        print_func = print
+        elem.clear()
+
+def _fill(buffer, values, size):
+    """buffer が size 件になるまで values から読み足す"""
+    while len(buffer) < size:
+        value = next(values, None)
+        if value is None:
+            return
+        buffer.append(value)
+
+def _find_resync(buffer1, buffer2):
+    """先読み中の値から、次に一致する組 (i, j) を i + j が最小になるように探す"""
+    first_positions = {}
+    for j, value in enumerate(buffer2):
+        first_positions.setdefault(value, j)
+    best = None
+    for i, value in enumerate(buffer1):
+        if best is not None and i >= best[0] + best[1]:
+            break
+        j = first_positions.get(value)
+        if j is not None and (best is None or i + j < best[0] + best[1]):
+            best = (i, j)
+    return best or (len(buffer1), len(buffer2))
+
+def stream_compare(path1, path2, fail_fast=False, window=STREAM_WINDOW, max_diff=10):
+    """2つのXMLファイルを先頭から並行して読み、値を1つずつ比較する
+
+    差異が見つかると、先読み window 件の範囲で比較を再開できる位置を探して差異の箇所を記録します。
+    fail_fast が True の場合は最初の差異で読み込みを打ち切ります。
+    XMLとして解析できない場合は load_value_lists / compare_value_lists による比較にフォールバックします。
+
+    Returns:
+        identical, mismatch_count, mismatches（最大 max_diff 件の差異箇所）, compared（一致した値の数）,
+        stopped_early を含む辞書
+    """
+    from collections import deque
+
+    values1 = iter_values_streaming(path1)
+    values2 = iter_values_streaming(path2)
+    buffer1, buffer2 = deque(), deque()
+    position1 = position2 = 0
+    compared = 0
+    mismatches = []
+    mismatch_count = 0
+    stopped_early = False
+    try:
+        while True:
+            _fill(buffer1, values1, 1)
+            _fill(buffer2, values2, 1)
+            if not buffer1 and not buffer2:
+                break
+            if buffer1 and buffer2 and buffer1[0] == buffer2[0]:
+                buffer1.popleft()
+                buffer2.popleft()
+                position1 += 1
+                position2 += 1
+                compared += 1
+                continue
+
+            mismatch_count += 1
+            if fail_fast:
+                i, j = min(len(buffer1), 1), min(len(buffer2), 1)
+                stopped_early = True
+            else:
+                _fill(buffer1, values1, window)
+                _fill(buffer2, values2, window)
+                i, j = _find_resync(buffer1, buffer2)
+            if len(mismatches) < max_diff:
+                mismatches.append({
+                    'file1_start': position1,
+                    'file2_start': position2,
+                    'file1': [buffer1[k] for k in range(i)],
+                    'file2': [buffer2[k] for k in range(j)]
+                })
+            if stopped_early:
+                break
+            for _ in range(i):
+                buffer1.popleft()
+            for _ in range(j):
+                buffer2.popleft()
+            position1 += i
+            position2 += j
+    except ET.ParseError:
+        all_values1, all_values2 = load_value_lists(path1, path2)
+        result = compare_value_lists(all_values1, all_values2)
+        return {
+            'identical': result['identical'],
+            'mismatch_count': len(result['hunks']),
+            'mismatches': [{key: hunk[key] for key in ('file1_start', 'file2_start', 'file1', 'file2')}
+                           for hunk in result['hunks'][:max_diff]],
+            'compared': len(all_values1) - sum(len(hunk['file1']) for hunk in result['hunks']),
+            'stopped_early': False
+        }
+    finally:
+        values1.close()
+        values2.close()
+
+    return {
+        'identical': mismatch_count == 0,
+        'mismatch_count': mismatch_count,
+        'mismatches': mismatches,
+        'compared': compared,
+        'stopped_early': stopped_early
+    }
+
+def print_stream_result(path1, path2, result, print_func=print):
+    """ストリーミング検証の結果を表示"""
+    if result['identical']:
+        print_func(f"✅ 検証成功: {path2}（{result['compared']} 個の値が同一）")
+        return
+    suffix = "（最初の差異で中断）" if result['stopped_early'] else ""
+    print_func(f"❌ 検証失敗: {path2} - 差異 {result['mismatch_count']} 箇所{suffix}")
+    for mismatch in result['mismatches']:
+        print_func(f"  ファイル1 位置 {mismatch['file1_start']} / ファイル2 位置 {mismatch['file2_start']}:")
+        for value in mismatch['file1'] or ['<MISSING>']:
+            print_func(f"    - ファイル1: {repr(value[:100])}")
+        for value in mismatch['file2'] or ['<MISSING>']:
+            print_func(f"    - ファイル2: {repr(value[:100])}")
+
+def compare_sampled_paragraphs(path1, path2, sampling):
+    """ParagraphSentenceを抽出して段落ごとに値を比較する（単一ファイルの抽出検証）
+
+    段落は文書内の順番で対応付け、比較元の段落のテキストの長さと変換の有無で層に分けて
+    sampling（xml_sampling.SamplingPlan）に従って抽出します。
+
+    Returns:
+        {"bound": Sample.failure_bound の結果, "mismatches": [{"path", "file1", "file2"}],
+         "paragraphs_1", "paragraphs_2"}
+    """
+    from xml_converter import iter_paragraph_sentences_with_path
+
+    paragraphs1 = list(iter_paragraph_sentences_with_path(ET.parse(path1).getroot()))
+    paragraphs2 = [paragraph for _, paragraph in iter_paragraph_sentences_with_path(ET.parse(path2).getroot())]
+    sample = sampling.select([path for path, _ in paragraphs1],
+                             [sum(len(text) for text in paragraph.itertext()) for _, paragraph in paragraphs1],
+                             [1.0 if _is_converted_paragraph(paragraph, 'Sentence') else 0.0
+                              for _, paragraph in paragraphs1])
+    failed = []
+    mismatches = []
+    for index in sample.indices:
+        values1 = []
+        values2 = []
+        extract_paragraph_values(paragraphs1[index][1], values1)
+        if index < len(paragraphs2):
+            extract_paragraph_values(paragraphs2[index], values2)
+        if values1 != values2:
+            failed.append(index)
+            mismatches.append({'path': paragraphs1[index][0], 'file1': values1, 'file2': values2})
+    return {
+        'bound': sample.failure_bound(failed),
+        'mismatches': mismatches,
+        'paragraphs_1': len(paragraphs1),
+        'paragraphs_2': len(paragraphs2),
+    }
+
+def write_sampled_report(print_func, path1, path2, result, max_diff=10):
+    """段落の抽出検証の結果をMarkdown形式で出力"""
+    from xml_sampling import format_failure_bound
+
+    print_func("# XML値比較レポート（抽出検証）")
+    print_func("")
+    print_func(f"- **ファイル1**: `{path1.name}` - {result['paragraphs_1']} 段落")
+    print_func(f"- **ファイル2**: `{path2.name}` - {result['paragraphs_2']} 段落")
+    print_func(f"- **{format_failure_bound(result['bound'], '段落')}**")
+    print_func("")
+    if result['paragraphs_1'] != result['paragraphs_2']:
+        print_func("⚠️ ParagraphSentenceの数が異なるため、段落の対応がずれている可能性があります。")
+        print_func("")
+    if not result['mismatches']:
+        print_func("## ✅ 検証結果: 抽出したすべての段落で値が同一です")
+        print_func("")
+        return
+    print_func(f"## ❌ 検証結果: 差異のある段落 ({len(result['mismatches'])} 件)")
+    print_func("")
+    for mismatch in result['mismatches'][:max_diff]:
+        print_func(f"**`{mismatch['path']}`**")
+        print_func(f"- ファイル1: `{repr(mismatch['file1'])[:200]}`")
+        print_func(f"- ファイル2: `{repr(mismatch['file2'])[:200]}`")
+        print_func("")
+    if len(result['mismatches']) > max_diff:
+        print_func(f"**... 他 {len(result['mismatches']) - max_diff} 件**")
+        print_func("")
+
+def _sample_pairs(sampling, keys, source_files):
+    """比較元ファイルのサイズと変換密度で層に分けて、検証するファイルの組を抽出する"""
+    from xml_sampling import conversion_density
+
+    sizes = []
+    densities = []
+    for source_file in source_files:
+        source_file = Path(source_file)
+        exists = source_file.exists()
+        sizes.append(source_file.stat().st_size if exists else 0)
+        densities.append(conversion_density(source_file) if exists else 0.0)
+    return sampling.select(keys, sizes, densities)
+
+# 構造の検証で無視する空白（整形時のインデント・改行。全角空白は値の一部として扱う）
+_FORMATTING_WHITESPACE = ' \t\r\n'
+
+def _normalize_text(text):
+    return (text or '').strip(_FORMATTING_WHITESPACE)
+
+def _is_converted_paragraph(paragraph_sentence, item_tag):
+    """変換対象のParagraphSentenceか（入力は Sentence、出力は List が10個以上）"""
+    items = sum(1 for child in paragraph_sentence if child.tag == item_tag)
+    return items >= 10 and (item_tag == 'Sentence' or
+                            not any(child.tag == 'Sentence' for child in paragraph_sentence))
+
+def merkle_hashes(root, item_tag='Sentence'):
+    """全サブツリーの正規化したハッシュを計算する（Merkle木）
+
+    要素のハッシュは、タグ・属性・整形用の空白を除いたテキストと、子要素のハッシュと末尾テキストの並びから求めます。
+    変換対象のParagraphSentence内の item_tag 要素（入力は Sentence、出力は List）は内容を含めず
+    「変換された文」として数えるだけにし、それ以外の子要素は通常どおり比較します。
+    item_tag が None の場合は変換対象を区別せず、すべての要素の内容をハッシュに含めます。
+
+    Returns:
+        (id(要素) → ハッシュ の辞書, 変換対象のParagraphSentence要素の集合（id）)
+    """
+    import hashlib
+
+    hashes = {}
+    converted = set()
+    converted_item = hashlib.blake2b(b'converted-item', digest_size=16).digest()
+
+    def visit(element, in_converted):
+        for child in element:
+            visit(child, element.tag == 'ParagraphSentence' and id(element) in converted)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(element.tag.encode('utf-8'))
+        for name, value in sorted(element.attrib.items()):
+            digest.update(f"\0{name}={value}".encode('utf-8'))
+        digest.update(b'\1' + _normalize_text(element.text).encode('utf-8'))
+        for child in element:
+            digest.update(b'\2' + hashes[id(child)])
+            digest.update(b'\3' + _normalize_text(child.tail).encode('utf-8'))
+        hashes[id(element)] = converted_item if in_converted and element.tag == item_tag else digest.digest()
+
+    if item_tag is not None:
+        for paragraph_sentence in root.iter('ParagraphSentence'):
+            if _is_converted_paragraph(paragraph_sentence, item_tag):
+                converted.add(id(paragraph_sentence))
+    visit(root, False)
+    return hashes, converted
+
+def _child_steps(element):
+    """子要素の要素パスの表記（Num属性があれば [@Num='…']、なければ同じタグ内の位置）"""
+    positions = {}
+    steps = []
+    for child in element:
+        positions[child.tag] = positions.get(child.tag, 0) + 1
+        num = child.get('Num')
+        steps.append(f"{child.tag}[@Num='{num}']" if num is not None else f"{child.tag}[{positions[child.tag]}]")
+    return steps
+
+def _describe(element):
+    if element is None:
+        return '<MISSING>'
+    text = "".join(element.itertext()).strip(_FORMATTING_WHITESPACE)
+    return f"<{element.tag}> {text[:100]}" if text else f"<{element.tag}>"
+
+def _diff_subtrees(element1, element2, path, trees, mismatches):
+    """ハッシュが異なるサブツリーにだけ降りて、差異のある要素を mismatches に追加する"""
+    (hashes1, converted1), (hashes2, converted2) = trees
+    if hashes1[id(element1)] == hashes2[id(element2)]:
+        return
+    if (id(element1) in converted1) != (id(element2) in converted2):
+        mismatches.append({'path': path, 'reason': '変換の有無が異なる',
+                           'file1': '変換対象' if id(element1) in converted1 else '変換対象外',
+                           'file2': '変換済み' if id(element2) in converted2 else '未変換'})
+        return
+    if element1.tag != element2.tag or element1.attrib != element2.attrib:
+        mismatches.append({'path': path, 'reason': 'タグまたは属性が異なる',
+                           'file1': f"<{element1.tag} {element1.attrib}>", 'file2': f"<{element2.tag} {element2.attrib}>"})
+        return
+    if _normalize_text(element1.text) != _normalize_text(element2.text):
+        mismatches.append({'path': path, 'reason': 'テキストが異なる',
+                           'file1': _normalize_text(element1.text), 'file2': _normalize_text(element2.text)})
+
+    children1 = list(element1)
+    children2 = list(element2)
+    steps1 = _child_steps(element1)
+    keys1 = [(hashes1[id(child)], _normalize_text(child.tail)) for child in children1]
+    keys2 = [(hashes2[id(child)], _normalize_text(child.tail)) for child in children2]
+    for tag, i1, i2, j1, j2 in diff_value_lists(keys1, keys2):
+        if tag == 'equal':
+            continue
+        if tag == 'replace' and i2 - i1 == j2 - j1:
+            # 同じ位置の子要素どうしをさらに比較する
+            for offset in range(i2 - i1):
+                child1 = children1[i1 + offset]
+                child2 = children2[j1 + offset]
+                child_path = f"{path}/{steps1[i1 + offset]}"
+                _diff_subtrees(child1, child2, child_path, trees, mismatches)
+                if _normalize_text(child1.tail) != _normalize_text(child2.tail):
+                    mismatches.append({'path': child_path, 'reason': '要素の後のテキストが異なる',
+                                       'file1': _normalize_text(child1.tail), 'file2': _normalize_text(child2.tail)})
+            continue
+        for offset in range(max(i2 - i1, j2 - j1)):
+            child1 = children1[i1 + offset] if i1 + offset < i2 else None
+            child2 = children2[j1 + offset] if j1 + offset < j2 else None
+            step = steps1[i1 + offset] if child1 is not None else f"{child2.tag}[ファイル2の{j1 + offset + 1}番目]"
+            reason = {'delete': 'ファイル2に欠落している要素', 'insert': 'ファイル2に追加されている要素'}.get(
+                tag, '要素が異なる')
+            mismatches.append({'path': f"{path}/{step}", 'reason': reason,
+                               'file1': _describe(child1), 'file2': _describe(child2)})
+
+def compare_structure(root1, root2):
+    """2つの文書の全要素をMerkle木のハッシュで比較する
+
+    root1 は変換前、root2 は変換後の文書です。変換対象のParagraphSentence内の文（Sentence/List）以外は
+    完全に一致している必要があります。ハッシュが異なるサブツリーにだけ降りて差異の位置を特定するため、
+    一致する部分はルートのハッシュ比較だけで済みます。
+    """
+    hashes1, converted1 = merkle_hashes(root1, 'Sentence')
+    hashes2, converted2 = merkle_hashes(root2, 'List')
+    mismatches = []
+    _diff_subtrees(root1, root2, f"/{root1.tag}", ((hashes1, converted1), (hashes2, converted2)), mismatches)
+    return {
+        'identical': not mismatches,
+        'mismatches': mismatches,
+        'elements_1': len(hashes1),
+        'elements_2': len(hashes2),
+        'converted_1': len(converted1),
+        'converted_2': len(converted2),
+    }
+
+def compare_round_trip(root1, root2, change_log=None):
+    """変換後の文書を逆変換（xml_converter.restore_tree）し、変換前の文書とParagraphSentenceごとに比較する
+
+    逆変換でListは元のSentenceに戻るため、各ParagraphSentenceのサブツリーをMerkle木のハッシュで比較すれば
+    属性・子要素・テキストまで変換前と同じであることを確認できます。ハッシュが一致しない段落だけ
+    サブツリーに降りて差異の位置を特定します。root2 はその場で書き換えられます。
+    """
+    from xml_converter import iter_paragraph_sentences_with_path, restore_tree
+
+    restored = restore_tree(root2, change_log)
+    paragraphs1 = list(iter_paragraph_sentences_with_path(root1))
+    paragraphs2 = [paragraph_sentence for _, paragraph_sentence in iter_paragraph_sentences_with_path(root2)]
+    mismatches = []
+    if len(paragraphs1) != len(paragraphs2):
+        mismatches.append({'path': f"/{root1.tag}", 'reason': 'ParagraphSentenceの数が異なる',
+                           'file1': str(len(paragraphs1)), 'file2': str(len(paragraphs2))})
+    for (path, paragraph1), paragraph2 in zip(paragraphs1, paragraphs2):
+        hashes1, _ = merkle_hashes(paragraph1, None)
+        hashes2, _ = merkle_hashes(paragraph2, None)
+        _diff_subtrees(paragraph1, paragraph2, path, ((hashes1, set()), (hashes2, set())), mismatches)
+    return {
+        'identical': not mismatches,
+        'mismatches': mismatches,
+        'paragraphs_1': len(paragraphs1),
+        'paragraphs_2': len(paragraphs2),
+        'restored': restored,
+        'change_log': change_log is not None,
+    }
+
+def verify_structure(path1, path2):
+    """2つのXMLファイルの構造を compare_structure で比較する"""
+    return compare_structure(ET.parse(path1).getroot(), ET.parse(path2).getroot())
+
+def write_structure_report(print_func, result, max_diff=10):
+    """構造の検証結果をMarkdown形式で出力"""
+    print_func("## 🌳 構造の検証（ParagraphSentence以外の要素を含む文書全体）")
+    print_func("")
+    print_func(f"- **要素数**: ファイル1 {result['elements_1']} / ファイル2 {result['elements_2']}")
+    print_func(f"- **変換対象のParagraphSentence**: ファイル1 {result['converted_1']} / ファイル2 {result['converted_2']}")
+    print_func("")
+    if result['identical']:
+        print_func("✅ 変換対象の文以外の要素はすべて一致しています。")
+        print_func("")
+        return
+    _write_mismatches(print_func, result['mismatches'], max_diff)
+
+def write_round_trip_report(print_func, result, max_diff=10):
+    """逆変換による検証結果をMarkdown形式で出力"""
+    print_func("## 🔁 逆変換による検証（List → Sentence）")
+    print_func("")
+    source = "変更ログに記録された属性・区切り文字" if result['change_log'] else "既定の区切り文字（全角空白）"
+    print_func(f"- **逆変換したParagraphSentence**: {result['restored']}（{source}）")
+    print_func(f"- **ParagraphSentence数**: ファイル1 {result['paragraphs_1']} / ファイル2 {result['paragraphs_2']}")
+    print_func("")
+    if result['identical']:
+        print_func("✅ 逆変換したParagraphSentenceはすべて変換前と完全に一致しています。")
+        print_func("")
+        return
+    _write_mismatches(print_func, result['mismatches'], max_diff)
+
+def _write_mismatches(print_func, mismatches, max_diff):
+    print_func(f"❌ 差異のある要素 ({len(mismatches)} 箇所)")
+    print_func("")
+    for mismatch in mismatches[:max_diff]:
+        print_func(f"**{mismatch['reason']}**: `{mismatch['path']}`")
+        print_func(f"- ファイル1: `{repr(mismatch['file1'][:100])}`")
+        print_func(f"- ファイル2: `{repr(mismatch['file2'][:100])}`")
+        print_func("")
+    if len(mismatches) > max_diff:
+        print_func(f"**... 他 {len(mismatches) - max_diff} 箇所**")
+        print_func("")
+
+def write_comparison_report(print_func, path1, path2, values1, values2, result, max_diff=10):
+    """比較結果をMarkdown形式で出力"""
+    from datetime import datetime
 
-    # Markdown形式で出力
     print_func("# XML値比較レポート (構造無視)")
     print_func("")
     print_func(f"- **ファイル1**: `{path1.name}` - {len(values1)} 個の値")
@@ -247,58 +1017,605 @@ def main():
     print_func(f"- **比較日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print_func("")
 
-    result = compare_value_lists(values1, values2)
-
     if result['identical']:
         print_func("## ✅ 検証結果: 成功")
         print_func("")
         print_func("すべての値が同一です。")
-        if output_file:
-            output_file.close()
-        return 0
-    else:
-        print_func("## ❌ 検証結果: 差異検出")
+        return
+
+    print_func("## ❌ 検証結果: 差異検出")
+    print_func("")
+    print_func("以下の差異が見つかりました:")
+    print_func("")
+
+    if result['missing_in_2']:
+        print_func(f"### 📝 ファイル2に欠落している値 ({len(result['missing_in_2'])} 件)")
         print_func("")
-        print_func("以下の差異が見つかりました:")
+        for i, value in enumerate(result['missing_in_2'][:max_diff]):
+            print_func(f"{i+1}. `{repr(value[:100])}`")
+        if len(result['missing_in_2']) > max_diff:
+            print_func(f"**... 他 {len(result['missing_in_2']) - max_diff} 件**")
         print_func("")
 
-        if result['missing_in_2']:
-            print_func(f"### 📝 ファイル2に欠落している値 ({len(result['missing_in_2'])} 件)")
-            print_func("")
-            for i, value in enumerate(result['missing_in_2'][:args.max_diff]):
-                print_func(f"{i+1}. `{repr(value[:100])}`")
-            if len(result['missing_in_2']) > args.max_diff:
-                print_func(f"**... 他 {len(result['missing_in_2']) - args.max_diff} 件**")
-            print_func("")
+    if result['extra_in_2']:
+        print_func(f"### 📝 ファイル2に追加されている値 ({len(result['extra_in_2'])} 件)")
+        print_func("")
+        for i, value in enumerate(result['extra_in_2'][:max_diff]):
+            print_func(f"{i+1}. `{repr(value[:100])}`")
+        if len(result['extra_in_2']) > max_diff:
+            print_func(f"**... 他 {len(result['extra_in_2']) - max_diff} 件**")
+        print_func("")
 
-        if result['extra_in_2']:
-            print_func(f"### 📝 ファイル2に追加されている値 ({len(result['extra_in_2'])} 件)")
+    if result['hunks']:
+        hunk_labels = {'replace': '置換', 'delete': '削除', 'insert': '挿入'}
+        print_func(f"### 🔄 順序または内容の差異 ({len(result['hunks'])} 箇所)")
+        print_func("")
+        for hunk in result['hunks'][:max_diff]:
+            print_func(f"**{hunk_labels[hunk['tag']]}: ファイル1 位置 {hunk['file1_start']}-{hunk['file1_end']}"
+                       f" / ファイル2 位置 {hunk['file2_start']}-{hunk['file2_end']}**")
+            for value in hunk['file1'][:max_diff]:
+                print_func(f"- ファイル1: `{repr(value[:100])}`")
+            for value in hunk['file2'][:max_diff]:
+                print_func(f"- ファイル2: `{repr(value[:100])}`")
             print_func("")
-            for i, value in enumerate(result['extra_in_2'][:args.max_diff]):
-                print_func(f"{i+1}. `{repr(value[:100])}`")
-            if len(result['extra_in_2']) > args.max_diff:
-                print_func(f"**... 他 {len(result['extra_in_2']) - args.max_diff} 件**")
+        if len(result['hunks']) > max_diff:
+            print_func(f"**... 他 {len(result['hunks']) - max_diff} 箇所**")
             print_func("")
 
-        if result['order_differences']:
-            print_func(f"### 🔄 順序または内容の差異 ({len(result['order_differences'])} 件)")
-            print_func("")
-            for diff in result['order_differences'][:args.max_diff]:
-                print_func(f"**位置 {diff['position']}:**")
-                print_func(f"- ファイル1: `{repr(diff['file1'][:100])}`")
-                print_func(f"- ファイル2: `{repr(diff['file2'][:100])}`")
-                print_func("")
-            if len(result['order_differences']) > args.max_diff:
-                print_func(f"**... 他 {len(result['order_differences']) - args.max_diff} 件**")
-                print_func("")
-
-        print_func("## 📋 検証完了")
+    print_func("## 📋 検証完了")
+    print_func("")
+    print_func(f"- 総差異数: {len(result['missing_in_2']) + len(result['extra_in_2']) + len(result['hunks'])} 件")
+    print_func(f"- 表示制限: 最大 {max_diff} 件まで表示")
+
+def validate_files(path1, path2, output=None, max_diff=10, cache=None, structure=False, use_change_log=False,
+                   schema=None, round_trip=False):
+    """2つのXMLファイルを比較してレポートを出力
+
+    Args:
+        path1: 比較元XMLファイル
+        path2: 比較先XMLファイル
+        output: レポートの出力先パス（Noneの場合は標準出力）
+        max_diff: 表示する差異の最大数
+        cache: 抽出値キャッシュ（xml_value_cache.ValueCache）
+        structure: Trueの場合、文書全体の構造も検証する（verify_structure）
+        use_change_log: Trueの場合、比較先の変更ログ（load_change_log）を使って比較する
+        schema: 比較先を検証するXSDのパス（xml_schema_validator.validate_schema、Noneで検証しない）
+        round_trip: Trueの場合、比較先を逆変換して比較元と比較する（compare_with_round_trip）
+
+    Returns:
+        終了コード（0: 同一, 1: 差異あり）
+    """
+    path1 = Path(path1)
+    path2 = Path(path2)
+    values1, values2, result = compare_files(path1, path2, cache, _change_log_for(path2, use_change_log),
+                                             round_trip)
+    structure_result = verify_structure(path1, path2) if structure else None
+    schema_result = _validate_schema(path2, schema)
+
+    # 出力先の設定
+    if output:
+        with open(output, 'w', encoding='utf-8') as output_file:
+            _write_report(lambda msg: print(msg, file=output_file),
+                          path1, path2, values1, values2, result, structure_result, max_diff, schema_result)
+    else:
+        _write_report(print, path1, path2, values1, values2, result, structure_result, max_diff, schema_result)
+
+    return 0 if _passed(result, structure_result, schema_result) else 1
+
+def _validate_schema(xml_file, schema):
+    if schema is None:
+        return None
+    from xml_schema_validator import validate_schema
+    return validate_schema(xml_file, schema)
+
+def _change_log_for(output_file, use_change_log):
+    if not use_change_log:
+        return None
+    change_log = load_change_log(output_file)
+    if change_log is None:
+        print(f"⚠️  警告: 有効な変更ログがないため、すべての段落を比較します: {output_file}", file=sys.stderr)
+    return change_log
+
+def _write_report(print_func, path1, path2, values1, values2, result, structure_result, max_diff,
+                  schema_result=None):
+    write_comparison_report(print_func, path1, path2, values1, values2, result, max_diff)
+    if 'round_trip' in result:
+        print_func("")
+        write_round_trip_report(print_func, result['round_trip'], max_diff)
+    if structure_result is not None:
         print_func("")
-        print_func(f"- 総差異数: {len(result['missing_in_2']) + len(result['extra_in_2']) + len(result['order_differences'])} 件")
-        print_func(f"- 表示制限: 最大 {args.max_diff} 件まで表示")
-        if output_file:
-            output_file.close()
+        write_structure_report(print_func, structure_result, max_diff)
+    if schema_result is not None:
+        from xml_schema_validator import write_schema_report
+        print_func("")
+        write_schema_report(print_func, schema_result, max_diff)
+
+def _passed(result, structure_result, schema_result=None):
+    """値・逆変換・構造・スキーマの検証がすべて成功したか（スキーマ検証のスキップは失敗として扱わない）"""
+    return (result['identical'] and result.get('round_trip', result)['identical']
+            and (structure_result is None or structure_result['identical'])
+            and (schema_result is None or schema_result['status'] != 'failed'))
+
+def validate_file_list(source, null_delimited=False, max_diff=10, cache=None, structure=False,
+                       use_change_log=False, schema=None, round_trip=False, sampling=None):
+    """ファイルリストに列挙された「比較元<TAB>比較先[<TAB>レポート]」の組をまとめて検証
+
+    sampling（xml_sampling.SamplingPlan）を指定した場合は、抽出した組だけを検証し、失敗率の信頼区間を表示します。
+
+    Returns:
+        終了コード（0: すべて同一, 1: 差異またはエラーあり）
+    """
+    from xml_converter import read_file_pairs
+
+    try:
+        records = read_file_pairs(source, null_delimited=null_delimited, min_fields=2, max_fields=3)
+    except (OSError, ValueError) as e:
+        print(f"❌ エラー: ファイルリストを読み込めません: {e}", file=sys.stderr)
+        return 1
+
+    sample = None
+    if sampling is not None and records:
+        sample = _sample_pairs(sampling, [str(path1) for path1, _, _ in records], [path1 for path1, _, _ in records])
+        print(f"🎲 {sampling.describe()} を抽出: {len(sample)}/{len(records)} 組")
+        records = [records[index] for index in sample.indices]
+
+    passed = 0
+    failed = 0
+    failed_positions = []
+    for position, (path1, path2, report) in enumerate(records):
+        if not path1.exists() or not path2.exists():
+            missing = path1 if not path1.exists() else path2
+            print(f"❌ エラー: ファイルが見つかりません: {missing}", file=sys.stderr)
+            failed += 1
+            failed_positions.append(position)
+            continue
+        values1, values2, result = compare_files(path1, path2, cache, _change_log_for(path2, use_change_log),
+                                                 round_trip)
+        structure_result = verify_structure(path1, path2) if structure else None
+        schema_result = _validate_schema(path2, schema)
+        if report is not None:
+            if not report.suffix:
+                report = report.with_suffix('.md')
+            report.parent.mkdir(parents=True, exist_ok=True)
+            with open(report, 'w', encoding='utf-8') as output_file:
+                _write_report(lambda msg: print(msg, file=output_file),
+                              path1, path2, values1, values2, result, structure_result, max_diff, schema_result)
+        if _passed(result, structure_result, schema_result):
+            print(f"✅ {path2}")
+            passed += 1
+        else:
+            print(f"❌ {path2}")
+            failed += 1
+            failed_positions.append(position)
+
+    print(f"検証成功: {passed} / 検証失敗: {failed}")
+    if sample is not None:
+        from xml_sampling import format_failure_bound
+        print(format_failure_bound(sample.failure_bound([sample.indices[i] for i in failed_positions]), "組"))
+    return 0 if failed == 0 else 1
+
+# ワーカープロセスごとに開いた抽出値キャッシュ（キャッシュファイルのパス → ValueCache）
+_worker_value_caches = {}
+
+def _open_value_cache(cache_spec):
+    if cache_spec is None:
+        return None
+    if cache_spec not in _worker_value_caches:
+        from xml_value_cache import ValueCache
+        _worker_value_caches[cache_spec] = ValueCache(*cache_spec)
+    return _worker_value_caches[cache_spec]
+
+# ディレクトリ検証で個別レポートを作成しなかったファイルの検証方法（サマリーの表示用）
+VERIFICATION_STREAM = "stream"
+VERIFICATION_ROUND_TRIP = "round_trip"
+
+_VERIFICATION_LABELS = {
+    VERIFICATION_STREAM: "ストリーミング検証",
+    VERIFICATION_ROUND_TRIP: "逆変換検証",
+}
+
+def _validate_directory_pair(task, max_diff=10, fail_fast=False, cache_spec=None, structure=False,
+                             use_change_log=False, schema=None, round_trip=False):
+    """ディレクトリ検証のワーカー: 1組を比較して個別レポートを書き込み、結果の要約を返す
+
+    Args:
+        task: (表示名, 比較元, 比較先, 個別レポートのパス)
+        その他: validate_directories と同じ（全ファイル共通のため functools.partial で固定して渡す）
+    """
+    display_name, path1, path2, report = task
+    summary = {"file": display_name, "report": report}
+    try:
+        structure_result = verify_structure(path1, path2) if structure else None
+        schema_result = _validate_schema(path2, schema)
+        if schema_result is not None:
+            summary.update(schema=schema_result['status'], schema_errors=schema_result['error_count'],
+                           schema_reason=schema_result.get('reason'))
+        if (fail_fast and not round_trip and _passed({'identical': True}, structure_result, schema_result)
+                and stream_compare(path1, path2, fail_fast=True)['identical']):
+            # 一致したファイルは個別レポートを作成しない
+            summary.update(identical=True, report=None, verification=VERIFICATION_STREAM)
+            return summary
+        values1, values2, result = compare_files(path1, path2, _open_value_cache(cache_spec),
+                                                 _change_log_for(path2, use_change_log), round_trip)
+        if fail_fast and round_trip and _passed(result, structure_result, schema_result):
+            # 逆変換で一致したファイルも個別レポートを作成しない
+            summary.update(identical=True, report=None, verification=VERIFICATION_ROUND_TRIP)
+            return summary
+        Path(report).parent.mkdir(parents=True, exist_ok=True)
+        with open(report, 'w', encoding='utf-8') as output_file:
+            _write_report(lambda msg: print(msg, file=output_file),
+                          Path(path1), Path(path2), values1, values2, result, structure_result, max_diff,
+                          schema_result)
+    except Exception as e:
+        # 個別レポートは書き込まれていない（途中まで書いたものは削除する）
+        Path(report).unlink(missing_ok=True)
+        summary.update(identical=False, report=None, error=f"{type(e).__name__}: {e}")
+        return summary
+    summary.update(identical=_passed(result, structure_result, schema_result), missing=len(result['missing_in_2']),
+                   extra=len(result['extra_in_2']), hunks=len(result['hunks']))
+    if structure_result is not None:
+        summary['structure'] = len(structure_result['mismatches'])
+    return summary
+
+def _count_conversion_errors(error_report):
+    """conversion_errors.md に記録された変換エラーの件数（「### 」で始まる行の数）"""
+    if not error_report.exists():
+        return 0
+    with open(error_report, encoding='utf-8') as f:
+        return sum(1 for line in f if line.startswith('### '))
+
+def write_validation_summary(summary_path, input_dir, output_dir, total_count, conversion_error_count, results,
+                             sampling=None):
+    """ディレクトリ検証の結果を validation_summary.md に出力（sampling は抽出検証の failure_bound の結果）"""
+    from datetime import datetime
+
+    passed = sum(1 for result in results if result['identical'])
+    failed = len(results) - passed
+    lines = [
+        "# XML変換・検証処理結果サマリー",
+        "",
+        "## 処理概要",
+        f"- **実行日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"- **入力フォルダ**: {input_dir}",
+        f"- **出力フォルダ**: {output_dir}",
+        f"- **総処理ファイル数**: {total_count}",
+        "",
+        "## 変換結果",
+        f"- **✅ 変換成功**: {total_count - conversion_error_count} ファイル",
+    ]
+    if conversion_error_count > 0:
+        lines += [
+            f"- **❌ 変換失敗**: {conversion_error_count} ファイル",
+            "",
+            "",
+            "詳細は[変換エラー詳細](conversion_errors.md)を参照してください。",
+        ]
+    lines += [
+        "",
+        "## 検証結果",
+        f"- **✅ 検証成功**: {passed} ファイル",
+        f"- **❌ 検証失敗**: {failed} ファイル",
+    ]
+    if sampling is not None:
+        from xml_sampling import format_failure_bound
+        lines += [
+            "",
+            "## 抽出検証",
+            f"- {format_failure_bound(sampling)}",
+            "- 抽出しなかったファイルは検証していません。",
+        ]
+    schema_statuses = [result['schema'] for result in results if 'schema' in result]
+    if schema_statuses:
+        lines += [
+            "",
+            "## スキーマ検証結果",
+            f"- **✅ スキーマ適合**: {schema_statuses.count('passed')} ファイル",
+            f"- **❌ スキーマ違反**: {schema_statuses.count('failed')} ファイル",
+        ]
+        if 'skipped' in schema_statuses:
+            reason = next(result['schema_reason'] for result in results if result.get('schema') == 'skipped')
+            lines.append(f"- **⏭️ スキップ**: {schema_statuses.count('skipped')} ファイル（{reason}）")
+    lines += [
+        "",
+        "## 詳細結果",
+        "",
+    ]
+    for result in results:
+        status = "" if result['identical'] else " ❌"
+        if result.get('schema') == 'failed':
+            status += f" スキーマ違反 {result['schema_errors']} 件"
+        if 'error' in result:
+            lines.append(f"- **{result['file']}**{status}: 検証エラー（{result['error']}）")
+            continue
+        if result['report'] is None:
+            lines.append(f"- **{result['file']}**: 検証成功（{_VERIFICATION_LABELS[result['verification']]}）")
+            continue
+        link = Path(result['report']).relative_to(summary_path.parent).as_posix()
+        lines.append(f"- **{result['file']}**{status}: [検証結果詳細]({link})")
+
+    lines.append("")
+    if failed == 0 and conversion_error_count == 0:
+        lines += ["## 🎉 処理結果", "すべてのファイルが正常に処理・検証されました！"]
+    else:
+        lines.append("## ⚠️ 処理結果")
+        if conversion_error_count > 0:
+            lines.append("一部のファイルで変換エラーが発生しました。上記の変換エラー詳細を確認してください。")
+        if failed > 0:
+            lines.append("一部のファイルで検証エラーが発生しました。詳細な検証結果ファイルを確認してください。")
+    if (summary_path.parent / "conversion_errors.md").exists():
+        lines += ["", "## 関連ファイル", "- [変換エラー詳細](conversion_errors.md)"]
+
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+def validate_directories(input_dir, output_dir, recursive=False, jobs=None, max_diff=5, fail_fast=False,
+                         cache_spec=None, structure=False, use_change_log=False, schema=None, round_trip=False,
+                         sampling=None):
+    """入力フォルダと出力フォルダの同じ相対パスのXMLファイルを並列に検証する
+
+    個別レポートは output_dir/validation_results/ に入力と同じフォルダ構成で
+    「{ファイル名}_validation.md」として保存し、全体の結果を validation_summary.md に出力します。
+    fail_fast が True の場合は各ファイルをストリーミングで検証し、一致したファイルのレポートは作成せず、
+    差異のあるファイルが見つかった時点で残りの検証を打ち切ります。
+    cache_spec に (キャッシュファイルのパス, 上限バイト数) を指定すると、各ワーカーが抽出値キャッシュを使用します。
+    structure が True の場合は文書全体の構造も検証し（verify_structure）、その差異も検証失敗として扱います。
+    use_change_log が True の場合は、出力ファイルごとの変更ログを使って変換された段落だけを詳しく比較します。
+    schema にXSDのパスを指定すると出力ファイルをスキーマでも検証し、違反を検証失敗としてサマリーに含めます
+    （コンパイル済みのスキーマは各ワーカープロセスで再利用します）。
+    round_trip が True の場合は出力ファイルを逆変換して入力ファイルと比較します（compare_with_round_trip）。
+    sampling（xml_sampling.SamplingPlan）を指定した場合は、入力ファイルのサイズと変換密度で層に分けて
+    抽出したファイルだけを検証し、全体の失敗率の信頼区間をサマリーに含めます。
+
+    Returns:
+        終了コード（0: すべて同一かつ変換エラーなし, 1: それ以外）
+    """
+    input_path = Path(input_dir)
+    output_path = Path(output_dir)
+    validation_dir = output_path / "validation_results"
+    pattern = "**/*.xml" if recursive else "*.xml"
+
+    total_count = sum(1 for _ in input_path.glob(pattern))
+    tasks = []
+    for output_file in sorted(output_path.glob(pattern)):
+        relative_path = output_file.relative_to(output_path)
+        if relative_path.parts[0] == validation_dir.name:
+            continue
+        input_file = input_path / relative_path
+        if not input_file.exists():
+            print(f"⚠️  警告: 対応する入力ファイルが見つかりません: {relative_path}")
+            continue
+        report = validation_dir / relative_path.parent / f"{relative_path.stem}_validation.md"
+        tasks.append((relative_path.as_posix(), str(input_file), str(output_file), str(report)))
+    validate_pair = functools.partial(_validate_directory_pair, max_diff=max_diff, fail_fast=fail_fast,
+                                      cache_spec=cache_spec, structure=structure, use_change_log=use_change_log,
+                                      schema=schema and str(schema), round_trip=round_trip)
+
+    sample = None
+    if sampling is not None and tasks:
+        sample = _sample_pairs(sampling, [task[0] for task in tasks], [task[1] for task in tasks])
+        print(f"🎲 {sampling.describe()} を抽出: {len(sample)}/{len(tasks)} ファイル")
+        tasks = [tasks[index] for index in sample.indices]
+
+    print(f"🔍 変換結果の検証を開始します...（{len(tasks)} ファイル）")
+    if jobs == 1 or len(tasks) <= 1:
+        results = []
+        for task in tasks:
+            results.append(validate_pair(task))
+            if fail_fast and not results[-1]['identical']:
+                break
+    elif fail_fast:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(validate_pair, task): index for index, task in enumerate(tasks)}
+            completed = {}
+            for future in as_completed(futures):
+                completed[futures[future]] = future.result()
+                if not completed[futures[future]]['identical']:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+        results = [completed[index] for index in sorted(completed)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(validate_pair, tasks, chunksize=4))
+    skipped = len(tasks) - len(results)
+
+    for result in results:
+        if result['identical']:
+            print(f"  ✅ 検証成功: {result['file']}")
+        else:
+            print(f"  ❌ 検証失敗: {result['file']}")
+            if result['report'] is not None:
+                print(f"     📄 結果: {result['report']}")
+            if 'error' in result:
+                print(f"      エラー: {result['error']}")
+            else:
+                print(f"      欠落 {result['missing']} 件 / 追加 {result['extra']} 件 / 順序・内容の差異 {result['hunks']} 箇所")
+                if result.get('structure'):
+                    print(f"      構造の差異 {result['structure']} 箇所")
+                if result.get('schema') == 'failed':
+                    print(f"      スキーマ違反 {result['schema_errors']} 件")
+
+    bound = None
+    if sample is not None and not skipped:
+        bound = sample.failure_bound([sample.indices[position] for position, result in enumerate(results)
+                                      if not result['identical']])
+
+    conversion_error_count = _count_conversion_errors(validation_dir / "conversion_errors.md")
+    summary_path = validation_dir / "validation_summary.md"
+    write_validation_summary(summary_path, input_dir, output_dir, total_count, conversion_error_count, results,
+                             bound)
+
+    passed = sum(1 for result in results if result['identical'])
+    failed = len(results) - passed
+    print()
+    print("=== 処理結果サマリー ===")
+    print(f"総処理ファイル数: {total_count}")
+    if conversion_error_count > 0:
+        print(f"変換成功: {total_count - conversion_error_count}")
+        print(f"変換失敗: {conversion_error_count}")
+    print(f"検証成功: {passed}")
+    print(f"検証失敗: {failed}")
+    if skipped:
+        print(f"未検証: {skipped}（--fail-fast により中断）")
+    if bound is not None:
+        from xml_sampling import format_failure_bound
+        print(format_failure_bound(bound))
+    schema_statuses = [result['schema'] for result in results if 'schema' in result]
+    if schema_statuses:
+        print(f"スキーマ違反: {schema_statuses.count('failed')}"
+              + (f"（スキップ: {schema_statuses.count('skipped')}）" if 'skipped' in schema_statuses else ""))
+    print(f"📁 検証結果保存先: {validation_dir}")
+    print(f"📄 サマリーレポート: {summary_path}")
+    if conversion_error_count > 0:
+        print(f"📄 変換エラー詳細: {validation_dir / 'conversion_errors.md'}")
+    return 0 if failed == 0 and conversion_error_count == 0 else 1
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='XML値比較: 構造を無視して値の差分と順序差分のみを検証')
+    parser.add_argument('file1', nargs='?', help='比較元XMLファイル（またはフォルダ）')
+    parser.add_argument('file2', nargs='?', help='比較先XMLファイル（またはフォルダ）')
+    parser.add_argument('--max-diff', type=int, default=10, help='表示する差異の最大数')
+    parser.add_argument('--output', '-o', help='出力ファイルパス（.md拡張子推奨、指定しない場合は標準出力）')
+    parser.add_argument('--files-from', metavar='FILE',
+                        help='「比較元<TAB>比較先[<TAB>レポート]」を1行ずつ列挙したファイル（- で標準入力）')
+    parser.add_argument('--null', '-0', action='store_true',
+                        help='--files-from のレコードを改行ではなくNUL文字で区切る')
+    parser.add_argument('--recursive', '-r', action='store_true',
+                        help='フォルダ指定時にサブフォルダも再帰的に検証（デフォルト: 直下のみ）')
+    parser.add_argument('--jobs', '-j', type=int, help='フォルダ指定時のワーカープロセス数（省略時はCPU数）')
+    parser.add_argument('--stream', action='store_true',
+                        help='両ファイルを先頭から並行して読みながら比較（値リスト全体を保持しない）')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='最初の差異で検証を打ち切る（ストリーミング検証。差異があった場合のみ詳細レポートを作成）')
+    parser.add_argument('--structure', action='store_true',
+                        help='ParagraphSentence以外を含む文書全体の構造もMerkle木のハッシュで検証'
+                             '（変換対象の文以外の要素が完全に一致すること）')
+    parser.add_argument('--schema', nargs='?', const='', metavar='XSD',
+                        help='比較先をXSDスキーマでも検証（XSD省略時は schema/kokuji20250320_asukoe.xsd。'
+                             'xmlschema または lxml が必要で、ない場合はスキップ）')
+    parser.add_argument('--change-log', action='store_true',
+                        help='変換時の変更ログ（xml_converter.py --change-log）を使い、変換された段落だけ'
+                             'Listからテキストを再構築して比較（他の段落はハッシュの一致のみ確認）')
+    parser.add_argument('--round-trip', action='store_true',
+                        help='比較先のListを元のSentenceに逆変換し、比較元のParagraphSentenceとハッシュで比較'
+                             '（一致すれば値の差分計算を省略。--change-log と併用すると記録された区切り文字を使用）')
+    parser.add_argument('--sample', type=float, metavar='RATE',
+                        help='抽出率（0〜1）。フォルダ・ファイルリストではファイルを、単一ファイルでは段落を、'
+                             'サイズと変換密度で層に分けて抽出して検証し、失敗率の信頼区間を表示')
+    parser.add_argument('--sample-count', type=int, metavar='K', help='抽出する件数（--sample の代わりに指定）')
+    parser.add_argument('--seed', type=int, default=0, help='抽出のシード（デフォルト: 0。同じシードなら同じ対象を抽出）')
+    parser.add_argument('--value-cache', metavar='DB',
+                        help='抽出値キャッシュ（SQLite）を使用（同じ内容のファイルは値の抽出を省略し、'
+                             'ダイジェストが一致すれば差分計算も省略）')
+    parser.add_argument('--value-cache-max-mb', type=int, default=256,
+                        help='抽出値キャッシュの上限サイズ（MB、デフォルト: 256）')
+    parser.add_argument('--clear-value-cache', action='store_true',
+                        help='検証の前に抽出値キャッシュを空にする')
+
+    args = parser.parse_args()
+    sampling = None
+    if args.sample is not None or args.sample_count is not None:
+        if args.sample is not None and args.sample_count is not None:
+            parser.error('--sample と --sample-count は同時に指定できません')
+        from xml_sampling import SamplingPlan
+        try:
+            sampling = SamplingPlan(rate=args.sample, count=args.sample_count, seed=args.seed)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.schema == '':
+        from xml_schema_validator import DEFAULT_SCHEMA
+        args.schema = str(DEFAULT_SCHEMA)
+    cache_spec = None
+    if args.value_cache:
+        cache_spec = (args.value_cache, args.value_cache_max_mb * 1024 * 1024)
+        if args.clear_value_cache:
+            from xml_value_cache import ValueCache
+            with ValueCache(*cache_spec) as cache:
+                cache.clear()
+    elif args.clear_value_cache:
+        parser.error('--clear-value-cache には --value-cache の指定が必要です')
+
+    if args.files_from:
+        if args.file1 or args.file2:
+            parser.error('--files-from と比較ファイルは同時に指定できません')
+        return validate_file_list(args.files_from, null_delimited=args.null, max_diff=args.max_diff,
+                                  cache=_open_value_cache(cache_spec), structure=args.structure,
+                                  use_change_log=args.change_log, schema=args.schema, round_trip=args.round_trip,
+                                  sampling=sampling)
+    if not args.file1 or not args.file2:
+        parser.error('比較元と比較先のXMLファイルを指定してください')
+    if Path(args.file1).is_dir() and Path(args.file2).is_dir():
+        # フォルダ同士: 同じ相対パスのファイルをまとめて検証し、レポートとサマリーを出力
+        return validate_directories(args.file1, args.file2, recursive=args.recursive,
+                                    jobs=args.jobs, max_diff=args.max_diff, fail_fast=args.fail_fast,
+                                    cache_spec=cache_spec, structure=args.structure,
+                                    use_change_log=args.change_log, schema=args.schema,
+                                    round_trip=args.round_trip, sampling=sampling)
+
+    # 出力ファイルパスの処理
+    if args.output:
+        output_path = Path(args.output)
+        # 拡張子が指定されていない場合は.mdを付ける
+        if not output_path.suffix:
+            output_path = output_path.with_suffix('.md')
+        args.output = str(output_path)
+
+    path1 = Path(args.file1)
+    path2 = Path(args.file2)
+
+    if not path1.exists():
+        print(f"❌ エラー: ファイルが見つかりません: {args.file1}", file=sys.stderr)
+        return 1
+    if not path2.exists():
+        print(f"❌ エラー: ファイルが見つかりません: {args.file2}", file=sys.stderr)
         return 1
 
+    if sampling is not None:
+        # 単一ファイルでは段落を抽出して検証
+        result = compare_sampled_paragraphs(path1, path2, sampling)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output_file:
+                write_sampled_report(lambda msg: print(msg, file=output_file), path1, path2, result, args.max_diff)
+            print(f"📄 レポート: {args.output}")
+        else:
+            write_sampled_report(print, path1, path2, result, args.max_diff)
+        return 0 if not result['mismatches'] else 1
+    if args.round_trip and (args.fail_fast or args.stream):
+        if args.stream:
+            parser.error('--round-trip と --stream は同時に指定できません')
+        # 逆変換による比較は一致すれば差分計算を行わないため、そのまま比較する
+        return validate_files(path1, path2, output=args.output, max_diff=args.max_diff,
+                              structure=args.structure, use_change_log=args.change_log, schema=args.schema,
+                              round_trip=True)
+    if args.fail_fast or args.stream:
+        result = stream_compare(path1, path2, fail_fast=args.fail_fast, max_diff=args.max_diff)
+        print_stream_result(path1, path2, result)
+        structure_result = None
+        if args.structure:
+            structure_result = verify_structure(path1, path2)
+            write_structure_report(print, structure_result, args.max_diff)
+        schema_result = _validate_schema(path2, args.schema)
+        if schema_result is not None:
+            from xml_schema_validator import write_schema_report
+            write_schema_report(print, schema_result, args.max_diff)
+        if _passed(result, structure_result, schema_result):
+            return 0
+        if args.output:
+            # 差異があった場合のみ、全体を比較した詳細レポートを作成
+            validate_files(path1, path2, output=args.output, max_diff=args.max_diff, structure=args.structure,
+                           schema=args.schema)
+            print(f"📄 詳細レポート: {args.output}")
+        return 1
+
+    return validate_files(path1, path2, output=args.output, max_diff=args.max_diff,
+                          cache=_open_value_cache(cache_spec), structure=args.structure,
+                          use_change_log=args.change_log, schema=args.schema, round_trip=args.round_trip)
+
 if __name__ == '__main__':
     sys.exit(main())
@@ -152,194 +152,1223 @@ def convert_sentence_to_list(sentence_elem):
 
     return list_elem
 
-def convert_xml(input_file, output_file):
-    """XMLファイルを変換する"""
-    # XMLファイルをパース
-    tree = ET.parse(input_file)
-    root = tree.getroot()
+def parse_xml(source):
+    """XMLファイル（パスまたはファイルオブジェクト）をパースしてルート要素を返す"""
+    return ET.parse(source).getroot()
+
+def transform_tree(root, on_paragraph=None):
+    """ParagraphSentence内のSentence要素をList要素に変換する（ルート要素をその場で書き換える）
+
+    Args:
+        root: ルート要素
+        on_paragraph: ParagraphSentenceごとに
+            on_paragraph(要素パス, ParagraphSentence要素, 変換前の子要素のリスト, 変換したか)
+            の形で呼び出されるコールバック（索引作成などに使用）
+
+    Returns:
+        変換したParagraphSentence要素の数
+    """
+    converted_count = 0
+
+    if on_paragraph is not None:
+        for path, paragraph_sentence in iter_paragraph_sentences_with_path(root):
+            original_children = list(paragraph_sentence)
+            converted = transform_paragraph_sentence(paragraph_sentence)
+            on_paragraph(path, paragraph_sentence, original_children, converted)
+            if converted:
+                converted_count += 1
+        return converted_count
 
     # ParagraphSentence要素を探す
     for paragraph_sentence in root.iter('ParagraphSentence'):
-        # 既存のSentence要素を削除し、List要素に変換
-        sentences = list(paragraph_sentence)  # 子要素のコピーを作成
-
-        # Sentence要素が10個以上の場合のみ変換を行う
-        sentence_count = sum(1 for elem in sentences if elem.tag == 'Sentence')
-        if sentence_count >= 10:
-            # すべての子要素をクリア
-            paragraph_sentence.clear()
-
-            # 各SentenceをListに変換して追加
-            for sentence in sentences:
-                if sentence.tag == 'Sentence':
-                    list_elem = convert_sentence_to_list(sentence)
-                    paragraph_sentence.append(list_elem)
-                else:
-                    # Sentence以外の要素はそのまま追加
-                    paragraph_sentence.append(sentence)
-
-    # expect.xmlに近いフォーマットで出力
-    def format_xml_element(element, level=0):
-        """expect.xmlに近いフォーマットでXML要素を整形"""
-        # expect.xmlのインデントに合わせる（レベル0: 0スペース, レベル1: 2スペース, レベル2: 4スペース, etc.）
-        indent = "  " * level
-
-        # 開始タグ
-        attrs = []
-        for key, value in element.attrib.items():
-            if '{' in key and '}' in key:
-                # xmlns属性の場合、名前空間形式を正しい形式に変換
-                ns_end = key.find('}')
-                ns_uri = key[1:ns_end]
-                attr_name = key[ns_end + 1:]
-                if attr_name.startswith('xmlns:'):
-                    attrs.append(f'{attr_name}="{ns_uri}"')
-                elif attr_name == 'noNamespaceSchemaLocation':
-                    attrs.insert(0, f'xmlns:xsi="{ns_uri}"')  # xmlns:xsiを先頭に
-                    attrs.append(f'xsi:{attr_name}="{value}"')
-            else:
-                attrs.append(f'{key}="{value}"')
-
-        # Law要素の場合、属性の順序をexpect.xmlに合わせる
-        if element.tag == 'Law':
-            ordered_attrs = []
-            # 通常属性
-            for attr in attrs:
-                if not attr.startswith('xmlns:') and not attr.startswith('xsi:'):
-                    ordered_attrs.append(attr)
-            # xmlns属性
-            for attr in attrs:
-                if attr.startswith('xmlns:'):
-                    ordered_attrs.append(attr)
-            # xsi属性
-            for attr in attrs:
-                if attr.startswith('xsi:'):
-                    ordered_attrs.append(attr)
-            attrs = ordered_attrs
-
-        attr_str = ' ' + ' '.join(attrs) if attrs else ''
-
-        # Law要素の特別処理
-        if element.tag == 'Law':
-            attr_str += ' '
-
-        # Ruby要素の特別処理
-        if element.tag == 'Ruby':
-            # Ruby要素は子要素を同じ行にまとめる
-            result = f"<{element.tag}{attr_str}>"
-            if element.text and element.text.strip():
-                result += element.text.strip()
+        if transform_paragraph_sentence(paragraph_sentence):
+            converted_count += 1
 
-            # 子要素を同じ行に
-            for child in element:
-                child_result = format_xml_element(child, 0)  # Rubyの子要素はインデントなし
-                result += child_result
-                if child.tail and child.tail.strip():
-                    result += child.tail.strip()
+    return converted_count
 
-            result += f"</{element.tag}>"
-            return result
+def iter_paragraph_sentences_with_path(element, path=None):
+    """ParagraphSentence要素を、ルートからの要素パスとともに列挙する
 
-        # Sentence要素の特別処理
-        if element.tag == 'Sentence':
-            # Sentence要素はテキストと子要素をすべて同じ行にまとめる
-            result = f"{indent}<{element.tag}{attr_str}>"
-            if element.text and element.text.strip():
-                result += element.text.strip()
+    パスは ElementTree の findall でも使える形式です
+    （例: /Law/LawBody/MainProvision/Article[@Num='1']/Paragraph[@Num='1']/ParagraphSentence）。
+    """
+    if path is None:
+        path = f"/{element.tag}"
+    positions = {}
+    for child in element:
+        positions[child.tag] = positions.get(child.tag, 0) + 1
+        num = child.get('Num')
+        step = f"{child.tag}[@Num='{num}']" if num is not None else f"{child.tag}[{positions[child.tag]}]"
+        if child.tag == 'ParagraphSentence':
+            yield f"{path}/{step}", child
+        else:
+            yield from iter_paragraph_sentences_with_path(child, f"{path}/{step}")
 
-            # 子要素を同じ行に
-            for child in element:
-                child_result = format_xml_element(child, 0)  # Sentenceの子要素はインデントなし
-                result += child_result
-                if child.tail and child.tail.strip():
-                    result += child.tail.strip()
+def transform_paragraph_sentence(paragraph_sentence):
+    """1つのParagraphSentence要素を変換する（Sentence要素が10個以上の場合のみ）
+
+    Returns:
+        変換した場合True
+    """
+    # 既存のSentence要素を削除し、List要素に変換
+    sentences = list(paragraph_sentence)  # 子要素のコピーを作成
 
-            result += f"</{element.tag}>"
-            return result
+    # Sentence要素が10個以上の場合のみ変換を行う
+    sentence_count = sum(1 for elem in sentences if elem.tag == 'Sentence')
+    if sentence_count < 10:
+        return False
 
-        # ArithFormula要素の特別処理
-        if element.tag == 'ArithFormula':
-            # ArithFormula要素はテキストと子要素をすべて同じ行にまとめる
-            result = f"<{element.tag}{attr_str}>"
-            if element.text and element.text.strip():
+    # すべての子要素をクリア
+    paragraph_sentence.clear()
+
+    # 各SentenceをListに変換して追加
+    for sentence in sentences:
+        if sentence.tag == 'Sentence':
+            list_elem = convert_sentence_to_list(sentence)
+            paragraph_sentence.append(list_elem)
+        else:
+            # Sentence以外の要素はそのまま追加
+            paragraph_sentence.append(sentence)
+    return True
+
+# 逆変換で Column の間に戻す区切り文字（変更ログに記録がない場合）
+DEFAULT_SEPARATOR = '\u3000'
+
+def removed_separator(sentence_elem, list_elem):
+    """convert_sentence_to_list が分割時に取り除いた区切り文字（取り除いていない場合は None）
+
+    分割点の空白が子要素（ArithFormula等）の中にある場合は取り除かれないため、
+    変換前後のテキストの長さの差で判定します。
+    """
+    full_text = get_full_text(sentence_elem)
+    match = re.search(r'\s', full_text[:10])
+    if match and len(full_text) - len("".join(list_elem.itertext())) == 1:
+        return match.group()
+    return None
+
+def _append_text(element, text):
+    """要素の末尾（最後の子要素があればそのtail）にテキストを追加"""
+    if not text:
+        return
+    if len(element):
+        element[-1].tail = (element[-1].tail or "") + text
+    else:
+        element.text = (element.text or "") + text
+
+def restore_sentence(list_elem, attrib=None, separator=DEFAULT_SEPARATOR):
+    """convert_sentence_to_list の逆変換: List要素を元のSentence要素に戻す
+
+    Columnに分割されている場合は、各ColumnのSentenceの内容をつなぎ、その間に分割時に取り除いた
+    区切り文字 separator を戻します（None の場合は何も挟まない）。子要素は list_elem から移動します。
+
+    Args:
+        list_elem: 変換後のList要素
+        attrib: 元のSentence要素の属性（省略時は {"Num": "1"}）
+        separator: Columnの間に戻す区切り文字
+    """
+    sentence = ET.Element("Sentence", attrib if attrib is not None else {"Num": "1"})
+    list_sentence = list_elem.find('ListSentence')
+    if list_sentence is None:
+        return sentence
+    columns = list_sentence.findall('Column')
+    parts = [column.find('Sentence') for column in columns] if columns else [list_sentence.find('Sentence')]
+    for position, part in enumerate(parts):
+        if position > 0 and separator:
+            _append_text(sentence, separator)
+        if part is None:
+            continue
+        _append_text(sentence, part.text)
+        children = list(part)
+        for child in children:
+            part.remove(child)
+        sentence.extend(children)
+    return sentence
+
+def restore_paragraph_sentence(paragraph_sentence, record=None):
+    """transform_paragraph_sentence の逆変換: List要素をSentence要素に戻す（要素をその場で書き換える）
+
+    record は変更ログ（ChangeLogRecorder）の段落の記録で、元のSentence要素の属性（attributes）と
+    取り除いた区切り文字（separators）を使います。記録がない場合は Num を1から振り直し、
+    Columnの間に DEFAULT_SEPARATOR を戻します。
+
+    Returns:
+        Sentence要素に戻したList要素の数
+    """
+    record = record or {}
+    attributes = record.get('attributes')
+    separators = record.get('separators')
+    children = list(paragraph_sentence)
+    for child in children:
+        paragraph_sentence.remove(child)
+    restored = 0
+    for child in children:
+        if child.tag != 'List':
+            paragraph_sentence.append(child)
+            continue
+        attrib = attributes[restored] if attributes else {"Num": str(restored + 1)}
+        separator = separators[restored] if separators else DEFAULT_SEPARATOR
+        sentence = restore_sentence(child, attrib, separator)
+        sentence.tail = child.tail
+        paragraph_sentence.append(sentence)
+        restored += 1
+    return restored
+
+def restore_tree(root, change_log=None):
+    """transform_tree の逆変換: 変換されたParagraphSentenceを変換前の形に戻す（ルート要素をその場で書き換える）
+
+    change_log（ChangeLogRecorder.to_dict の形式）を指定した場合は、記録された段落だけを
+    記録された属性・区切り文字で戻します。指定しない場合は、Sentenceを含まずList要素が10個以上ある
+    ParagraphSentenceを変換された段落とみなします。
+
+    Returns:
+        戻したParagraphSentence要素の数
+    """
+    records = None
+    if change_log is not None:
+        records = {paragraph['index']: paragraph for paragraph in change_log.get('paragraphs', [])}
+    restored = 0
+    for index, (_, paragraph_sentence) in enumerate(list(iter_paragraph_sentences_with_path(root))):
+        if records is not None:
+            record = records.get(index)
+            if record is None:
+                continue
+        else:
+            record = None
+            tags = [child.tag for child in paragraph_sentence]
+            if tags.count('List') < 10 or 'Sentence' in tags:
+                continue
+        restore_paragraph_sentence(paragraph_sentence, record)
+        restored += 1
+    return restored
+
+def format_xml_element(element, level=0, fragments=None):
+    """expect.xmlに近いフォーマットでXML要素を整形
+
+    fragments には id(要素) をキーに整形済みの文字列を渡すことができ、
+    該当する要素はその文字列をそのまま使います（差分変換用）。
+    """
+    if fragments:
+        fragment = fragments.get(id(element))
+        if fragment is not None:
+            return fragment
+
+    # expect.xmlのインデントに合わせる（レベル0: 0スペース, レベル1: 2スペース, レベル2: 4スペース, etc.）
+    indent = "  " * level
+
+    # 開始タグ
+    attrs = []
+    for key, value in element.attrib.items():
+        if '{' in key and '}' in key:
+            # xmlns属性の場合、名前空間形式を正しい形式に変換
+            ns_end = key.find('}')
+            ns_uri = key[1:ns_end]
+            attr_name = key[ns_end + 1:]
+            if attr_name.startswith('xmlns:'):
+                attrs.append(f'{attr_name}="{ns_uri}"')
+            elif attr_name == 'noNamespaceSchemaLocation':
+                attrs.insert(0, f'xmlns:xsi="{ns_uri}"')  # xmlns:xsiを先頭に
+                attrs.append(f'xsi:{attr_name}="{value}"')
+        else:
+            attrs.append(f'{key}="{value}"')
+
+    # Law要素の場合、属性の順序をexpect.xmlに合わせる
+    if element.tag == 'Law':
+        ordered_attrs = []
+        # 通常属性
+        for attr in attrs:
+            if not attr.startswith('xmlns:') and not attr.startswith('xsi:'):
+                ordered_attrs.append(attr)
+        # xmlns属性
+        for attr in attrs:
+            if attr.startswith('xmlns:'):
+                ordered_attrs.append(attr)
+        # xsi属性
+        for attr in attrs:
+            if attr.startswith('xsi:'):
+                ordered_attrs.append(attr)
+        attrs = ordered_attrs
+
+    attr_str = ' ' + ' '.join(attrs) if attrs else ''
+
+    # Law要素の特別処理
+    if element.tag == 'Law':
+        attr_str += ' '
+
+    # Ruby要素の特別処理
+    if element.tag == 'Ruby':
+        # Ruby要素は子要素を同じ行にまとめる
+        result = f"<{element.tag}{attr_str}>"
+        if element.text and element.text.strip():
+            result += element.text.strip()
+
+        # 子要素を同じ行に
+        for child in element:
+            child_result = format_xml_element(child, 0)  # Rubyの子要素はインデントなし
+            result += child_result
+            if child.tail and child.tail.strip():
+                result += child.tail.strip()
+
+        result += f"</{element.tag}>"
+        return result
+
+    # Sentence要素の特別処理
+    if element.tag == 'Sentence':
+        # Sentence要素はテキストと子要素をすべて同じ行にまとめる
+        result = f"{indent}<{element.tag}{attr_str}>"
+        if element.text and element.text.strip():
+            result += element.text.strip()
+
+        # 子要素を同じ行に
+        for child in element:
+            child_result = format_xml_element(child, 0)  # Sentenceの子要素はインデントなし
+            result += child_result
+            if child.tail and child.tail.strip():
+                result += child.tail.strip()
+
+        result += f"</{element.tag}>"
+        return result
+
+    # ArithFormula要素の特別処理
+    if element.tag == 'ArithFormula':
+        # ArithFormula要素はテキストと子要素をすべて同じ行にまとめる
+        result = f"<{element.tag}{attr_str}>"
+        if element.text and element.text.strip():
+            result += element.text.strip()
+
+        # 子要素を同じ行に
+        for child in element:
+            child_result = format_xml_element(child, 0)  # ArithFormulaの子要素はインデントなし
+            result += child_result
+            if child.tail and child.tail.strip():
+                result += child.tail.strip()
+
+        result += f"</{element.tag}>"
+        return result
+
+    # 空要素の場合
+    if len(element) == 0 and (element.text is None or element.text.strip() == ''):
+        if element.tag in ['ArticleTitle', 'ParagraphNum', 'TableStructTitle', 'Remarks', 'ItemTitle']:
+            # expect.xmlではこれらの要素は <tag></tag> 形式
+            result = f"{indent}<{element.tag}{attr_str}></{element.tag}>"
+        else:
+            # 他の空要素は <tag/> 形式
+            result = f"{indent}<{element.tag}{attr_str}/>"
+    else:
+        result = f"{indent}<{element.tag}{attr_str}>"
+
+        # テキストコンテンツ
+        if element.text and element.text.strip():
+            if element.tag == 'Sentence':
+                # Sentence要素はテキストを1行で出力
+                text_content = element.text.strip()
+                result += text_content
+            elif element.tag == 'LawNum':
+                # LawNum要素はテキストをそのまま（改行なし）
+                result += element.text.strip()
+            else:
                 result += element.text.strip()
 
-            # 子要素を同じ行に
+        # 子要素
+        if len(element) > 0:
+            result += "\n"
             for child in element:
-                child_result = format_xml_element(child, 0)  # ArithFormulaの子要素はインデントなし
-                result += child_result
+                result += format_xml_element(child, level + 1, fragments)
+                # tailテキストがある場合は追加
                 if child.tail and child.tail.strip():
                     result += child.tail.strip()
-
-            result += f"</{element.tag}>"
-            return result
-
-        # 空要素の場合
-        if len(element) == 0 and (element.text is None or element.text.strip() == ''):
-            if element.tag in ['ArticleTitle', 'ParagraphNum', 'TableStructTitle', 'Remarks', 'ItemTitle']:
-                # expect.xmlではこれらの要素は <tag></tag> 形式
-                result = f"{indent}<{element.tag}{attr_str}></{element.tag}>"
-            else:
-                # 他の空要素は <tag/> 形式
-                result = f"{indent}<{element.tag}{attr_str}/>"
-        else:
-            result = f"{indent}<{element.tag}{attr_str}>"
-
-            # テキストコンテンツ
-            if element.text and element.text.strip():
-                if element.tag == 'Sentence':
-                    # Sentence要素はテキストを1行で出力
-                    text_content = element.text.strip()
-                    result += text_content
-                elif element.tag == 'LawNum':
-                    # LawNum要素はテキストをそのまま（改行なし）
-                    result += element.text.strip()
-                else:
-                    result += element.text.strip()
-
-            # 子要素
-            if len(element) > 0:
                 result += "\n"
-                for child in element:
-                    result += format_xml_element(child, level + 1)
-                    # tailテキストがある場合は追加
-                    if child.tail and child.tail.strip():
-                        result += child.tail.strip()
-                    result += "\n"
-                result += indent
-            elif element.tag == 'Sentence' and element.text and element.text.strip():
-                # Sentence要素の場合は閉じタグを同じ行に
-                pass
-            elif element.tag == 'LawNum' and element.text and element.text.strip():
-                # LawNum要素の場合は閉じタグを同じ行に
-                pass
-            else:
-                pass
+            result += indent
+        elif element.tag == 'Sentence' and element.text and element.text.strip():
+            # Sentence要素の場合は閉じタグを同じ行に
+            pass
+        elif element.tag == 'LawNum' and element.text and element.text.strip():
+            # LawNum要素の場合は閉じタグを同じ行に
+            pass
+        else:
+            pass
 
-            result += f"</{element.tag}>"
+        result += f"</{element.tag}>"
 
-        return result
+    return result
 
+def serialize_xml(root, fragments=None):
+    """expect.xmlに近いフォーマットでXML文書全体を文字列に整形"""
     # XML宣言 + ルート要素の整形
     xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml_content += format_xml_element(root)
+    xml_content += format_xml_element(root, 0, fragments)
     xml_content += '\n'  # ファイル末尾に改行を追加
+    return xml_content
+
+# 差分変換でキャッシュする単位となる要素（入れ子の場合は最も外側の要素が単位）
+INCREMENTAL_UNIT_TAGS = ('Article', 'Paragraph')
+
+_converter_version = None
+
+def converter_version():
+    """変換ロジックのバージョン（このモジュールのソースのハッシュ。キャッシュの無効化に使用）"""
+    global _converter_version
+    if _converter_version is None:
+        import hashlib
+        _converter_version = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+    return _converter_version
+
+def _subtree_key(element, level):
+    """要素のサブツリー（tailを除く）と整形時のインデントレベルからキャッシュキーを計算"""
+    import hashlib
+
+    tail = element.tail
+    element.tail = None
+    try:
+        data = ET.tostring(element, encoding='utf-8')
+    finally:
+        element.tail = tail
+    digest = hashlib.sha256(f"{converter_version()}\0{level}\0".encode('utf-8'))
+    digest.update(data)
+    return digest.hexdigest()
+
+def _collect_incremental_units(element, level, units, loose_paragraph_sentences):
+    """キャッシュ単位の要素と、どの単位にも含まれないParagraphSentenceを収集"""
+    for child in element:
+        if child.tag in INCREMENTAL_UNIT_TAGS:
+            units.append((child, level + 1))
+        elif child.tag == 'ParagraphSentence':
+            loose_paragraph_sentences.append(child)
+        else:
+            _collect_incremental_units(child, level + 1, units, loose_paragraph_sentences)
+
+def serialize_xml_incremental(root, cache):
+    """Article等の単位ごとに整形済みの断片をキャッシュから再利用して変換・整形する
+
+    変更のない単位（入力のサブツリーのハッシュが一致するもの）は変換も整形も行わず、
+    キャッシュの断片をそのまま使います。出力は transform_tree + serialize_xml と同一です。
+
+    Args:
+        root: 入力XMLのルート要素（変更された単位はその場で書き換えられる）
+        cache: get_many / put_many を持つ断片キャッシュ（xml_fragment_cache.FragmentCache）
+
+    Returns:
+        (整形済みXML文字列, 変換したParagraphSentence数, キャッシュから再利用した単位数, 変換した単位数)
+    """
+    units = []
+    loose_paragraph_sentences = []
+    _collect_incremental_units(root, 0, units, loose_paragraph_sentences)
+
+    # 変換で書き換える前にすべての単位のキーを計算する
+    keys = [_subtree_key(unit, level) for unit, level in units]
+    cached = cache.get_many(keys)
 
+    fragments = {}
+    new_entries = []
+    converted_count = 0
+    for (unit, level), key in zip(units, keys):
+        entry = cached.get(key)
+        if entry is None:
+            count = transform_tree(unit)
+            entry = (format_xml_element(unit, level), count)
+            new_entries.append((key, entry[0], count))
+            cached[key] = entry  # 同一文書内の同じ内容の単位で再利用
+        fragments[id(unit)] = entry[0]
+        converted_count += entry[1]
+
+    for paragraph_sentence in loose_paragraph_sentences:
+        if transform_paragraph_sentence(paragraph_sentence):
+            converted_count += 1
+
+    cache.put_many(new_entries)
+    return (serialize_xml(root, fragments), converted_count,
+            len(units) - len(new_entries), len(new_entries))
+
+def write_xml(xml_content, output_file):
+    """整形済みのXML文字列をファイルに書き込む"""
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(xml_content)
 
-def process_folder(input_dir, output_dir, recursive=False):
+def convert_xml(input_file, output_file, cache=None, on_paragraph=None):
+    """XMLファイルを変換する
+
+    Args:
+        input_file: 入力XMLファイル
+        output_file: 出力XMLファイル
+        cache: 断片キャッシュ（指定した場合、変更のないArticle等の変換・整形を省略）
+        on_paragraph: ParagraphSentenceごとのコールバック（transform_tree を参照）。
+            すべての段落を変換する必要があるため、指定した場合は cache を使いません
+
+    Returns:
+        変換したParagraphSentence要素の数
+    """
+    root = parse_xml(input_file)
+    if cache is not None and on_paragraph is None:
+        xml_content, converted_count, _, _ = serialize_xml_incremental(root, cache)
+        write_xml(xml_content, output_file)
+        return converted_count
+    converted_count = transform_tree(root, on_paragraph)
+    write_xml(serialize_xml(root), output_file)
+    return converted_count
+
+def convert_and_validate(input_file, output_file, on_paragraph=None, schema=None):
+    """XMLファイルを変換し、出力ファイルを読み直さずに値の検証も行う
+
+    入力の値は変換前のツリーから抽出し、出力の値は書き込む整形済みXMLをメモリ上でパースして抽出します。
+    変換後のツリーではなく実際に書き込む内容を使うため、整形時の欠落も検出できます。
+    schema にXSDのパスを指定すると、値の抽出に使ったパース済みのツリーをそのままスキーマでも検証し、
+    結果を "schema" キーに格納します（xml_schema_validator.validate_schema を参照）。
+
+    Returns:
+        (変換したParagraphSentence要素の数, compare_value_lists の結果)
+    """
+    from xml_content_validator_v2 import extract_values_from_root, extract_values_from_lines, compare_value_lists
+
+    root = parse_xml(input_file)
+    values1 = extract_values_from_root(root)
+    converted_count = transform_tree(root, on_paragraph)
+    xml_content = serialize_xml(root)
+    write_xml(xml_content, output_file)
+    output_root = None
+    try:
+        output_root = ET.fromstring(xml_content.encode('utf-8'))
+        values2 = extract_values_from_root(output_root)
+    except ET.ParseError:
+        values2 = extract_values_from_lines(output_file)
+    result = compare_value_lists(values1, values2)
+    if schema is not None:
+        from xml_schema_validator import validate_schema
+        result['schema'] = validate_schema(output_root if output_root is not None else output_file, schema)
+    return converted_count, result
+
+def convert_bytes(xml_bytes):
+    """XMLのバイト列を変換し、変換後のXMLをUTF-8のバイト列で返す（ファイルを介さない）"""
+    root = ET.fromstring(xml_bytes)
+    transform_tree(root)
+    return serialize_xml(root).encode('utf-8')
+
+CHANGE_LOG_SUFFIX = '.changes.json'
+
+def change_log_path(output_file):
+    """出力ファイルの変更ログ（サイドカー）のパス（例: output.xml → output.xml.changes.json）"""
+    output_file = Path(output_file)
+    return output_file.with_name(output_file.name + CHANGE_LOG_SUFFIX)
+
+class ChangeLogRecorder:
+    """変換したParagraphSentenceを文書内の順番（0始まり）と要素パスで記録する
+
+    あわせて、すべてのParagraphSentenceについて変換前の値（検証で比較する値）のダイジェストを、
+    変換した段落については逆変換（restore_tree）に必要な元のSentence要素の属性と、
+    分割時に取り除いた区切り文字（取り除いていない文は null）を記録します。
+    transform_tree / convert_xml の on_paragraph にそのまま渡せます。
+    write で出力ファイルの隣に変更ログを保存すると、検証（xml_content_validator_v2.py --change-log）は
+    入力ファイルを解析せずに、出力ファイルの段落ごとの値をダイジェストと照合するだけで済みます。
+    """
+
+    # 段落ごとのダイジェストの長さ（16進数の桁数）
+    DIGEST_LENGTH = 32
+
+    def __init__(self):
+        self.paragraph_count = 0
+        self.paragraphs = []
+        self.digests = []
+
+    def __call__(self, path, paragraph_sentence, original_children, converted):
+        from xml_content_validator_v2 import extract_paragraph_values, values_digest
+
+        values = []
+        extract_paragraph_values(original_children, values)
+        self.digests.append(values_digest(values)[:self.DIGEST_LENGTH])
+        if converted:
+            sentences = [child for child in original_children if child.tag == 'Sentence']
+            lists = [child for child in paragraph_sentence if child.tag == 'List']
+            self.paragraphs.append({
+                "index": self.paragraph_count,
+                "path": path,
+                "items": len(sentences),
+                "attributes": [dict(sentence.attrib) for sentence in sentences],
+                "separators": [removed_separator(sentence, list_elem)
+                               for sentence, list_elem in zip(sentences, lists)],
+            })
+        self.paragraph_count += 1
+
+    def to_dict(self, input_file):
+        import hashlib
+        from xml_content_validator_v2 import extraction_version
+
+        return {
+            "converter_version": converter_version(),
+            "extraction_version": extraction_version(),
+            "source": Path(input_file).name,
+            "source_sha256": hashlib.sha256(Path(input_file).read_bytes()).hexdigest(),
+            "paragraph_count": self.paragraph_count,
+            "paragraphs": self.paragraphs,
+            "digests": self.digests,
+        }
+
+    def write(self, input_file, output_file):
+        """変更ログを change_log_path(output_file) に書き込む"""
+        import json
+
+        log_file = change_log_path(output_file)
+        log_file.write_text(json.dumps(self.to_dict(input_file), ensure_ascii=False) + "\n", encoding='utf-8')
+        return log_file
+
+def _chain_paragraph_hooks(*hooks):
+    """複数の on_paragraph コールバックを1つにまとめる（すべて None の場合は None）"""
+    hooks = [hook for hook in hooks if hook is not None]
+    if len(hooks) <= 1:
+        return hooks[0] if hooks else None
+
+    def on_paragraph(*args):
+        for hook in hooks:
+            hook(*args)
+    return on_paragraph
+
+class ConversionObserver:
+    """一括変換の進捗イベントを受け取るオブザーバの基底クラス
+
+    必要なメソッドだけを上書きして process_folder / convert_tasks の observers に渡します。
+    イベントは常に呼び出し元のスレッドから送られます。
+    """
+
+    def batch_started(self, total):
+        """一括変換の開始（total: 対象ファイル数）"""
+
+    def file_started(self, name):
+        """1ファイルの変換開始（段階パイプラインでは送られません）"""
+
+    def file_converted(self, name, seconds, converted_count):
+        """1ファイルの変換完了（seconds: 処理時間、converted_count: 変換したParagraphSentence数）"""
+
+    def file_validated(self, name, identical):
+        """1ファイルの検証完了（identical: 値が同一の場合True）"""
+
+    def file_schema_checked(self, name, result):
+        """1ファイルのスキーマ検証完了（result: xml_schema_validator.validate_schema の結果）"""
+
+    def file_failed(self, name, error):
+        """1ファイルの変換失敗（error: エラー情報の辞書）"""
+
+    def batch_finished(self, success_count, errors):
+        """一括変換の完了"""
+
+class ConsoleReporter(ConversionObserver):
+    """進捗を標準出力に表示するオブザーバ（CLIの既定）"""
+
+    def __init__(self):
+        self.validation_failed = 0
+        self.schema_failed = 0
+
+    def batch_started(self, total):
+        print(f"{total} 個のXMLファイルを処理します...")
+
+    def file_started(self, name):
+        print(f"処理中: {name}")
+
+    def file_converted(self, name, seconds, converted_count):
+        print(f"  ✓ 完了: {name}")
+
+    def file_validated(self, name, identical):
+        if identical:
+            print(f"    検証成功: {name}")
+        else:
+            self.validation_failed += 1
+            print(f"    ❌ 検証で差異検出: {name}")
+
+    def file_schema_checked(self, name, result):
+        if result['status'] != 'passed':
+            from xml_schema_validator import format_schema_status
+            mark = "❌" if result['status'] == 'failed' else "⏭️"
+            print(f"    {mark} {format_schema_status(result)}: {name}")
+        if result['status'] == 'failed':
+            self.schema_failed += 1
+
+    def file_failed(self, name, error):
+        print(f"  ✗ エラー: {name} - {_format_error_message(error)}")
+
+    def batch_finished(self, success_count, errors):
+        print(f"\n全ファイルの処理が完了しました。")
+        print(f"  成功: {success_count} 個")
+        if errors:
+            print(f"  エラー: {len(errors)} 個")
+        if self.validation_failed:
+            print(f"  検証で差異検出: {self.validation_failed} 個")
+        if self.schema_failed:
+            print(f"  スキーマ違反: {self.schema_failed} 個")
+
+class ConversionMetrics(ConversionObserver):
+    """処理件数・処理時間・変換箇所数を集計するオブザーバ（メトリクス出力用）"""
+
+    def __init__(self):
+        self.total = 0
+        self.started = 0
+        self.converted = 0
+        self.failed = 0
+        self.validation_failed = 0
+        self.schema_failed = 0
+        self.converted_paragraphs = 0
+        self.conversion_seconds = 0.0
+        # 値の検証・スキーマ検証に失敗したファイルの (表示名, 内容)
+        self.validation_failures = []
+
+    def batch_started(self, total):
+        self.total = total
+
+    def file_started(self, name):
+        self.started += 1
+
+    def file_converted(self, name, seconds, converted_count):
+        self.converted += 1
+        self.converted_paragraphs += converted_count
+        self.conversion_seconds += seconds
+
+    def file_validated(self, name, identical):
+        if not identical:
+            self.validation_failed += 1
+            self.validation_failures.append((name, "値の検証で差異検出"))
+
+    def file_schema_checked(self, name, result):
+        if result['status'] == 'failed':
+            from xml_schema_validator import format_schema_status
+            self.schema_failed += 1
+            self.validation_failures.append((name, format_schema_status(result)))
+
+    def file_failed(self, name, error):
+        self.failed += 1
+
+    def as_dict(self):
+        return {
+            "total": self.total,
+            "converted": self.converted,
+            "failed": self.failed,
+            "validation_failed": self.validation_failed,
+            "schema_failed": self.schema_failed,
+            "converted_paragraphs": self.converted_paragraphs,
+            "conversion_seconds": self.conversion_seconds,
+        }
+
+class _ValidationTally(ConversionObserver):
+    """抽出検証で、値の検証に成功したファイルを記録するオブザーバ"""
+
+    def __init__(self):
+        self.passed = set()
+
+    def file_validated(self, name, identical):
+        if identical:
+            self.passed.add(name)
+
+def _run_sampled_validation(tasks, sampling, observers, run):
+    """検証するタスクを抽出し、抽出したタスクだけ検証付きで変換する（残りは変換のみ）
+
+    入力ファイルのサイズと変換密度（xml_sampling.conversion_density）で層に分けて抽出します。
+    抽出したファイルの変換エラーも検証失敗として数えます。
+
+    Args:
+        run: run(タスクのリスト, validate) → (成功数, エラー情報のリスト)
+
+    Returns:
+        (成功数, エラー情報のリスト, 失敗率の推定（xml_sampling.Sample.failure_bound の結果）)
+    """
+    from xml_sampling import conversion_density
+
+    sample = sampling.select([task[2] for task in tasks],
+                             [Path(task[0]).stat().st_size for task in tasks],
+                             [conversion_density(task[0]) for task in tasks])
+    chosen = set(sample.indices)
+    tally = _ValidationTally()
+    observers.append(tally)
+    try:
+        validated_count, validated_errors = run([tasks[index] for index in sample.indices], True)
+        converted_count, errors = run([task for index, task in enumerate(tasks) if index not in chosen], False)
+    finally:
+        observers.remove(tally)
+    failed = [index for index in sample.indices if tasks[index][2] not in tally.passed]
+    return validated_count + converted_count, validated_errors + errors, sample.failure_bound(failed)
+
+def _notify(observers, event, *args):
+    """登録されたオブザーバにイベントを送る"""
+    for observer in observers:
+        getattr(observer, event)(*args)
+
+# バッチ処理で記録する制限超過エラーのタイプ
+TIMEOUT_ERROR_TYPE = "タイムアウト"
+MEMORY_LIMIT_ERROR_TYPE = "メモリ上限超過"
+WORKER_CRASH_ERROR_TYPE = "ワーカー異常終了"
+
+def _build_error_info(e):
+    """変換時の例外をエラー情報の辞書に変換する（プロセス間で受け渡し可能な形式）"""
+    if isinstance(e, ET.ParseError):
+        position = getattr(e, 'position', None)
+        return {
+            "error_type": "XML構文エラー",
+            "error_message": str(e),
+            "line": position[0] if position else None,
+            "column": position[1] if position else None
+        }
+    return {
+        "error_type": type(e).__name__,
+        "error_message": str(e)
+    }
+
+def _format_error_message(error):
+    """エラー情報をコンソール表示用の文字列に整形"""
+    if error["error_type"] == "XML構文エラー":
+        error_msg = f"XML構文エラー: {error['error_message']}"
+        if error.get("line") is not None:
+            error_msg += f" (行 {error['line']}, 列 {error['column']})"
+        return error_msg
+    return f"{error['error_type']}: {error['error_message']}"
+
+def _read_rss_bytes(pid):
+    """プロセスの常駐メモリ量（RSS）をバイト単位で取得（/procがない環境ではNone）"""
+    try:
+        with open(f"/proc/{pid}/statm", 'r') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    import os
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+def _batch_worker_main(conn, cache_spec=None, index_path=None, validate=False, change_log=False, schema=None):
+    """バッチ処理ワーカー: 親プロセスから受け取ったファイルを順に変換する
+
+    cache_spec に (キャッシュファイルのパス, 上限バイト数) を渡すと差分変換を行い、
+    index_path を渡すと変換しながら文索引を更新し、validate が True の場合は値の検証も行う。
+    change_log が True の場合は出力ごとに変更ログを書き込む。
+    schema にXSDのパスを渡すと出力をスキーマで検証する（コンパイル済みスキーマはワーカー内で再利用される）
+    """
+    cache = None
+    if cache_spec:
+        from xml_fragment_cache import FragmentCache
+        cache = FragmentCache(*cache_spec)
+    index = None
+    if index_path:
+        from xml_sentence_index import SentenceIndex
+        index = SentenceIndex(index_path)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        input_file, output_file, display_name = task
+        try:
+            conn.send(_convert_task(input_file, output_file, display_name, cache, index, validate, change_log,
+                                    schema))
+        except Exception as e:
+            conn.send(_build_error_info(e))
+    if cache is not None:
+        cache.close()
+    if index is not None:
+        index.close()
+    conn.close()
+
+class _BatchWorker:
+    """変換ワーカープロセスと、処理中タスクの状態を保持する"""
+
+    def __init__(self, ctx, cache_spec=None, index_path=None, validate=False, change_log=False, schema=None):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_batch_worker_main,
+                                   args=(child_conn, cache_spec, index_path, validate, change_log, schema),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.size = 0
+        self.started = None
+        self.deadline = None
+
+    def submit(self, task, size, timeout):
+        import time
+        input_file, output_file, display_name = task
+        self.task = task
+        self.size = size
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self.conn.send((str(input_file), str(output_file), display_name))
+
+    def finish(self):
+        task = self.task
+        self.task = None
+        self.size = 0
+        self.deadline = None
+        return task
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+def _run_isolated_batch(tasks, jobs, timeout, memory_limit_mb, max_inflight_mb, observers, cache=None,
+                        index=None, validate=False, change_log=False, schema=None):
+    """ワーカープロセスでファイルを変換し、制限を超えたワーカーは強制終了して再起動する
+
+    Args:
+        tasks: (入力ファイル, 出力ファイル, 表示名) のリスト
+        jobs: ワーカープロセス数
+        timeout: 1ファイルあたりの処理時間上限（秒、Noneで無制限）
+        memory_limit_mb: ワーカー1つあたりのRSS上限（MB、Noneで無制限）
+        max_inflight_mb: 同時に処理中のファイルサイズ合計の上限（MB、Noneで無制限）
+        observers: 進捗イベントを受け取る ConversionObserver のリスト
+        cache: 断片キャッシュ（各ワーカーは同じキャッシュファイルを開いて差分変換する）
+        index: 文索引（各ワーカーは同じ索引ファイルを開いて更新する）
+        validate: Trueの場合、各ワーカーで変換と同時に値の検証も行う
+        change_log: Trueの場合、各ワーカーで出力ごとに変更ログを書き込む
+        schema: 出力を検証するXSDのパス（Noneでスキーマ検証しない）
+
+    Returns:
+        (成功数, エラー情報のリスト)
+    """
+    import multiprocessing
+    from multiprocessing.connection import wait
+    from collections import deque
+    import time
+
+    memory_limit = int(memory_limit_mb * 1024 * 1024) if memory_limit_mb else None
+    inflight_budget = int(max_inflight_mb * 1024 * 1024) if max_inflight_mb else None
+    if memory_limit and _read_rss_bytes(multiprocessing.current_process().pid) is None:
+        print("  ⚠️ この環境ではメモリ使用量を取得できないため、メモリ上限は適用されません。")
+        memory_limit = None
+
+    ctx = multiprocessing.get_context()
+    cache_spec = (str(cache.path), cache.max_bytes) if cache is not None else None
+    index_path = str(index.path) if index is not None else None
+    workers = [_BatchWorker(ctx, cache_spec, index_path, validate, change_log, schema) for _ in range(max(1, jobs))]
+    pending = deque(tasks)
+    inflight_bytes = 0
+    errors = []
+    success_count = 0
+
+    def replace(worker):
+        worker.kill()
+        workers[workers.index(worker)] = _BatchWorker(ctx, cache_spec, index_path, validate, change_log, schema)
+
+    def abort_task(worker, error_type, error_message):
+        _, output_file, display_name = worker.finish()
+        # 強制終了したワーカーが書きかけた出力を残さない
+        Path(output_file).unlink(missing_ok=True)
+        error = {"error_type": error_type, "error_message": error_message}
+        if observers:
+            _notify(observers, 'file_failed', display_name, error)
+        errors.append({"file": display_name, **error})
+        replace(worker)
+
+    try:
+        while pending or any(w.task for w in workers):
+            # 処理中ファイルサイズの合計が上限内に収まる範囲でタスクを投入
+            for worker in workers:
+                if not pending:
+                    break
+                if worker.task:
+                    continue
+                size = pending[0][0].stat().st_size
+                if inflight_budget and inflight_bytes and inflight_bytes + size > inflight_budget:
+                    break
+                task = pending.popleft()
+                if observers:
+                    _notify(observers, 'file_started', task[2])
+                worker.submit(task, size, timeout)
+                inflight_bytes += size
+
+            busy = [w for w in workers if w.task]
+            now = time.monotonic()
+            deadlines = [w.deadline - now for w in busy if w.deadline]
+            wait_timeout = min(deadlines) if deadlines else None
+            if memory_limit:
+                wait_timeout = 0.1 if wait_timeout is None else min(wait_timeout, 0.1)
+            ready = wait([w.conn for w in busy], timeout=max(0, wait_timeout) if wait_timeout is not None else None)
+
+            for worker in busy:
+                if worker.conn in ready:
+                    inflight_bytes -= worker.size
+                    try:
+                        result = worker.conn.recv()
+                    except EOFError:
+                        worker.process.join()
+                        abort_task(worker, WORKER_CRASH_ERROR_TYPE,
+                                   f"ワーカープロセスが異常終了しました (終了コード {worker.process.exitcode})")
+                        continue
+                    seconds = time.monotonic() - worker.started
+                    _, _, display_name = worker.finish()
+                    if isinstance(result, tuple):
+                        converted_count, identical, schema_result = result
+                        if observers:
+                            _notify(observers, 'file_converted', display_name, seconds, converted_count)
+                            if identical is not None:
+                                _notify(observers, 'file_validated', display_name, identical)
+                            if schema_result is not None:
+                                _notify(observers, 'file_schema_checked', display_name, schema_result)
+                        success_count += 1
+                    else:
+                        if observers:
+                            _notify(observers, 'file_failed', display_name, result)
+                        errors.append({"file": display_name, **result})
+                elif worker.deadline and time.monotonic() >= worker.deadline:
+                    inflight_bytes -= worker.size
+                    abort_task(worker, TIMEOUT_ERROR_TYPE,
+                               f"処理時間が上限 {timeout} 秒を超えたため中断しました")
+                elif memory_limit:
+                    rss = _read_rss_bytes(worker.process.pid)
+                    if rss is not None and rss > memory_limit:
+                        inflight_bytes -= worker.size
+                        abort_task(worker, MEMORY_LIMIT_ERROR_TYPE,
+                                   f"メモリ使用量が上限 {memory_limit_mb} MB を超えたため中断しました")
+    finally:
+        for worker in workers:
+            if worker.task:
+                worker.kill()
+            else:
+                worker.stop()
+
+    return success_count, errors
+
+def _convert_task(input_file, output_file, display_name, cache=None, index=None, validate=False,
+                  change_log=False, schema=None):
+    """1ファイルを変換し、索引が指定されていれば表示名をキーとして文索引を更新する
+
+    change_log が True の場合は、変換した段落を出力ファイルの隣の変更ログに書き込む。
+    schema にXSDのパスを指定すると出力をスキーマで検証する（validate 時はパース済みのツリーを使う）
+
+    Returns:
+        (変換したParagraphSentence要素の数, 値が同一か（検証しない場合は None）,
+         スキーマ検証の結果（検証しない場合は None）)
+    """
+    recorder = index.recorder(display_name) if index is not None else None
+    change_recorder = ChangeLogRecorder() if change_log else None
+    on_paragraph = _chain_paragraph_hooks(recorder, change_recorder)
+    identical = schema_result = None
+    if validate:
+        converted_count, result = convert_and_validate(input_file, output_file, on_paragraph=on_paragraph,
+                                                       schema=schema)
+        identical = result['identical']
+        schema_result = result.get('schema')
+    else:
+        converted_count = convert_xml(input_file, output_file, cache=cache, on_paragraph=on_paragraph)
+        if schema is not None:
+            from xml_schema_validator import validate_schema
+            schema_result = validate_schema(output_file, schema)
+    if recorder is not None:
+        recorder.commit(input_file)
+    if change_recorder is not None:
+        change_recorder.write(input_file, output_file)
+    return converted_count, identical, schema_result
+
+def convert_tasks(tasks, jobs=None, timeout=None, memory_limit_mb=None, max_inflight_mb=None,
+                  observers=(), cache=None, index=None, validate=False, change_log=False, schema=None):
+    """(入力ファイル, 出力ファイル, 表示名) のリストを変換する
+
+    制限オプションのいずれかを指定するとワーカープロセスで変換し、
+    指定しない場合は現在のプロセスで順に変換します。
+    進捗は observers に渡した ConversionObserver へイベントとして通知されます。
+    cache に断片キャッシュを渡すと、変更のないArticle等の変換・整形を省略します。
+    index に文索引（xml_sentence_index.SentenceIndex）を渡すと、変換しながら索引を更新します。
+    validate が True の場合は convert_and_validate で変換と同時に値を検証し、file_validated を通知します。
+    change_log が True の場合は出力ごとに変換した段落の変更ログ（ChangeLogRecorder）を書き込みます。
+    schema にXSDのパスを渡すと出力をスキーマでも検証し、file_schema_checked を通知します。
+
+    Returns:
+        (成功数, エラー情報のリスト)
+    """
+    observers = list(observers)
+    isolated = any(option is not None for option in (jobs, timeout, memory_limit_mb, max_inflight_mb))
+    if isolated:
+        return _run_isolated_batch(tasks, jobs or 1, timeout, memory_limit_mb, max_inflight_mb,
+                                   observers, cache=cache, index=index, validate=validate,
+                                   change_log=change_log, schema=schema)
+
+    import time
+
+    errors = []
+    success_count = 0
+    for input_file, output_file, display_name in tasks:
+        if observers:
+            _notify(observers, 'file_started', display_name)
+        started = time.perf_counter()
+        try:
+            converted_count, identical, schema_result = _convert_task(input_file, output_file, display_name,
+                                                                      cache, index, validate, change_log, schema)
+        except Exception as e:
+            error = _build_error_info(e)
+            if observers:
+                _notify(observers, 'file_failed', display_name, error)
+            errors.append({"file": display_name, **error})
+            continue
+        if observers:
+            _notify(observers, 'file_converted', display_name, time.perf_counter() - started, converted_count)
+            if identical is not None:
+                _notify(observers, 'file_validated', display_name, identical)
+            if schema_result is not None:
+                _notify(observers, 'file_schema_checked', display_name, schema_result)
+        success_count += 1
+    return success_count, errors
+
+def _run_pipeline_batch(tasks, queue_size, validate, observers, schema=None, jobs=None):
+    """段階パイプラインでタスクを変換し、段階ごとの統計を表示する
+
+    jobs を指定すると、CPU処理の段階（変換・スキーマ検証・値の検証）をワーカープロセスで実行します。
+
+    Returns:
+        (成功数, エラー情報のリスト)
+    """
+    import time
+    from xml_pipeline import run_pipeline, format_pipeline_stats
+
+    errors = []
+
+    def report(item):
+        if item.error:
+            if observers:
+                _notify(observers, 'file_failed', item.display_name, item.error)
+            errors.append({"file": item.display_name, **item.error})
+            return
+        if observers:
+            _notify(observers, 'file_converted', item.display_name, item.seconds, item.converted_count)
+            if item.identical is not None:
+                _notify(observers, 'file_validated', item.display_name, item.identical)
+            if item.schema is not None:
+                _notify(observers, 'file_schema_checked', item.display_name, item.schema)
+
+    started = time.perf_counter()
+    results, stats = run_pipeline(tasks, validate=validate, queue_size=queue_size, on_result=report,
+                                  schema=schema, jobs=jobs)
+    print("")
+    print(format_pipeline_stats(stats, time.perf_counter() - started))
+    return len(results) - len(errors), errors
+
+def read_file_pairs(source, null_delimited=False, min_fields=2, max_fields=2):
+    """ファイルリストから「入力<TAB>出力」形式のパスの組を読み込む
+
+    Args:
+        source: リストファイルのパス（'-' の場合は標準入力）
+        null_delimited: Trueの場合、レコードを改行ではなくNUL文字で区切る
+            （パスに改行を含む場合や find -print0 と組み合わせる場合）
+        min_fields: 1レコードに必要なパスの数
+        max_fields: 1レコードに含められるパスの数
+
+    Returns:
+        パスのタプルのリスト（足りないフィールドはNone）
+    """
+    import sys
+
+    if source == '-':
+        data = sys.stdin.buffer.read()
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    text = data.decode('utf-8')
+
+    separator = '\0' if null_delimited else '\n'
+    pairs = []
+    for record_no, record in enumerate(text.split(separator), 1):
+        if not null_delimited:
+            record = record.rstrip('\r')
+        if not record.strip():
+            continue
+        fields = record.split('\t')
+        if not min_fields <= len(fields) <= max_fields:
+            raise ValueError(
+                f"ファイルリストの {record_no} 件目の形式が不正です（タブ区切りで {min_fields}〜{max_fields} 個のパスが必要）: {record!r}"
+            )
+        fields += [None] * (max_fields - len(fields))
+        pairs.append(tuple(Path(field) if field else None for field in fields))
+    return pairs
+
+def write_conversion_error_report(output_path, input_path, total_count, success_count, errors,
+                                  timeout=None, memory_limit_mb=None, validation_failures=()):
+    """変換エラー情報を validation_results/conversion_errors.md に出力
+
+    validation_failures に (表示名, 内容) のリスト（ConversionMetrics.validation_failures）を渡すと、
+    値の検証・スキーマ検証に失敗したファイルも記録する
+    """
+    from datetime import datetime
+
+    error_report_path = Path(output_path) / "validation_results" / "conversion_errors.md"
+    error_report_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(error_report_path, 'w', encoding='utf-8') as f:
+        f.write("# XML変換エラー詳細\n\n")
+        f.write(f"## 処理概要\n\n")
+        f.write(f"- **実行日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"- **入力フォルダ**: {input_path}\n")
+        f.write(f"- **出力フォルダ**: {output_path}\n")
+        f.write(f"- **総処理ファイル数**: {total_count}\n")
+        f.write(f"- **✅ 変換成功**: {success_count} ファイル\n")
+        f.write(f"- **❌ 変換失敗**: {len(errors)} ファイル\n")
+        if validation_failures:
+            f.write(f"- **❌ 検証失敗**: {len(validation_failures)} 件\n")
+        if timeout is not None:
+            f.write(f"- **処理時間上限**: {timeout} 秒/ファイル\n")
+        if memory_limit_mb is not None:
+            f.write(f"- **メモリ上限**: {memory_limit_mb} MB/ワーカー\n")
+        f.write("\n")
+
+        f.write("## エラー詳細\n\n")
+        for i, error in enumerate(errors, 1):
+            f.write(f"### {i}. {error['file']}\n\n")
+            f.write(f"- **エラータイプ**: {error['error_type']}\n")
+            f.write(f"- **エラーメッセージ**: {error['error_message']}\n")
+            if error.get('line') is not None:
+                f.write(f"- **エラー位置**: 行 {error['line']}, 列 {error.get('column', 'N/A')}\n")
+            f.write("\n")
+
+        if validation_failures:
+            f.write("## 検証失敗\n\n")
+            for i, (name, detail) in enumerate(validation_failures, 1):
+                f.write(f"{i}. {name} - {detail}\n")
+            f.write("\n")
+
+    print(f"  📄 エラー詳細: {error_report_path}")
+
+def process_folder(input_dir, output_dir, recursive=False, jobs=None, timeout=None,
+                   memory_limit_mb=None, max_inflight_mb=None, pipeline=False, queue_size=4,
+                   validate=False, observers=None, incremental=False, cache_path=None,
+                   cache_max_mb=256, index_path=None, change_log=False, schema=None, sampling=None):
     """フォルダ内のXMLファイルを一括変換
     
     Args:
         input_dir: 入力フォルダのパス
         output_dir: 出力フォルダのパス
         recursive: Trueの場合、サブフォルダも再帰的に検索（デフォルト: False）
+        jobs: ワーカープロセス数（指定した場合、各ファイルを別プロセスで変換）
+        timeout: 1ファイルあたりの処理時間上限（秒）。超えたファイルは中断して次へ進む
+        memory_limit_mb: ワーカー1つあたりのメモリ（RSS）上限（MB）
+        max_inflight_mb: 同時に処理中のファイルサイズ合計の上限（MB）
+        pipeline: Trueの場合、parse → transform → serialize → write → validate を
+            上限付きキューでつないだ段階パイプラインで処理し、段階ごとの統計を表示
+            （jobs を指定するとCPU処理の段階をワーカープロセスで実行。timeout 等の制限は使用されない）
+        queue_size: pipeline使用時の段階間キューの上限
+        validate: Trueの場合、変換と同時に値の検証を行う（pipeline使用時は検証段階を追加する）
+        observers: 進捗イベントを受け取る ConversionObserver のリスト
+            （Noneの場合は標準出力に表示する ConsoleReporter、空リストの場合は通知なし）
+        incremental: Trueの場合、Article等の単位ごとに整形済み断片をキャッシュし、
+            変更のない単位の変換・整形を省略する（出力は通常の変換と同一）
+        cache_path: 断片キャッシュのファイル（省略時は出力フォルダの隣に作成）
+        cache_max_mb: 断片キャッシュの上限サイズ（MB）。超えた分は古いものから削除
+        index_path: 文索引（SQLite）のパス。指定した場合、変換しながら各文の分割結果を記録する
+        change_log: Trueの場合、出力ファイルごとに変換した段落の変更ログ（{出力}.changes.json）を書き込む
+        schema: 出力を検証するXSDのパス（pipeline使用時はスキーマ検証段階を追加する。Noneで検証しない）
+        sampling: validate 時に値を検証するファイルの抽出条件（xml_sampling.SamplingPlan）。
+            抽出したファイルだけを検証し、全体の失敗率の信頼区間を表示する
+
+    jobs / timeout / memory_limit_mb / max_inflight_mb のいずれかを指定すると、
+    ワーカープロセスで変換を行い、制限を超えたワーカーは強制終了して再起動します。
+
+    Returns:
+        (成功数, エラー情報のリスト, ConversionMetrics)。対象のファイルがない場合は None
     """
-    from datetime import datetime
-    
     input_path = Path(input_dir)
     output_path = Path(output_dir)
+    observers = [ConsoleReporter()] if observers is None else list(observers)
+    # 検証の失敗数を呼び出し元に返すため、集計用のオブザーバを常に追加する
+    metrics = ConversionMetrics()
+    observers.append(metrics)
 
     # 入力フォルダが存在することを確認
     if not input_path.exists():
@@ -360,13 +1389,9 @@ def process_folder(input_dir, output_dir, recursive=False):
         print(f"入力フォルダ {input_path} にXMLファイルが見つかりません{search_mode}。")
         return
 
-    print(f"{len(xml_files)} 個のXMLファイルを処理します...")
-
-    # エラー情報を記録
-    errors = []
-    success_count = 0
-    error_count = 0
+    _notify(observers, 'batch_started', len(xml_files))
 
+    tasks = []
     for input_file in xml_files:
         # 出力ファイルのパスを生成
         if recursive:
@@ -378,78 +1403,336 @@ def process_folder(input_dir, output_dir, recursive=False):
         else:
             output_file = output_path / input_file.name
             display_name = input_file.name
+        tasks.append((input_file, output_file, display_name))
 
-        print(f"処理中: {display_name}")
-        try:
-            convert_xml(input_file, output_file)
-            print(f"  ✓ 完了: {display_name}")
-            success_count += 1
-        except ET.ParseError as e:
-            error_msg = f"XML構文エラー: {str(e)}"
-            if hasattr(e, 'position'):
-                error_msg += f" (行 {e.position[0]}, 列 {e.position[1]})"
-            print(f"  ✗ エラー: {display_name} - {error_msg}")
-            errors.append({
-                "file": display_name,
-                "error_type": "XML構文エラー",
-                "error_message": str(e),
-                "line": e.position[0] if hasattr(e, 'position') else None,
-                "column": e.position[1] if hasattr(e, 'position') else None
-            })
-            error_count += 1
-        except Exception as e:
-            error_type = type(e).__name__
-            error_msg = str(e)
-            print(f"  ✗ エラー: {display_name} - {error_type}: {error_msg}")
-            errors.append({
-                "file": display_name,
-                "error_type": error_type,
-                "error_message": error_msg
-            })
-            error_count += 1
+    # エラー情報を記録
+    cache = None
+    index = None
+    if index_path:
+        from xml_sentence_index import SentenceIndex
+        index = SentenceIndex(index_path)
+        if incremental:
+            print("  ⚠️ 文索引を更新する場合は差分変換（--incremental）は使用されません。")
+            incremental = False
+    if change_log and incremental and not pipeline:
+        print("  ⚠️ 変更ログを書き込む場合は差分変換（--incremental）は使用されません。")
+        incremental = False
+    if incremental and validate and not pipeline:
+        print("  ⚠️ 検証を行う場合は差分変換（--incremental）は使用されません。")
+        incremental = False
+    if incremental:
+        from xml_fragment_cache import FragmentCache
+        cache = FragmentCache(cache_path or FragmentCache.default_path(output_path),
+                              max_bytes=int(cache_max_mb * 1024 * 1024))
+    if pipeline:
+        if cache is not None:
+            print("  ⚠️ --pipeline では差分変換（--incremental）は使用されません。")
+        if index is not None:
+            print("  ⚠️ --pipeline では文索引（--index）は更新されません。")
+        if change_log:
+            print("  ⚠️ --pipeline では変更ログ（--change-log）は書き込まれません。")
+        if any(option is not None for option in (timeout, memory_limit_mb, max_inflight_mb)):
+            print("  ⚠️ --pipeline では --timeout / --memory-limit / --max-inflight は使用されません。")
 
-    print(f"\n全ファイルの処理が完了しました。")
-    print(f"  成功: {success_count} 個")
-    if error_count > 0:
-        print(f"  エラー: {error_count} 個")
+    def run(run_tasks, run_validate):
+        if pipeline:
+            return _run_pipeline_batch(run_tasks, queue_size, run_validate, observers, schema, jobs)
+        return convert_tasks(run_tasks, jobs=jobs, timeout=timeout, memory_limit_mb=memory_limit_mb,
+                             max_inflight_mb=max_inflight_mb, observers=observers, cache=cache, index=index,
+                             validate=run_validate, change_log=change_log, schema=schema)
+
+    bound = None
+    try:
+        if validate and sampling is not None:
+            success_count, errors, bound = _run_sampled_validation(tasks, sampling, observers, run)
+        else:
+            success_count, errors = run(tasks, validate)
+    finally:
+        if index is not None:
+            index.close()
+        if cache is not None:
+            if cache.hits or cache.misses:
+                print(f"  キャッシュ再利用: {cache.hits} 単位 / 変換: {cache.misses} 単位")
+            cache.close()
+    _notify(observers, 'batch_finished', success_count, errors)
+    if bound is not None:
+        from xml_sampling import format_failure_bound
+        print(f"  {format_failure_bound(bound)}")
 
     # エラー情報をMarkdownファイルに出力
-    if errors:
-        error_report_path = output_path / "validation_results" / "conversion_errors.md"
-        error_report_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(error_report_path, 'w', encoding='utf-8') as f:
-            f.write("# XML変換エラー詳細\n\n")
-            f.write(f"## 処理概要\n\n")
-            f.write(f"- **実行日時**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"- **入力フォルダ**: {input_path}\n")
-            f.write(f"- **出力フォルダ**: {output_path}\n")
-            f.write(f"- **総処理ファイル数**: {len(xml_files)}\n")
-            f.write(f"- **✅ 変換成功**: {success_count} ファイル\n")
-            f.write(f"- **❌ 変換失敗**: {error_count} ファイル\n\n")
-            
-            f.write("## エラー詳細\n\n")
-            for i, error in enumerate(errors, 1):
-                f.write(f"### {i}. {error['file']}\n\n")
-                f.write(f"- **エラータイプ**: {error['error_type']}\n")
-                f.write(f"- **エラーメッセージ**: {error['error_message']}\n")
-                if error.get('line') is not None:
-                    f.write(f"- **エラー位置**: 行 {error['line']}, 列 {error.get('column', 'N/A')}\n")
-                f.write("\n")
-        
-        print(f"  📄 エラー詳細: {error_report_path}")
+    if errors or metrics.validation_failures:
+        write_conversion_error_report(output_path, input_path, len(xml_files), success_count, errors,
+                                      timeout=timeout, memory_limit_mb=memory_limit_mb,
+                                      validation_failures=metrics.validation_failures)
+    return success_count, errors, metrics
+
+def scan_xml_signatures(input_dir, recursive=False):
+    """入力フォルダ内のXMLファイルの stat シグネチャ (mtime_ns, size) を取得"""
+    import os
+
+    signatures = {}
+    pending_dirs = [str(input_dir)]
+    while pending_dirs:
+        current = pending_dirs.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if recursive:
+                        pending_dirs.append(entry.path)
+                elif entry.name.endswith('.xml') and entry.is_file():
+                    stat = entry.stat()
+                    signatures[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                # スキャン中に削除されたファイルは無視
+                continue
+    return signatures
+
+def watch_folder(input_dir, output_dir, recursive=False, interval=1.0, debounce=1.0,
+                 validate=True, max_polls=None):
+    """入力フォルダを監視し、変更されたXMLファイルだけを再変換・再検証する
+
+    inotify等には依存せず、stat シグネチャ (mtime_ns, size) のポーリングで変更を検出します。
+    書き込み途中のファイルを変換しないよう、シグネチャが debounce 秒間変化しなくなってから処理します。
+    起動時には、出力がないか入力より古いファイルを変換対象とします。
+
+    Args:
+        input_dir: 監視する入力フォルダのパス
+        output_dir: 出力フォルダのパス
+        recursive: Trueの場合、サブフォルダも監視
+        interval: ポーリング間隔（秒）
+        debounce: 変更が落ち着いたとみなすまでの待ち時間（秒）
+        validate: Trueの場合、変換後に値の検証も行う
+        max_polls: ポーリング回数の上限（Noneの場合はCtrl+Cまで継続）
+    """
+    import time
+
+    input_path = Path(input_dir)
+    output_path = Path(output_dir)
+    if not input_path.is_dir():
+        print(f"入力フォルダ {input_path} が存在しません。")
+        return
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    if validate:
+        from xml_content_validator_v2 import load_value_lists, compare_value_lists
+
+    def output_for(input_file):
+        return output_path / input_file.relative_to(input_path)
+
+    # 変換済みのシグネチャ。出力が入力より新しいファイルは変換済みとみなす
+    converted = {}
+    for input_file, signature in scan_xml_signatures(input_path, recursive).items():
+        output_file = output_for(input_file)
+        if output_file.exists() and output_file.stat().st_mtime_ns >= signature[0]:
+            converted[input_file] = signature
+    # 変更を検出したが、まだ落ち着いていないファイル: パス -> (シグネチャ, 検出時刻, 最終変化時刻)
+    pending = {}
+
+    print(f"{input_path} を監視しています（{interval} 秒間隔、Ctrl+Cで終了）...")
+    polls = 0
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            now = time.monotonic()
+            signatures = scan_xml_signatures(input_path, recursive)
+
+            for input_file in list(converted):
+                if input_file not in signatures:
+                    del converted[input_file]
+                    pending.pop(input_file, None)
+                    print(f"削除を検出: {input_file.relative_to(input_path)}（出力はそのまま残します）")
+            for input_file in list(pending):
+                if input_file not in signatures:
+                    # 変更が落ち着く前に削除・名前変更されたファイルは変換しない
+                    del pending[input_file]
+
+            for input_file, signature in signatures.items():
+                if converted.get(input_file) == signature:
+                    pending.pop(input_file, None)
+                    continue
+                if input_file not in pending:
+                    pending[input_file] = (signature, now, now)
+                elif pending[input_file][0] != signature:
+                    # 書き込みが続いている間は待ち時間をリセット
+                    pending[input_file] = (signature, pending[input_file][1], now)
+
+            for input_file, (signature, detected_at, changed_at) in sorted(pending.items()):
+                if now - changed_at < debounce:
+                    continue
+                del pending[input_file]
+                if not input_file.exists():
+                    # 走査の後、前のファイルを処理している間に削除・名前変更された
+                    continue
+                output_file = output_for(input_file)
+                output_file.parent.mkdir(parents=True, exist_ok=True)
+                display_name = str(input_file.relative_to(input_path))
+
+                print(f"処理中: {display_name}")
+                started = time.monotonic()
+                try:
+                    convert_xml(input_file, output_file)
+                except Exception as e:
+                    converted[input_file] = signature
+                    print(f"  ✗ エラー: {display_name} - {_format_error_message(_build_error_info(e))}")
+                    continue
+                converted[input_file] = signature
+                convert_seconds = time.monotonic() - started
+
+                status = ""
+                if validate:
+                    validate_started = time.monotonic()
+                    values1, values2 = load_value_lists(input_file, output_file)
+                    identical = compare_value_lists(values1, values2)['identical']
+                    status = "検証成功, " if identical else "❌ 検証で差異検出, "
+                    status += f"検証 {time.monotonic() - validate_started:.2f} 秒, "
+                latency = time.monotonic() - detected_at
+                print(f"  ✓ 完了: {display_name} ({status}変換 {convert_seconds:.2f} 秒, 検出から {latency:.2f} 秒)")
+
+            if max_polls is None or polls < max_polls:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n監視を終了しました。")
+
+def _print_schema_status(schema_result):
+    """単一ファイル変換時のスキーマ検証結果を表示し、違反がなければ True を返す"""
+    if schema_result is None:
+        return True
+    from xml_schema_validator import format_schema_status
+    if schema_result['status'] == 'failed':
+        print(f"  ❌ {format_schema_status(schema_result)}")
+        for error in schema_result['errors'][:10]:
+            location = f"行 {error['line']}: " if error['line'] is not None else ""
+            print(f"    {location}{error['message']}")
+        return False
+    print(f"  {format_schema_status(schema_result)}")
+    return True
+
+# 複数ファイルの処理は完了したが、変換エラー・検証失敗のファイルがある場合の終了コード
+# （処理自体の失敗は1、引数の誤りは argparse の2）
+EXIT_FILES_FAILED = 3
+
+def _batch_exit_code(errors, metrics):
+    """複数ファイルの処理結果から終了コードを決める"""
+    return EXIT_FILES_FAILED if errors or metrics.validation_failed or metrics.schema_failed else 0
 
 def main():
-    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='XMLファイル内のSentence要素をList要素に変換',
+        usage='python xml_converter.py [input output] [options]'
+    )
+    parser.add_argument('paths', nargs='*', help='入力と出力（ファイルまたはフォルダ）')
+    parser.add_argument('--files-from', metavar='FILE',
+                        help='「入力<TAB>出力」を1行ずつ列挙したファイル（- で標準入力）')
+    parser.add_argument('--null', '-0', action='store_true',
+                        help='--files-from のレコードを改行ではなくNUL文字で区切る')
+    parser.add_argument('--recursive', '-r', action='store_true',
+                        help='サブフォルダも再帰的に検索（デフォルト: 直下のみ）')
+    parser.add_argument('--watch', action='store_true',
+                        help='入力フォルダを監視し、変更されたファイルを継続的に変換')
+    parser.add_argument('--interval', type=float, default=1.0, help='--watch のポーリング間隔（秒）')
+    parser.add_argument('--debounce', type=float, default=1.0,
+                        help='--watch で変更が落ち着いたとみなすまでの待ち時間（秒）')
+    parser.add_argument('--no-validate', action='store_true', help='--watch で変換後の検証を行わない')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='フォルダ処理を parse→transform→serialize→write→validate の段階パイプラインで実行')
+    parser.add_argument('--queue-size', type=int, default=4, help='--pipeline の段階間キューの上限')
+    parser.add_argument('--validate', action='store_true',
+                        help='変換と同時に値の検証を行う（出力ファイルを読み直さずに検証）')
+    parser.add_argument('--sample', type=float, metavar='RATE',
+                        help='--validate で値を検証するファイルの抽出率（0〜1。サイズと変換密度で層に分けて抽出し、'
+                             '失敗率の信頼区間を表示）')
+    parser.add_argument('--sample-count', type=int, metavar='K', help='--validate で値を検証するファイル数')
+    parser.add_argument('--seed', type=int, default=0, help='--sample / --sample-count の抽出のシード')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Article等の単位ごとに整形済み断片をキャッシュし、変更のない単位の変換を省略')
+    parser.add_argument('--cache-path', help='--incremental の断片キャッシュのファイル（省略時は出力の隣）')
+    parser.add_argument('--cache-max-mb', type=float, default=256, help='断片キャッシュの上限サイズ（MB）')
+    parser.add_argument('--index', metavar='DB',
+                        help='変換しながら各文の分割結果をSQLiteの文索引に記録（xml_sentence_index.py で検索）')
+    parser.add_argument('--change-log', action='store_true',
+                        help='変換した段落の一覧を出力ごとの変更ログ（{出力}.changes.json）に書き込む'
+                             '（xml_content_validator_v2.py --change-log で検証を高速化）')
+    parser.add_argument('--schema', nargs='?', const='', metavar='XSD',
+                        help='出力をXSDスキーマでも検証（XSD省略時は schema/kokuji20250320_asukoe.xsd。'
+                             'xmlschema または lxml が必要）')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='変換・書き込みを行わず、変換対象の段落数・分割される文数・分割位置の分布を集計')
+    parser.add_argument('--stats', nargs='?', const='-', metavar='FILE',
+                        help='--dry-run の統計レポート（.json でJSON、それ以外はMarkdown。省略時は標準出力）')
+    parser.add_argument('--jobs', '-j', type=int, help='フォルダ処理のワーカープロセス数')
+    parser.add_argument('--timeout', type=float, help='1ファイルあたりの処理時間上限（秒）')
+    parser.add_argument('--memory-limit', type=float, metavar='MB',
+                        help='ワーカー1つあたりのメモリ上限（MB）')
+    parser.add_argument('--max-inflight', type=float, metavar='MB',
+                        help='同時に処理中のファイルサイズ合計の上限（MB）')
+    options = parser.parse_args()
 
-    # 引数解析
-    recursive = False
-    args = []
-    for arg in sys.argv[1:]:
-        if arg in ['--recursive', '-r']:
-            recursive = True
+    recursive = options.recursive
+    args = options.paths
+    sampling = None
+    if options.sample is not None or options.sample_count is not None:
+        if not options.validate:
+            parser.error("--sample / --sample-count は --validate と組み合わせて指定してください")
+        if options.sample is not None and options.sample_count is not None:
+            parser.error("--sample と --sample-count は同時に指定できません")
+        from xml_sampling import SamplingPlan
+        try:
+            sampling = SamplingPlan(rate=options.sample, count=options.sample_count, seed=options.seed)
+        except ValueError as e:
+            parser.error(str(e))
+    if options.schema == '':
+        from xml_schema_validator import DEFAULT_SCHEMA
+        options.schema = str(DEFAULT_SCHEMA)
+
+    if options.dry_run:
+        # 出力は書き込まずにコーパスを集計（出力先を指定しても無視）
+        if not args:
+            parser.error("--dry-run には入力ファイルまたはフォルダを指定してください")
+        from xml_corpus_stats import dry_run
+        return dry_run(args[0], recursive=recursive, jobs=options.jobs, stats_output=options.stats)
+    if options.stats:
+        parser.error("--stats は --dry-run と組み合わせて指定してください")
+
+    if options.files_from:
+        # 指定された入力→出力の組を1つのプロセスで変換
+        if args:
+            parser.error("--files-from と入力・出力パスは同時に指定できません")
+        try:
+            pairs = read_file_pairs(options.files_from, null_delimited=options.null)
+        except (OSError, ValueError) as e:
+            print(f"ファイルリストを読み込めません: {e}")
+            return 1
+        tasks = []
+        for input_file, output_file in pairs:
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            tasks.append((input_file, output_file, str(input_file)))
+        reporter = ConsoleReporter()
+        metrics = ConversionMetrics()
+        reporter.batch_started(len(tasks))
+        observers = [reporter, metrics]
+
+        def run(run_tasks, run_validate):
+            return convert_tasks(run_tasks, jobs=options.jobs, timeout=options.timeout,
+                                 memory_limit_mb=options.memory_limit, max_inflight_mb=options.max_inflight,
+                                 observers=observers, validate=run_validate,
+                                 change_log=options.change_log, schema=options.schema)
+
+        bound = None
+        if sampling is not None:
+            success_count, errors, bound = _run_sampled_validation(tasks, sampling, observers, run)
         else:
-            args.append(arg)
+            success_count, errors = run(tasks, options.validate)
+        reporter.batch_finished(success_count, errors)
+        if bound is not None:
+            from xml_sampling import format_failure_bound
+            print(f"  {format_failure_bound(bound)}")
+        return _batch_exit_code(errors, metrics)
 
     if len(args) == 0:
         # 引数なしの場合、デフォルトの動作（単一ファイル）
@@ -473,9 +1756,24 @@ def main():
         input_path = Path(input_arg)
         output_path = Path(output_arg)
 
+        if options.watch:
+            watch_folder(input_arg, output_arg, recursive=recursive, interval=options.interval,
+                         debounce=options.debounce, validate=not options.no_validate)
         # フォルダかどうかを判定
-        if input_path.is_dir():
-            process_folder(input_arg, output_arg, recursive=recursive)
+        elif input_path.is_dir():
+            outcome = process_folder(input_arg, output_arg, recursive=recursive,
+                                     jobs=options.jobs, timeout=options.timeout,
+                                     memory_limit_mb=options.memory_limit,
+                                     max_inflight_mb=options.max_inflight,
+                                     pipeline=options.pipeline, queue_size=options.queue_size,
+                                     validate=options.validate, incremental=options.incremental,
+                                     cache_path=options.cache_path, cache_max_mb=options.cache_max_mb,
+                                     index_path=options.index, change_log=options.change_log,
+                                     schema=options.schema, sampling=sampling)
+            if outcome is None:
+                return 0
+            _, errors, metrics = outcome
+            return _batch_exit_code(errors, metrics)
         else:
             # 単一ファイル処理
             if not input_path.exists():
@@ -483,8 +1781,35 @@ def main():
                 return
 
             print(f"{input_path} を {output_path} に変換します...")
-            convert_xml(input_path, output_path)
+            change_recorder = ChangeLogRecorder() if options.change_log else None
+            if options.validate:
+                _, result = convert_and_validate(input_path, output_path, on_paragraph=change_recorder,
+                                                 schema=options.schema)
+                if change_recorder is not None:
+                    change_recorder.write(input_path, output_path)
+                print("変換が完了しました。")
+                schema_passed = _print_schema_status(result.get('schema'))
+                if result['identical']:
+                    print(f"  検証成功: {result['total_values_1']} 個の値が同一です。")
+                    return 0 if schema_passed else 1
+                print(f"  ❌ 検証で差異検出: 欠落 {len(result['missing_in_2'])} 件 / 追加 {len(result['extra_in_2'])} 件"
+                      f" / 順序・内容の差異 {len(result['hunks'])} 箇所")
+                return 1
+            if change_recorder is not None:
+                convert_xml(input_path, output_path, on_paragraph=change_recorder)
+                print(f"  変更ログ: {change_recorder.write(input_path, output_path)}")
+            elif options.incremental:
+                from xml_fragment_cache import FragmentCache
+                with FragmentCache(options.cache_path or FragmentCache.default_path(output_path.parent),
+                                   max_bytes=int(options.cache_max_mb * 1024 * 1024)) as cache:
+                    convert_xml(input_path, output_path, cache=cache)
+                    print(f"  キャッシュ再利用: {cache.hits} 単位 / 変換: {cache.misses} 単位")
+            else:
+                convert_xml(input_path, output_path)
             print("変換が完了しました。")
+            if options.schema is not None:
+                from xml_schema_validator import validate_schema
+                return 0 if _print_schema_status(validate_schema(output_path, options.schema)) else 1
 
     else:
         print("使い方:")
@@ -494,6 +1819,20 @@ def main():
         print("")
         print("オプション:")
         print("  --recursive, -r: サブフォルダも再帰的に検索（デフォルト: 直下のみ）")
+        print("  --files-from FILE: 「入力<TAB>出力」を列挙したファイルから一括変換（- で標準入力）")
+        print("  --null, -0: --files-from のレコードをNUL文字で区切る")
+        print("  --watch: 入力フォルダを監視し、変更されたファイルだけを再変換・再検証")
+        print("  --pipeline: 段階パイプラインで処理し、段階ごとのスループットとキュー占有率を表示")
+        print("  --validate: 変換後に値の検証を行う")
+        print("  --sample RATE / --sample-count K [--seed N]: --validate で検証するファイルを層別に抽出")
+        print("  --change-log: 変換した段落の変更ログを出力ごとに書き込む")
+        print("  --schema [XSD]: 出力をXSDスキーマでも検証（xmlschema または lxml が必要）")
+        print("  --dry-run [--stats [FILE]]: 変換せずに変換対象・分割位置の分布を集計")
+        print("  --jobs, -j N: ワーカープロセス数（フォルダ処理時）")
+        print("  --timeout SEC: 1ファイルあたりの処理時間上限（超えたファイルは中断してエラー記録）")
+        print("  --memory-limit MB: ワーカー1つあたりのメモリ上限")
+        print("  --max-inflight MB: 同時に処理中のファイルサイズ合計の上限")
 
 if __name__ == "__main__":
-    main()
+    import sys
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+XML変換のasyncio API
+
+変換処理（CPU処理）は指定したエグゼキュータで、ファイルの読み書きはスレッドで実行するため、
+イベントループをブロックしません。GILの影響を受けずに並列化したい場合は
+concurrent.futures.ProcessPoolExecutor を executor に指定してください。
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from xml_converter import convert_bytes, _build_error_info
+
+class ConversionResult:
+    """convert_many が返す1ファイル分の変換結果"""
+
+    def __init__(self, input_file, output_file, error=None, seconds=0.0):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+async def convert_bytes_async(xml_bytes, executor=None):
+    """XMLのバイト列を変換して返す（変換処理は executor で実行）
+
+    Args:
+        xml_bytes: 変換するXMLのバイト列
+        executor: 変換処理を実行するエグゼキュータ（Noneの場合はイベントループの既定）
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, convert_bytes, xml_bytes)
+
+def _write_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+async def _convert_file(input_file, output_file, executor, io_executor):
+    """1ファイルを変換し、一時ファイル経由で出力する（キャンセル時は書きかけの出力を残さない）"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        data = await loop.run_in_executor(io_executor, Path(input_file).read_bytes)
+        converted = await loop.run_in_executor(executor, convert_bytes, data)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return ConversionResult(input_file, output_file, error=_build_error_info(e),
+                                seconds=time.perf_counter() - started)
+
+    output_path = Path(output_file)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{id(converted)}.tmp")
+    write_future = io_executor.submit(_write_bytes, temp_path, converted)
+    try:
+        await asyncio.wrap_future(write_future)
+    except asyncio.CancelledError:
+        # 書き込みスレッドの終了を待ってから一時ファイルを削除
+        write_future.add_done_callback(lambda _: temp_path.unlink(missing_ok=True))
+        raise
+    except Exception as e:
+        temp_path.unlink(missing_ok=True)
+        return ConversionResult(input_file, output_file, error=_build_error_info(e),
+                                seconds=time.perf_counter() - started)
+    os.replace(temp_path, output_path)
+    return ConversionResult(input_file, output_file, seconds=time.perf_counter() - started)
+
+async def convert_many(pairs, executor=None, concurrency=4):
+    """複数のXMLファイルを並行して変換し、完了した順に ConversionResult を返す非同期ジェネレータ
+
+    Args:
+        pairs: (入力ファイル, 出力ファイル) の反復可能オブジェクト
+        executor: 変換処理を実行するエグゼキュータ（Noneの場合はイベントループの既定）
+        concurrency: 同時に処理するファイル数の上限
+
+    変換エラーは例外ではなく ConversionResult.error に記録されます。
+    呼び出し側がキャンセルした場合や途中で反復を終えた場合、処理中のファイルは
+    出力されず、書きかけの一時ファイルも削除されます。
+    """
+    pairs_iter = iter(pairs)
+    results = asyncio.Queue()
+    io_executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="xml-io")
+
+    async def worker():
+        for input_file, output_file in pairs_iter:
+            results.put_nowait(await _convert_file(input_file, output_file, executor, io_executor))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    for task in workers:
+        # ワーカーの終了もキューで通知する
+        task.add_done_callback(results.put_nowait)
+    try:
+        remaining = len(workers)
+        while remaining:
+            item = await results.get()
+            if isinstance(item, asyncio.Task):
+                remaining -= 1
+                item.result()  # ワーカー内の想定外の例外を呼び出し側へ伝える
+                continue
+            yield item
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        io_executor.shutdown(wait=False)
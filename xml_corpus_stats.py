@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+変換を行わないコーパス分析（ドライラン）
+
+各ファイルを iterparse で先頭から読み、処理済みの要素を順次木から外しながら、
+変換条件（Sentence要素10個以上）を満たすParagraphSentenceの数・分割される文の数・
+分割位置の分布を集計します。ツリー全体の構築や整形・書き込みは行いません。
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+from xml_converter import get_full_text, _build_error_info
+from xml_content_validator_v2 import _discard
+
+# convert_sentence_to_list と同じ分割条件（冒頭10文字以内の最初の空白）
+_SPLIT_PATTERN = re.compile(r'\s')
+
+def analyze_file(input_file):
+    """1ファイルを変換せずに集計する
+
+    Returns:
+        集計結果の辞書（解析に失敗した場合は "error" にエラー情報を含む）
+    """
+    stats = {
+        "file": str(input_file),
+        "paragraph_sentences": 0,
+        "fired_paragraph_sentences": 0,
+        "sentences": 0,
+        "split_sentences": 0,
+        "split_positions": Counter(),
+    }
+    paragraph_depth = 0
+    open_elements = []
+    try:
+        for event, elem in ET.iterparse(str(input_file), events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(elem)
+                if elem.tag == 'ParagraphSentence':
+                    paragraph_depth += 1
+                continue
+            open_elements.pop()
+            if elem.tag == 'ParagraphSentence':
+                paragraph_depth -= 1
+                _count_paragraph_sentence(elem, stats)
+            # ParagraphSentenceの中では、親の集計が終わるまで要素を残す
+            if paragraph_depth == 0:
+                _discard(elem, open_elements)
+    except Exception as e:
+        stats["error"] = _build_error_info(e)
+    return stats
+
+def _count_paragraph_sentence(paragraph_sentence, stats):
+    sentences = [child for child in paragraph_sentence if child.tag == 'Sentence']
+    stats["paragraph_sentences"] += 1
+    if len(sentences) < 10:
+        return
+    stats["fired_paragraph_sentences"] += 1
+    stats["sentences"] += len(sentences)
+    for sentence in sentences:
+        space_match = _SPLIT_PATTERN.search(get_full_text(sentence)[:10])
+        if space_match:
+            stats["split_sentences"] += 1
+            stats["split_positions"][space_match.start()] += 1
+
+def analyze_corpus(input_files, jobs=None):
+    """複数ファイルを並列に集計する
+
+    Args:
+        input_files: 入力ファイルのリスト
+        jobs: ワーカープロセス数（None の場合はCPU数、1 の場合は現在のプロセスで実行）
+
+    Returns:
+        コーパス全体の集計結果の辞書（ファイルごとの結果を "files" に含む）
+    """
+    input_files = list(input_files)
+    if jobs == 1 or len(input_files) <= 1:
+        results = [analyze_file(input_file) for input_file in input_files]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(input_files) // ((jobs or 4) * 4))
+            results = list(executor.map(analyze_file, input_files, chunksize=chunksize))
+
+    totals = {
+        "total_files": len(input_files),
+        "failed_files": 0,
+        "files_with_conversion": 0,
+        "paragraph_sentences": 0,
+        "fired_paragraph_sentences": 0,
+        "sentences": 0,
+        "split_sentences": 0,
+    }
+    split_positions = Counter()
+    errors = []
+    for result in results:
+        if "error" in result:
+            totals["failed_files"] += 1
+            errors.append({"file": result["file"], **result["error"]})
+            continue
+        for key in ("paragraph_sentences", "fired_paragraph_sentences", "sentences", "split_sentences"):
+            totals[key] += result[key]
+        if result["fired_paragraph_sentences"]:
+            totals["files_with_conversion"] += 1
+        split_positions.update(result["split_positions"])
+
+    totals["unsplit_sentences"] = totals["sentences"] - totals["split_sentences"]
+    totals["split_positions"] = {str(position): split_positions[position] for position in sorted(split_positions)}
+    totals["errors"] = errors
+    totals["files"] = [
+        {**result, "split_positions": {str(k): v for k, v in sorted(result["split_positions"].items())}}
+        for result in results if "error" not in result
+    ]
+    return totals
+
+def format_stats_markdown(stats):
+    """集計結果をMarkdownのレポートに整形する"""
+    lines = [
+        "# コーパス分析結果（ドライラン）",
+        "",
+        "## 概要",
+        f"- **対象ファイル数**: {stats['total_files']}",
+        f"- **変換対象を含むファイル数**: {stats['files_with_conversion']}",
+        f"- **解析エラー**: {stats['failed_files']}",
+        f"- **ParagraphSentence数**: {stats['paragraph_sentences']}",
+        f"- **変換条件（Sentence要素10個以上）を満たすParagraphSentence数**: {stats['fired_paragraph_sentences']}",
+        f"- **変換されるSentence数**: {stats['sentences']}",
+        f"- **Columnに分割されるSentence数**: {stats['split_sentences']}",
+        f"- **分割されないSentence数**: {stats['unsplit_sentences']}",
+        "",
+        "## 分割位置の分布",
+        "",
+        "| 分割位置（文字目） | 文数 | 割合 |",
+        "|---:|---:|---:|",
+    ]
+    for position, count in stats["split_positions"].items():
+        ratio = count / stats["split_sentences"] * 100 if stats["split_sentences"] else 0
+        lines.append(f"| {position} | {count} | {ratio:.1f}% |")
+    if stats["errors"]:
+        lines += ["", "## 解析エラー", ""]
+        for error in stats["errors"]:
+            lines.append(f"- **{error['file']}**: {error['error_type']} - {error['error_message']}")
+    return "\n".join(lines) + "\n"
+
+def write_stats_report(stats, output_file):
+    """集計結果を保存する（拡張子が .json の場合はJSON、それ以外はMarkdown）"""
+    import json
+    from pathlib import Path
+
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    if output_file.suffix.lower() == '.json':
+        output_file.write_text(json.dumps(stats, ensure_ascii=False, indent=2) + "\n", encoding='utf-8')
+    else:
+        output_file.write_text(format_stats_markdown(stats), encoding='utf-8')
+
+def dry_run(input_arg, recursive=False, jobs=None, stats_output=None):
+    """入力（ファイルまたはフォルダ）を変換せずに集計し、概要を表示する
+
+    Args:
+        input_arg: 入力ファイルまたはフォルダ
+        recursive: サブフォルダも再帰的に検索するか
+        jobs: ワーカープロセス数
+        stats_output: レポートの保存先（None で保存しない、'-' で標準出力にMarkdownを表示）
+
+    Returns:
+        終了コード（解析エラーがあれば1）
+    """
+    import time
+    from pathlib import Path
+
+    input_path = Path(input_arg)
+    if input_path.is_dir():
+        input_files = sorted(input_path.glob("**/*.xml" if recursive else "*.xml"))
+    elif input_path.exists():
+        input_files = [input_path]
+    else:
+        print(f"入力 {input_path} が存在しません。")
+        return 1
+
+    started = time.perf_counter()
+    stats = analyze_corpus(input_files, jobs=jobs)
+    elapsed = time.perf_counter() - started
+
+    print(f"ドライラン: {stats['total_files']} ファイルを分析しました（{elapsed:.2f} 秒、出力は書き込みません）")
+    print(f"  変換対象のParagraphSentence: {stats['fired_paragraph_sentences']} / {stats['paragraph_sentences']}")
+    print(f"  変換されるSentence: {stats['sentences']}（うちColumn分割 {stats['split_sentences']}）")
+    for error in stats["errors"]:
+        print(f"  ✗ エラー: {error['file']} - {error['error_type']}: {error['error_message']}")
+    if stats_output == '-':
+        print()
+        print(format_stats_markdown(stats), end='')
+    elif stats_output:
+        write_stats_report(stats, stats_output)
+        print(f"📄 統計レポート: {stats_output}")
+    return 1 if stats["errors"] else 0
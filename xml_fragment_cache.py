@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+差分変換用の整形済み断片キャッシュ
+
+Article等の単位ごとに、入力サブツリーのハッシュをキーとして整形済みの出力断片を
+SQLiteファイルに保存します。合計サイズが上限を超えると、最後に使われたのが古いものから削除します。
+"""
+
+from pathlib import Path
+
+from xml_sqlite_cache import SQLiteLRUCache
+
+class FragmentCache(SQLiteLRUCache):
+    """整形済み断片のキャッシュ（キー → (断片, 変換したParagraphSentence数)）"""
+
+    TABLE = "fragments"
+    COLUMNS = ("fragment TEXT NOT NULL", "converted_count INTEGER NOT NULL")
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        super().__init__(path, max_bytes)
+
+    @staticmethod
+    def default_path(output_dir):
+        """出力フォルダの隣に置くキャッシュファイルのパス"""
+        output_dir = Path(output_dir).resolve()
+        return output_dir.parent / f".{output_dir.name}.fragment_cache.sqlite"
+
+    def get_many(self, keys):
+        """キーのリストに対応する (断片, 変換数) の辞書を返す（見つからないキーは含まない）"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), 500):
+            chunk = unique_keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, fragment, converted_count FROM fragments WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, fragment, converted_count in rows:
+                found[key] = (fragment, converted_count)
+        if found:
+            self._touch(found)
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, entries):
+        """(キー, 断片, 変換数) のリストを保存し、上限を超えた場合は古いものから削除"""
+        self._store([(key, fragment, converted_count, len(fragment.encode('utf-8')))
+                     for key, fragment, converted_count in entries])
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+段階パイプライン実行: parse → transform → serialize → (schema) → write → validate
+
+各段階を別スレッドで実行し、段階間を上限付きキューでつなぎます。
+ファイルの読み書きや検証を変換処理と並行して進められ、
+同時にメモリ上に保持される文書数はキューの上限で抑えられます。
+
+スレッドの段階はGILのためCPU処理同士は重なりません。jobs を指定すると、
+parse・transform・serialize を1つの convert 段階にまとめ、convert・schema・validate を
+ワーカープロセスで実行します（段階のスレッドは投入と受け取りのみを行い、各段階で
+最大 jobs 件を同時に処理します）。書き込みは親プロセスのスレッドで行います。
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+from xml_converter import parse_xml, transform_tree, serialize_xml, write_xml, _build_error_info
+
+# 段階の終了を伝える番兵
+_STOP = object()
+
+# プロセスで実行する段階が、処理中の項目の完了を確認しながら入力を待つ間隔（秒）
+_POLL_SECONDS = 0.01
+
+class StageStats:
+    """1つの段階の処理件数・処理時間・待ち時間・入力キューの占有状況"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0      # 入力キューが空で待った時間
+        self.blocked_seconds = 0.0   # 出力キューが満杯で待った時間
+        self.queue_samples = 0
+        self.queue_total = 0
+        self.queue_max = 0
+
+    def sample_queue(self, size):
+        self.queue_samples += 1
+        self.queue_total += size
+        self.queue_max = max(self.queue_max, size)
+
+    @property
+    def throughput(self):
+        """処理時間あたりの件数（件/秒）"""
+        return self.items / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+    @property
+    def queue_average(self):
+        return self.queue_total / self.queue_samples if self.queue_samples else 0.0
+
+class PipelineItem:
+    """パイプラインを流れる1ファイル分の状態"""
+
+    def __init__(self, input_file, output_file, display_name):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.display_name = display_name
+        self.root = None
+        self.xml_content = None
+        self.converted_count = 0
+        self.identical = None
+        self.schema = None  # スキーマ検証の結果（xml_schema_validator.validate_schema）
+        self.seconds = 0.0
+        self.error = None
+
+def _parse(item):
+    item.root = parse_xml(item.input_file)
+
+def _transform(item):
+    item.converted_count = transform_tree(item.root)
+
+def _serialize(item):
+    item.xml_content = serialize_xml(item.root)
+    item.root = None  # 整形後はツリーを保持しない
+
+def _check_schema(xml_content, schema_path):
+    from xml_schema_validator import validate_schema
+
+    return validate_schema(xml_content.encode('utf-8'), schema_path)
+
+def _schema_stage(schema_path):
+    """整形済みXMLを書き込む前にスキーマで検証する段階（コンパイル済みスキーマは全ファイルで共有）"""
+    def check(item):
+        item.schema = _check_schema(item.xml_content, schema_path)
+    return check
+
+def _write(item):
+    write_xml(item.xml_content, item.output_file)
+    item.xml_content = None
+
+def _validate_files(input_file, output_file):
+    from xml_content_validator_v2 import load_value_lists, compare_value_lists
+
+    values1, values2 = load_value_lists(input_file, output_file)
+    return compare_value_lists(values1, values2)['identical']
+
+def _validate(item):
+    item.identical = _validate_files(item.input_file, item.output_file)
+
+def _convert_file(input_file):
+    """ワーカープロセスで parse・transform・serialize を行う（ツリーはプロセス間で受け渡さない）"""
+    root = parse_xml(input_file)
+    converted_count = transform_tree(root)
+    return converted_count, serialize_xml(root)
+
+def _timed(func, *args):
+    """ワーカープロセスで func を実行し、(結果, 処理時間) を返す"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def _apply_converted(item, result):
+    item.converted_count, item.xml_content = result
+
+def _apply_schema(item, result):
+    item.schema = result
+
+def _apply_identical(item, result):
+    item.identical = result
+
+def _process_stages(schema, validate):
+    """jobs 指定時の段階: (名前, スレッドで実行する関数) または (名前, (ワーカー関数, 引数, 結果の反映))"""
+    stages = [("convert", (_convert_file, lambda item: (item.input_file,), _apply_converted))]
+    if schema is not None:
+        stages.append(("schema", (_check_schema, lambda item: (item.xml_content, schema), _apply_schema)))
+    stages.append(("write", _write))
+    if validate:
+        stages.append(("validate", (_validate_files, lambda item: (item.input_file, item.output_file),
+                                    _apply_identical)))
+    return stages
+
+def _stage_loop(func, in_queue, out_queue, stats):
+    """入力キューから取り出した項目に処理を適用して次の段階へ渡す"""
+    while True:
+        stats.sample_queue(in_queue.qsize())
+        waited = time.perf_counter()
+        item = in_queue.get()
+        started = time.perf_counter()
+        stats.idle_seconds += started - waited
+        if item is _STOP:
+            out_queue.put(_STOP)
+            return
+
+        # 前の段階で失敗した項目はそのまま後段へ流す
+        if item.error is None:
+            try:
+                func(item)
+            except Exception as e:
+                item.error = _build_error_info(e)
+                item.root = None
+                item.xml_content = None
+            stats.items += 1
+        finished = time.perf_counter()
+        stats.busy_seconds += finished - started
+        item.seconds += finished - started
+
+        out_queue.put(item)
+        stats.blocked_seconds += time.perf_counter() - finished
+
+def _finish_item(item, future, apply, stats):
+    """ワーカープロセスの結果を項目に反映する（失敗した場合はエラー情報を記録）"""
+    if future is None:
+        return
+    try:
+        result, seconds = future.result()
+        apply(item, result)
+    except Exception as e:
+        item.error = _build_error_info(e)
+        item.xml_content = None
+        seconds = 0.0
+    stats.items += 1
+    stats.busy_seconds += seconds
+    item.seconds += seconds
+
+def _pool_stage_loop(stage, executor, max_pending, in_queue, out_queue, stats):
+    """入力キューから取り出した項目をワーカープロセスに投入し、投入した順に次の段階へ渡す
+
+    同時に処理する項目は最大 max_pending 件です。処理時間（busy_seconds）はワーカーでの処理時間の合計です。
+    """
+    worker, arguments, apply = stage
+    pending = deque()
+    stopped = False
+    while pending or not stopped:
+        if not stopped and len(pending) < max_pending:
+            stats.sample_queue(in_queue.qsize())
+            waited = time.perf_counter()
+            try:
+                # 処理中の項目がある間は、その完了を確認できるよう短い間隔で入力を待つ
+                item = in_queue.get(timeout=_POLL_SECONDS if pending else None)
+            except queue.Empty:
+                item = None
+            if not pending:
+                stats.idle_seconds += time.perf_counter() - waited
+            if item is _STOP:
+                stopped = True
+            elif item is not None:
+                # 前の段階で失敗した項目は投入せずに後段へ流す
+                future = None
+                if item.error is None:
+                    future = executor.submit(_timed, worker, *arguments(item))
+                pending.append((item, future))
+
+        # 先頭から完了した項目を順に渡す（空きがないか入力が終わった場合は先頭の完了を待つ）
+        while pending:
+            item, future = pending[0]
+            if future is not None and not future.done() and not stopped and len(pending) < max_pending:
+                break
+            pending.popleft()
+            _finish_item(item, future, apply, stats)
+            finished = time.perf_counter()
+            out_queue.put(item)
+            stats.blocked_seconds += time.perf_counter() - finished
+    out_queue.put(_STOP)
+
+def run_pipeline(tasks, validate=False, queue_size=4, on_result=None, schema=None, jobs=None):
+    """(入力ファイル, 出力ファイル, 表示名) のリストを段階パイプラインで変換する
+
+    Args:
+        tasks: (入力ファイル, 出力ファイル, 表示名) のリスト
+        validate: Trueの場合、書き込み後に値の検証段階を追加
+        queue_size: 段階間キューの上限（段階ごとに保持する文書数の上限）
+        on_result: 各ファイルの処理完了時に PipelineItem を受け取るコールバック
+        schema: XSDのパス。指定した場合、整形と書き込みの間にスキーマ検証段階を追加
+        jobs: ワーカープロセス数。指定した場合、convert（parse・transform・serialize）・schema・validate を
+            ワーカープロセスで実行する（Noneの場合はすべての段階をスレッドで実行）
+
+    Returns:
+        (PipelineItemのリスト, StageStatsのリスト)
+    """
+    if jobs:
+        from concurrent.futures import ProcessPoolExecutor
+
+        stages = _process_stages(schema, validate)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return _run_stages(tasks, stages, queue_size, on_result, executor, jobs)
+
+    stages = [("parse", _parse), ("transform", _transform), ("serialize", _serialize)]
+    if schema is not None:
+        stages.append(("schema", _schema_stage(schema)))
+    stages.append(("write", _write))
+    if validate:
+        stages.append(("validate", _validate))
+    return _run_stages(tasks, stages, queue_size, on_result)
+
+def _run_stages(tasks, stages, queue_size, on_result, executor=None, max_pending=1):
+    """段階ごとにスレッドを起動し、タスクを流して結果を集める（関数でない段階は executor で実行）"""
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results_queue = queue.Queue()
+    stats = [StageStats(name) for name, _ in stages]
+
+    threads = []
+    for index, (name, func) in enumerate(stages):
+        out_queue = queues[index + 1] if index + 1 < len(stages) else results_queue
+        if callable(func):
+            target, args = _stage_loop, (func, queues[index], out_queue, stats[index])
+        else:
+            target, args = _pool_stage_loop, (func, executor, max_pending, queues[index], out_queue, stats[index])
+        thread = threading.Thread(target=target, args=args, name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    def feed():
+        for input_file, output_file, display_name in tasks:
+            queues[0].put(PipelineItem(input_file, output_file, display_name))
+        queues[0].put(_STOP)
+
+    feeder = threading.Thread(target=feed, name="pipeline-feeder", daemon=True)
+    feeder.start()
+
+    results = []
+    while True:
+        item = results_queue.get()
+        if item is _STOP:
+            break
+        results.append(item)
+        if on_result:
+            on_result(item)
+
+    feeder.join()
+    for thread in threads:
+        thread.join()
+    return results, stats
+
+def format_pipeline_stats(stats, elapsed_seconds):
+    """段階ごとの統計をMarkdownの表として整形"""
+    lines = [
+        f"パイプライン統計（全体 {elapsed_seconds:.2f} 秒）",
+        "",
+        "| 段階 | 件数 | 処理時間(秒) | スループット(件/秒) | 入力待ち(秒) | 出力待ち(秒) | 入力キュー平均/最大 |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for stage in stats:
+        lines.append(
+            f"| {stage.name} | {stage.items} | {stage.busy_seconds:.2f} | {stage.throughput:.1f} | "
+            f"{stage.idle_seconds:.2f} | {stage.blocked_seconds:.2f} | "
+            f"{stage.queue_average:.1f}/{stage.queue_max} |"
+        )
+    if stats:
+        bottleneck = max(stats, key=lambda stage: stage.busy_seconds)
+        lines.append("")
+        lines.append(f"ボトルネック: {bottleneck.name}（処理時間が最も長い段階）")
+    return '\n'.join(lines)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+XMLプレビュー用の行オフセット索引
+
+テキスト（バイト列またはファイル）を1回走査して各行の開始位置（バイトオフセット）を記録し、
+表示する範囲の行だけを切り出して返します。索引を作成した後は、ファイルの大きさによらず
+1ページ分の行を取り出すだけで済むため、大きなXMLでもページ単位で素早くプレビューできます。
+"""
+
+import re
+from array import array
+from pathlib import Path
+
+_NEWLINE = re.compile(b'\n')
+
+class LineIndex:
+    """行の開始位置の索引
+
+    LineIndex.from_bytes（メモリ上のバイト列）または LineIndex.from_file（ファイル。表示する範囲だけを
+    読み込む）で作成します。
+    """
+
+    def __init__(self, offsets, total_bytes, data=None, path=None):
+        self.offsets = offsets          # 各行の開始位置（array('Q')）
+        self.total_bytes = total_bytes
+        self.data = data
+        self.path = path
+
+    @classmethod
+    def from_bytes(cls, data):
+        offsets = array('Q', [0])
+        offsets.extend(match.end() for match in _NEWLINE.finditer(data))
+        if len(offsets) > 1 and offsets[-1] == len(data):
+            # 末尾の改行の後ろは行として数えない
+            offsets.pop()
+        return cls(offsets, len(data), data=data)
+
+    @classmethod
+    def from_file(cls, path, chunk_size=1024 * 1024):
+        path = Path(path)
+        offsets = array('Q', [0])
+        position = 0
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                offsets.extend(position + match.end() for match in _NEWLINE.finditer(chunk))
+                position += len(chunk)
+        if len(offsets) > 1 and offsets[-1] == position:
+            offsets.pop()
+        return cls(offsets, position, path=path)
+
+    def __len__(self):
+        """行数（空のテキストは0行）"""
+        return len(self.offsets) if self.total_bytes else 0
+
+    def lines(self, start, count):
+        """start 行目（0始まり）から count 行を改行でつないだ文字列で返す"""
+        start = max(0, min(start, len(self)))
+        stop = max(start, min(start + count, len(self)))
+        if start == stop:
+            return ""
+        begin = self.offsets[start]
+        end = self.offsets[stop] if stop < len(self.offsets) else self.total_bytes
+        if self.data is not None:
+            chunk = bytes(memoryview(self.data)[begin:end])
+        else:
+            with open(self.path, 'rb') as f:
+                f.seek(begin)
+                chunk = f.read(end - begin)
+        # 最後の行の改行は含めない（不正なバイト列は置換して表示する）
+        if chunk.endswith(b'\n'):
+            chunk = chunk[:-1]
+        return chunk.decode('utf-8', errors='replace')
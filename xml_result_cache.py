@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Webアプリ用の変換結果キャッシュ
+
+アップロードされたファイルの内容のハッシュ（とファイル名）に、変換ロジック・値の抽出ロジックのバージョンを
+加えたものをキーとして、変換結果（出力XMLのバイト列・検証結果・検証レポート）を保存します。
+小さい結果はメモリに、大きい結果はSQLiteファイルに保存し、どちらも合計サイズが上限を超えると
+最後に使われたのが古いものから削除します。サーバープロセスの全セッションで共有するため、
+操作はロックで直列化します。
+"""
+
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+from xml_sqlite_cache import SQLiteLRUCache
+
+class ResultCache(SQLiteLRUCache):
+    """変換結果のキャッシュ（キー → {"output", "result", "report", "error"}）
+
+    エントリの内容:
+        output: 変換後のXML（バイト列）
+        result: compare_value_lists の結果
+        report: 検証レポート（Markdownのバイト列。差異やエラーがない場合は None）
+        error: 検証レポート作成中のエラーのトレースバック（なければ None）
+    """
+
+    TABLE = "results"
+    COLUMNS = ("output BLOB NOT NULL", "result BLOB NOT NULL", "report BLOB", "error TEXT")
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, memory_max_bytes=64 * 1024 * 1024,
+                 memory_entry_max_bytes=1024 * 1024):
+        # 全セッションのスレッドから使うため、接続をスレッド間で共有する（操作はロックで直列化）
+        super().__init__(path, max_bytes, check_same_thread=False)
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_entry_max_bytes = memory_entry_max_bytes
+        self.lock = threading.Lock()
+        # メモリ上のエントリ（最後に使われた順。キー → (エントリ, サイズ)）
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+
+    @staticmethod
+    def key(data, name=""):
+        """アップロードされた内容・ファイル名と、変換・抽出ロジックのバージョンからキーを計算
+
+        検証レポートにはファイル名が含まれるため、内容が同じでも名前が異なれば別のキーになります。
+        """
+        from xml_converter import converter_version
+        from xml_content_validator_v2 import extraction_version
+
+        digest = hashlib.sha256()
+        digest.update(f"{converter_version()}\0{extraction_version()}\0{name}\0".encode('utf-8'))
+        digest.update(data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def entry_size(entry):
+        """エントリのおおよそのサイズ（バイト数）"""
+        return (len(entry["output"]) + len(entry["report"] or b"") + len(entry["error"] or "")
+                + len(json.dumps(entry["result"], ensure_ascii=False).encode('utf-8')))
+
+    def get(self, key):
+        """キーに対応するエントリを返す（なければ None）"""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key][0]
+            row = self.conn.execute("SELECT output, result, report, error FROM results WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch([key])
+            return {
+                "output": zlib.decompress(row[0]),
+                "result": json.loads(zlib.decompress(row[1]).decode('utf-8')),
+                "report": zlib.decompress(row[2]) if row[2] is not None else None,
+                "error": row[3],
+            }
+
+    def put(self, key, entry):
+        """エントリを保存する（memory_entry_max_bytes 以下ならメモリに、それより大きければファイルに）"""
+        size = self.entry_size(entry)
+        with self.lock:
+            if size <= self.memory_entry_max_bytes:
+                if key in self.memory:
+                    self.memory_bytes -= self.memory.pop(key)[1]
+                self.memory[key] = (entry, size)
+                self.memory_bytes += size
+                while self.memory_bytes > self.memory_max_bytes and self.memory:
+                    _, (_, evicted_size) = self.memory.popitem(last=False)
+                    self.memory_bytes -= evicted_size
+                return
+            output = zlib.compress(entry["output"])
+            result = zlib.compress(json.dumps(entry["result"], ensure_ascii=False).encode('utf-8'))
+            report = zlib.compress(entry["report"]) if entry["report"] is not None else None
+            stored_size = len(output) + len(result) + len(report or b"") + len(entry["error"] or "")
+            self._store([(key, output, result, report, entry["error"], stored_size)])
+
+    def clear(self):
+        """保存済みの結果をすべて削除"""
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+            self._delete_all()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+検証対象の抽出（サンプリング）
+
+変換器を調整するたびにコーパス全体を検証する代わりに、ファイル（単一ファイルの検証では段落）を
+固定のシードで決定的に抽出して検証します。ファイルサイズと変換密度（変換されるParagraphSentenceの割合）で
+層に分け、各層の件数に比例して抽出するため、同じ条件なら毎回同じ対象が選ばれ、
+小さいファイルや変換のないファイルに偏ることもありません。
+抽出した対象の検証結果から、母集団全体の失敗率の信頼区間（Wilsonスコア区間）を求めます。
+"""
+
+import math
+import random
+import re
+from pathlib import Path
+
+DEFAULT_SEED = 0
+# サイズで分ける層の数（件数の分位で分割）
+SIZE_STRATA = 4
+
+_PARAGRAPH_PATTERN = re.compile(rb'<ParagraphSentence\b[^>]*>(.*?)</ParagraphSentence>', re.DOTALL)
+_SENTENCE_PATTERN = re.compile(rb'<Sentence[\s>]')
+
+def conversion_density(xml_file):
+    """変換されるParagraphSentenceの割合を、XMLをパースせずにバイト列の走査で概算する
+
+    変換前のファイルではSentence要素が10個以上ある段落を、変換後のファイルではListSentenceを含む段落を
+    変換される段落として数えます。
+    """
+    data = Path(xml_file).read_bytes()
+    paragraphs = 0
+    converted = 0
+    for match in _PARAGRAPH_PATTERN.finditer(data):
+        body = match.group(1)
+        paragraphs += 1
+        if b'<ListSentence' in body or len(_SENTENCE_PATTERN.findall(body)) >= 10:
+            converted += 1
+    return converted / paragraphs if paragraphs else 0.0
+
+def wilson_interval(failures, sampled, confidence=0.95, rate=None):
+    """失敗率のWilsonスコア区間 (下限, 上限)
+
+    rate を指定した場合は failures / sampled の代わりにその推定値（層別の重み付き推定など）を使います。
+    """
+    from statistics import NormalDist
+
+    if sampled == 0:
+        return 0.0, 1.0
+    p = failures / sampled if rate is None else rate
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    denominator = 1 + z * z / sampled
+    center = (p + z * z / (2 * sampled)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / sampled + z * z / (4 * sampled * sampled)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+class Sample:
+    """抽出結果（抽出した対象の位置と、各対象が属する層）"""
+
+    def __init__(self, population, indices, strata, stratum_sizes, seed):
+        self.population = population
+        self.indices = indices              # 抽出した対象の位置（元の順序）
+        self.strata = strata                # 位置 → 層
+        self.stratum_sizes = stratum_sizes  # 層 → 母集団の件数
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.indices)
+
+    def failure_bound(self, failed_indices, confidence=0.95):
+        """検証に失敗した対象の位置から、母集団の失敗率の推定値と信頼区間を求める
+
+        失敗率は層ごとの失敗率を母集団の件数で重み付けして推定します（抽出率が層によって
+        異なる場合の偏りを除くため）。抽出件数が層の数より少なく、抽出されなかった層がある場合は
+        重み付けできないため、抽出した対象の失敗率（failures / sampled）を使います。
+        全件を抽出した場合は区間の幅は0です。
+
+        Returns:
+            {"population", "sampled", "failures", "rate", "low", "high", "confidence", "seed"}
+        """
+        failed = set(failed_indices) & set(self.indices)
+        sampled_per_stratum = {}
+        failed_per_stratum = {}
+        for index in self.indices:
+            stratum = self.strata[index]
+            sampled_per_stratum[stratum] = sampled_per_stratum.get(stratum, 0) + 1
+            if index in failed:
+                failed_per_stratum[stratum] = failed_per_stratum.get(stratum, 0) + 1
+        rate = 0.0
+        if len(sampled_per_stratum) < len(self.stratum_sizes):
+            rate = len(failed) / len(self.indices) if self.indices else 0.0
+        elif self.population:
+            rate = sum(self.stratum_sizes[stratum] / self.population * failed_per_stratum.get(stratum, 0) / count
+                       for stratum, count in sampled_per_stratum.items())
+        if len(self.indices) == self.population:
+            low = high = rate
+        else:
+            low, high = wilson_interval(len(failed), len(self.indices), confidence, rate)
+        return {
+            "population": self.population,
+            "sampled": len(self.indices),
+            "failures": len(failed),
+            "rate": rate,
+            "low": low,
+            "high": high,
+            "confidence": confidence,
+            "seed": self.seed,
+        }
+
+class SamplingPlan:
+    """抽出の条件（抽出率または件数と、シード）"""
+
+    def __init__(self, rate=None, count=None, seed=DEFAULT_SEED):
+        if rate is None and count is None:
+            raise ValueError("抽出率または抽出件数を指定してください")
+        if rate is not None and not 0 < rate <= 1:
+            raise ValueError(f"抽出率は0より大きく1以下で指定してください: {rate}")
+        if count is not None and count < 1:
+            raise ValueError(f"抽出件数は1以上で指定してください: {count}")
+        self.rate = rate
+        self.count = count
+        self.seed = seed
+
+    def target(self, population):
+        """母集団の件数に対する抽出件数"""
+        if population == 0:
+            return 0
+        count = self.count if self.count is not None else math.ceil(population * self.rate)
+        return max(1, min(population, count))
+
+    def select(self, keys, sizes, densities):
+        """サイズと変換密度で層に分けて、各層から件数に比例して抽出する
+
+        Args:
+            keys: 対象の識別子（ファイルの相対パスなど。同じ層の中で並べる順序に使い、入力の順序には依存しない）
+            sizes: 対象のサイズ（バイト数・文字数など）
+            densities: 対象の変換密度（0は変換なし）
+
+        Returns:
+            Sample
+        """
+        population = len(keys)
+        strata = {}
+        for rank, index in enumerate(sorted(range(population), key=lambda i: (sizes[i], keys[i]))):
+            strata[index] = [rank * SIZE_STRATA // population, 0]
+        nonzero = sorted(density for density in densities if density > 0)
+        median = nonzero[len(nonzero) // 2] if nonzero else 0
+        for index, density in enumerate(densities):
+            strata[index][1] = 0 if density <= 0 else (1 if density < median else 2)
+        strata = {index: tuple(stratum) for index, stratum in strata.items()}
+
+        members = {}
+        for index in range(population):
+            members.setdefault(strata[index], []).append(index)
+        allocation = _allocate({stratum: len(indices) for stratum, indices in members.items()},
+                               self.target(population))
+
+        chosen = []
+        for stratum, indices in sorted(members.items()):
+            indices = sorted(indices, key=lambda i: keys[i])
+            rng = random.Random(f"{self.seed}:{stratum[0]}:{stratum[1]}")
+            chosen.extend(rng.sample(indices, allocation[stratum]))
+        return Sample(population, sorted(chosen), strata,
+                      {stratum: len(indices) for stratum, indices in members.items()}, self.seed)
+
+    def describe(self):
+        target = f"{self.count} 件" if self.count is not None else f"{self.rate:.1%}"
+        return f"{target}（シード {self.seed}）"
+
+def _allocate(stratum_sizes, total):
+    """抽出件数を層の件数に比例して割り当てる（最大剰余法。件数が足りれば各層に最低1件）"""
+    allocation = {stratum: 0 for stratum in stratum_sizes}
+    if total <= 0:
+        return allocation
+    remaining = total
+    if total >= len(stratum_sizes):
+        for stratum in allocation:
+            allocation[stratum] = 1
+        remaining -= len(stratum_sizes)
+    capacity = {stratum: size - allocation[stratum] for stratum, size in stratum_sizes.items()}
+    capacity_total = sum(capacity.values())
+    if remaining <= 0 or capacity_total == 0:
+        return allocation
+    shares = {stratum: remaining * capacity[stratum] / capacity_total for stratum in capacity}
+    for stratum, share in shares.items():
+        allocation[stratum] += int(share)
+    leftover = total - sum(allocation.values())
+    for stratum in sorted(shares, key=lambda s: (-(shares[s] - int(shares[s])), s)):
+        if leftover <= 0:
+            break
+        if allocation[stratum] < stratum_sizes[stratum]:
+            allocation[stratum] += 1
+            leftover -= 1
+    return allocation
+
+def format_failure_bound(bound, unit="ファイル"):
+    """failure_bound の結果を1行で表す"""
+    confidence = f"{bound['confidence']:.0%}"
+    return (f"抽出検証: {bound['sampled']}/{bound['population']} {unit}（シード {bound['seed']}）、"
+            f"失敗 {bound['failures']} 件 — 推定失敗率 {bound['rate']:.2%}"
+            f"（{confidence}信頼区間 {bound['low']:.2%}〜{bound['high']:.2%}、"
+            f"失敗{unit}数の上限 {math.ceil(bound['high'] * bound['population'])} 件）")
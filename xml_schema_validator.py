@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+XSDスキーマによる検証
+
+schema/ のXSD（デフォルトは kokuji20250320_asukoe.xsd）で変換後のXMLを検証します。
+元のスキーマではParagraphSentenceの子にList要素を置けないため、変換後のXMLを検証する際は
+ParagraphSentenceの子としてListを許可するようにスキーマを補ったうえでコンパイルします
+（List以下の構造は元のスキーマの定義どおりに検証されます）。
+
+xmlschema（なければ lxml）を使用し、どちらもインストールされていない場合は検証を省略して
+「スキップ」として報告します。同梱のXSDは一意粒子属性（UPA）の制約を満たさないため、
+lxml（libxml2）ではコンパイルできず、その場合も理由を付けて「スキップ」になります。
+コンパイルしたスキーマはプロセスごとにキャッシュし、同じプロセスで検証する複数のファイル
+（ワーカーが順に処理するファイル）で再利用します。
+
+使用方法:
+    python3 xml_schema_validator.py output.xml [output2.xml ...] [--schema schema/kokuji20250320.xsd]
+"""
+
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+SCHEMA_DIR = Path(__file__).resolve().parent / "schema"
+DEFAULT_SCHEMA = SCHEMA_DIR / "kokuji20250320_asukoe.xsd"
+
+# コンパイル済みスキーマ（(スキーマのパス, 更新日時ns, Listを許可するか) → (バックエンド名, スキーマ, エラー)）
+_compiled_schemas = {}
+
+_PARAGRAPH_SENTENCE_DEFINITION = re.compile(
+    r'(<xs:element name="ParagraphSentence">\s*<xs:complexType>\s*<xs:choice>)(.*?)(</xs:choice>)', re.DOTALL)
+
+def schema_backend():
+    """利用できる検証ライブラリの名前（'xmlschema' / 'lxml'、どちらもなければ None）"""
+    try:
+        import xmlschema  # noqa: F401
+        return 'xmlschema'
+    except ImportError:
+        pass
+    try:
+        import lxml.etree  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return None
+
+def allow_converted_lists(schema_text):
+    """ParagraphSentenceの子としてList要素も許可するようにXSDのテキストを書き換える"""
+    return _PARAGRAPH_SENTENCE_DEFINITION.sub(
+        r'\1\2  <xs:element maxOccurs="unbounded" ref="List"/>\n      \3', schema_text, count=1)
+
+def load_schema(schema_path=None, allow_converted=True):
+    """XSDをコンパイルして返す（同じプロセスでは2回目以降キャッシュを使用）
+
+    Args:
+        schema_path: XSDのパス（省略時は DEFAULT_SCHEMA）
+        allow_converted: Trueの場合、ParagraphSentenceの子としてListを許可する（変換後のXMLの検証用）
+
+    Returns:
+        (バックエンド名, コンパイル済みスキーマ, コンパイルエラーのメッセージ)。
+        検証ライブラリがない場合やコンパイルできない場合、スキーマは None
+    """
+    backend = schema_backend()
+    if backend is None:
+        return None, None, None
+    schema_path = Path(schema_path or DEFAULT_SCHEMA).resolve()
+    key = (str(schema_path), schema_path.stat().st_mtime_ns, allow_converted)
+    if key not in _compiled_schemas:
+        schema_text = schema_path.read_text(encoding='utf-8')
+        if allow_converted:
+            schema_text = allow_converted_lists(schema_text)
+        schema = error = None
+        try:
+            if backend == 'xmlschema':
+                import xmlschema
+                # 同梱のXSDはUPA制約に違反しているため、スキーマ自体の誤りは許容してコンパイルする
+                schema = xmlschema.XMLSchema(schema_text, validation='lax')
+            else:
+                from lxml import etree
+                schema = etree.XMLSchema(etree.fromstring(schema_text.encode('utf-8')))
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e).splitlines()[0]}"
+        _compiled_schemas[key] = (backend, schema, error)
+    return _compiled_schemas[key]
+
+def validate_schema(source, schema_path=None, max_errors=100, allow_converted=True):
+    """XMLをスキーマで検証する
+
+    Args:
+        source: XMLファイルのパス、XMLのバイト列、またはパース済みの要素（xml.etree.ElementTree）
+        schema_path: XSDのパス（省略時は DEFAULT_SCHEMA）
+        max_errors: 記録するエラーの最大数
+        allow_converted: Trueの場合、ParagraphSentenceの子としてListを許可する（変換前のXMLは False）
+
+    Returns:
+        {"status": "passed" / "failed" / "skipped", "schema": スキーマのファイル名, "backend": ライブラリ名,
+         "errors": [{"line": 行番号, "message": メッセージ}], "error_count": エラー総数}
+    """
+    schema_name = Path(schema_path or DEFAULT_SCHEMA).name
+    backend, schema, error = load_schema(schema_path, allow_converted)
+    result = {"status": "skipped", "schema": schema_name, "backend": backend, "errors": [], "error_count": 0}
+    if backend is None:
+        result["reason"] = "xmlschema または lxml がインストールされていないため、スキーマ検証を省略しました"
+        return result
+    if schema is None:
+        result["reason"] = f"{backend} でスキーマをコンパイルできないため、スキーマ検証を省略しました（{error}）"
+        return result
+
+    errors = []
+    if backend == 'lxml':
+        from lxml import etree
+        try:
+            if isinstance(source, ET.Element):
+                document = etree.fromstring(ET.tostring(source, encoding='utf-8'))
+            elif isinstance(source, bytes):
+                document = etree.fromstring(source)
+            else:
+                document = etree.parse(str(source))
+        except etree.XMLSyntaxError as e:
+            errors.append({"line": e.lineno, "message": f"XML構文エラー: {e.msg}"})
+        else:
+            if not schema.validate(document):
+                errors = [{"line": error.line, "message": error.message} for error in schema.error_log]
+    else:
+        if isinstance(source, bytes):
+            source = ET.fromstring(source)
+        elif not isinstance(source, ET.Element):
+            source = str(source)
+        try:
+            for error in schema.iter_errors(source):
+                errors.append({"line": getattr(error, 'sourceline', None),
+                               "message": f"{error.path}: {error.reason}" if error.path else error.reason or str(error)})
+        except ET.ParseError as e:
+            errors.append({"line": e.position[0], "message": f"XML構文エラー: {e}"})
+
+    result["status"] = "failed" if errors else "passed"
+    result["error_count"] = len(errors)
+    result["errors"] = errors[:max_errors]
+    return result
+
+def format_schema_status(result):
+    """スキーマ検証結果の1行の要約"""
+    if result["status"] == "skipped":
+        return f"スキーマ検証スキップ（{result['reason']}）"
+    if result["status"] == "passed":
+        return f"スキーマ検証成功（{result['schema']}）"
+    return f"スキーマ違反 {result['error_count']} 件（{result['schema']}）"
+
+def write_schema_report(print_func, result, max_diff=10):
+    """スキーマ検証結果をMarkdown形式で出力"""
+    print_func(f"## 📐 スキーマ検証（{result['schema']}）")
+    print_func("")
+    if result["status"] == "skipped":
+        print_func(f"⏭️ {result['reason']}。")
+        print_func("")
+        return
+    if result["status"] == "passed":
+        print_func("✅ スキーマに適合しています。")
+        print_func("")
+        return
+    print_func(f"❌ スキーマ違反 ({result['error_count']} 件)")
+    print_func("")
+    for error in result["errors"][:max_diff]:
+        location = f"行 {error['line']}: " if error['line'] is not None else ""
+        print_func(f"- {location}`{error['message']}`")
+    if result["error_count"] > max_diff:
+        print_func(f"**... 他 {result['error_count'] - max_diff} 件**")
+    print_func("")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='XMLファイルをXSDスキーマで検証します')
+    parser.add_argument('files', nargs='+', help='検証するXMLファイル')
+    parser.add_argument('--schema', help=f'XSDファイル（デフォルト: schema/{DEFAULT_SCHEMA.name}）')
+    parser.add_argument('--max-errors', type=int, default=10, help='ファイルごとに表示するエラーの最大数')
+    parser.add_argument('--original', action='store_true',
+                        help='ParagraphSentenceの子としてListを許可しない元のスキーマで検証（変換前のXML用）')
+    options = parser.parse_args()
+
+    failed = 0
+    for xml_file in options.files:
+        result = validate_schema(xml_file, options.schema, allow_converted=not options.original)
+        mark = {"passed": "✅", "failed": "❌", "skipped": "⏭️"}[result["status"]]
+        print(f"{mark} {xml_file}: {format_schema_status(result)}")
+        for error in result["errors"][:options.max_errors]:
+            location = f"行 {error['line']}: " if error['line'] is not None else ""
+            print(f"    {location}{error['message']}")
+        if result["status"] == "failed":
+            failed += 1
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+コーパス全体の文索引（SQLite）
+
+変換時に各ParagraphSentence内のSentenceについて、ファイル・要素パス・本文・分割位置・
+Columnのテキスト・変換条件（Sentence要素10個以上）を満たしたかを記録します。
+「どのファイルのどの文が分割されたか」を全ファイルの再解析なしに検索できます。
+
+使用方法:
+    python3 xml_sentence_index.py build input_folder index.sqlite [--recursive]
+    python3 xml_sentence_index.py search index.sqlite "検索文字列"
+    python3 xml_sentence_index.py files index.sqlite --fired
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from xml_converter import get_full_text
+
+class SentenceRecorder:
+    """1ファイル分の文を収集し、commit で索引の該当ファイルの行をまとめて置き換える
+
+    transform_tree / convert_xml の on_paragraph にそのまま渡せます。
+    """
+
+    def __init__(self, index, file_key):
+        self.index = index
+        self.file_key = file_key
+        self.rows = []
+        self.paragraph_count = 0
+        self.converted_count = 0
+
+    def __call__(self, path, paragraph_sentence, original_children, converted):
+        self.paragraph_count += 1
+        if converted:
+            self.converted_count += 1
+            converted_items = list(paragraph_sentence)
+        sentence_position = 0
+        for position, child in enumerate(original_children):
+            if child.tag != 'Sentence':
+                continue
+            sentence_position += 1
+            text = get_full_text(child)
+            split_position = column1 = column2 = None
+            if converted:
+                columns = converted_items[position].findall('ListSentence/Column')
+                if len(columns) == 2:
+                    column1 = get_full_text(columns[0].find('Sentence'))
+                    column2 = get_full_text(columns[1].find('Sentence'))
+                    split_position = len(column1)
+            self.rows.append((self.file_key, path, sentence_position, child.get('Num'), text,
+                              split_position, column1, column2, 1 if converted else 0))
+
+    def commit(self, source_file):
+        """収集した文を、元ファイルの更新日時・サイズとともに索引へ書き込む"""
+        stat = os.stat(source_file)
+        self.index.replace_file(self.file_key, stat.st_mtime_ns, stat.st_size,
+                                self.paragraph_count, self.converted_count, self.rows)
+        self.rows = []
+
+class SentenceIndex:
+    """SQLiteの文索引（ファイル単位で置き換え）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " file TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " paragraph_count INTEGER NOT NULL,"
+            " converted_count INTEGER NOT NULL,"
+            " indexed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentences ("
+            " file TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " sentence_index INTEGER NOT NULL,"
+            " sentence_num TEXT,"
+            " text TEXT NOT NULL,"
+            " split_position INTEGER,"
+            " column1 TEXT,"
+            " column2 TEXT,"
+            " threshold_fired INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sentences_file ON sentences (file)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sentences_fired ON sentences (threshold_fired, file)")
+        self.conn.commit()
+
+    def recorder(self, file_key):
+        """file_key（入力フォルダからの相対パス）用の SentenceRecorder を返す"""
+        return SentenceRecorder(self, file_key)
+
+    def replace_file(self, file_key, mtime_ns, size, paragraph_count, converted_count, rows):
+        """1ファイル分の行を1トランザクションで置き換える"""
+        with self.conn:
+            self.conn.execute("DELETE FROM sentences WHERE file = ?", (file_key,))
+            self.conn.executemany(
+                "INSERT INTO sentences (file, path, sentence_index, sentence_num, text,"
+                " split_position, column1, column2, threshold_fired) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (file, mtime_ns, size, paragraph_count, converted_count, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (file_key, mtime_ns, size, paragraph_count, converted_count, time.time())
+            )
+
+    def remove_file(self, file_key):
+        with self.conn:
+            self.conn.execute("DELETE FROM sentences WHERE file = ?", (file_key,))
+            self.conn.execute("DELETE FROM files WHERE file = ?", (file_key,))
+
+    def signatures(self):
+        """{ファイルキー: (更新日時ns, サイズ)} を返す"""
+        return {file_key: (mtime_ns, size)
+                for file_key, mtime_ns, size in self.conn.execute("SELECT file, mtime_ns, size FROM files")}
+
+    def search(self, text, limit=100):
+        """本文に text を含む文を (ファイル, パス, 文番号, 本文, 分割位置) のリストで返す"""
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return self.conn.execute(
+            "SELECT file, path, sentence_num, text, split_position FROM sentences"
+            " WHERE text LIKE ? ESCAPE '\\' ORDER BY file, rowid LIMIT ?",
+            (f"%{escaped}%", limit)
+        ).fetchall()
+
+    def fired_files(self):
+        """変換条件を満たしたParagraphSentenceを含むファイルの一覧"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT file FROM files WHERE converted_count > 0 ORDER BY file")]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def build_index(input_dir, index_path, recursive=False):
+    """入力フォルダの文索引を作成・更新する
+
+    前回から更新日時・サイズが変わったファイルだけを解析し、削除されたファイルの行は取り除きます。
+
+    Returns:
+        (解析したファイル数, 変更なしで省略したファイル数, 削除したファイル数, エラー情報のリスト)
+    """
+    from xml_converter import parse_xml, transform_tree, scan_xml_signatures, _build_error_info
+
+    input_path = Path(input_dir)
+    current = {str(file.relative_to(input_path)): signature
+               for file, signature in scan_xml_signatures(input_path, recursive).items()}
+    indexed_count = skipped_count = 0
+    errors = []
+    with SentenceIndex(index_path) as index:
+        previous = index.signatures()
+        for file_key in sorted(set(previous) - set(current)):
+            index.remove_file(file_key)
+        for file_key in sorted(current):
+            if previous.get(file_key) == current[file_key]:
+                skipped_count += 1
+                continue
+            recorder = index.recorder(file_key)
+            try:
+                transform_tree(parse_xml(input_path / file_key), recorder)
+            except Exception as e:
+                errors.append({"file": file_key, **_build_error_info(e)})
+                continue
+            recorder.commit(input_path / file_key)
+            indexed_count += 1
+    return indexed_count, skipped_count, len(set(previous) - set(current)), errors
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='変換結果の文索引（SQLite）を作成・検索します',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  python3 xml_sentence_index.py build input_folder index.sqlite --recursive
+  python3 xml_sentence_index.py search index.sqlite "第一条"
+  python3 xml_sentence_index.py files index.sqlite --fired > fired.txt
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='入力フォルダの索引を作成・更新（変更のあったファイルのみ解析）')
+    build_parser.add_argument('input_dir', help='入力フォルダ')
+    build_parser.add_argument('index', help='索引ファイル（SQLite）')
+    build_parser.add_argument('--recursive', '-r', action='store_true', help='サブフォルダも再帰的に検索')
+
+    search_parser = subparsers.add_parser('search', help='本文を部分一致で検索')
+    search_parser.add_argument('index', help='索引ファイル（SQLite）')
+    search_parser.add_argument('text', help='検索文字列')
+    search_parser.add_argument('--limit', type=int, default=100, help='表示する最大件数（デフォルト: 100）')
+
+    files_parser = subparsers.add_parser('files', help='索引済みファイルの一覧')
+    files_parser.add_argument('index', help='索引ファイル（SQLite）')
+    files_parser.add_argument('--fired', action='store_true',
+                              help='変換条件（Sentence要素10個以上）を満たした段落を含むファイルのみ')
+
+    options = parser.parse_args()
+
+    if options.command == 'build':
+        if not Path(options.input_dir).is_dir():
+            print(f"エラー: 入力フォルダが見つかりません: {options.input_dir}")
+            return 1
+        indexed_count, skipped_count, removed_count, errors = build_index(
+            options.input_dir, options.index, options.recursive)
+        print(f"索引を更新しました: 解析 {indexed_count} 件, 変更なし {skipped_count} 件, 削除 {removed_count} 件")
+        for error in errors:
+            print(f"  ✗ エラー: {error['file']} - {error['error_type']}: {error['error_message']}")
+        return 1 if errors else 0
+
+    with SentenceIndex(options.index) as index:
+        if options.command == 'search':
+            for file_key, path, sentence_num, text, split_position in index.search(options.text, options.limit):
+                split = f"分割位置 {split_position}" if split_position is not None else "分割なし"
+                print(f"{file_key}\t{path}/Sentence[@Num='{sentence_num}']\t{split}\t{text}")
+        elif options.fired:
+            for file_key in index.fired_files():
+                print(file_key)
+        else:
+            for file_key, in index.conn.execute("SELECT file FROM files ORDER BY file"):
+                print(file_key)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SQLiteファイルに保存するサイズ上限付きキャッシュの共通部分
+
+断片キャッシュ（xml_fragment_cache.py）・抽出値キャッシュ（xml_value_cache.py）・
+変換結果キャッシュ（xml_result_cache.py）が使う、テーブルの作成・合計サイズの管理・
+最後に使われたのが古いものからの削除をまとめています。
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+class SQLiteLRUCache:
+    """キー → 行 のテーブルを持ち、合計サイズが上限を超えると最後に使われたのが古い行から削除するキャッシュ
+
+    サブクラスは TABLE（テーブル名）と COLUMNS（key・size・last_used 以外の列の定義）を定義します。
+    行は key・COLUMNS の列・size（合計サイズに数えるバイト数）・last_used（最後に使われた時刻）からなります。
+    """
+
+    TABLE = None
+    COLUMNS = ()
+
+    def __init__(self, path, max_bytes, check_same_thread=True):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=check_same_thread)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ''.join(f" {column}," for column in self.COLUMNS)
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            f" key TEXT PRIMARY KEY,{columns}"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_last_used ON {self.TABLE} (last_used)")
+        self.conn.commit()
+        self.total_bytes = self._stored_bytes()
+
+    def _stored_bytes(self):
+        return self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.TABLE}").fetchone()[0]
+
+    def _store(self, rows):
+        """(キー, COLUMNS の値..., サイズ) の行を保存し、上限を超えた場合は古いものから削除
+
+        同じキーの行を置き換える場合は、置き換えられる行のサイズを合計から除きます。
+        """
+        if not rows:
+            return
+        names = [column.split()[0] for column in self.COLUMNS]
+        keys = list(dict.fromkeys(row[0] for row in rows))
+        sizes = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            sizes.update(self.conn.execute(
+                f"SELECT key, size FROM {self.TABLE} WHERE key IN ({placeholders})", chunk
+            ).fetchall())
+        for row in rows:
+            self.total_bytes += row[-1] - sizes.get(row[0], 0)
+            sizes[row[0]] = row[-1]
+
+        now = time.time()
+        placeholders = ', '.join('?' * (len(names) + 3))
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {self.TABLE} (key, {', '.join(names)}, size, last_used) VALUES ({placeholders})",
+            [(*row, now) for row in rows]
+        )
+        self.conn.commit()
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def _touch(self, keys):
+        """使われた行の最終使用時刻を更新する"""
+        now = time.time()
+        self.conn.executemany(f"UPDATE {self.TABLE} SET last_used = ? WHERE key = ?", [(now, key) for key in keys])
+        self.conn.commit()
+
+    def evict(self, target_ratio=0.9):
+        """合計サイズが上限の target_ratio 以下になるまで、最後に使われたのが古い行を削除"""
+        self.total_bytes = self._stored_bytes()
+        target = int(self.max_bytes * target_ratio)
+        while self.total_bytes > target:
+            rows = self.conn.execute(f"SELECT key, size FROM {self.TABLE} ORDER BY last_used LIMIT 1000").fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if self.total_bytes <= target:
+                    break
+                victims.append((key,))
+                self.total_bytes -= size
+            self.conn.executemany(f"DELETE FROM {self.TABLE} WHERE key = ?", victims)
+            self.conn.commit()
+
+    def _delete_all(self):
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {self.TABLE}")
+        self.total_bytes = 0
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+検証用の抽出値キャッシュ
+
+同じ入力コーパスを変換器の更新ごとに繰り返し検証する場合に、ファイル内容のハッシュをキーとして
+抽出済みの値リストと、その順序を反映したダイジェストをSQLiteファイルに保存します。
+両ファイルのダイジェストが一致すれば詳細な差分計算は不要です。
+値の抽出ロジック（xml_content_validator_v2.py）が変わるとキャッシュ全体を破棄し、
+合計サイズが上限を超えると、最後に使われたのが古いものから削除します。
+"""
+
+import hashlib
+import json
+import zlib
+from pathlib import Path
+
+from xml_sqlite_cache import SQLiteLRUCache
+
+class ValueCache(SQLiteLRUCache):
+    """抽出値のキャッシュ（ファイル内容のハッシュ → (ダイジェスト, 値リスト)）"""
+
+    TABLE = "entries"
+    COLUMNS = ("digest TEXT NOT NULL", "value_count INTEGER NOT NULL", "data BLOB NOT NULL")
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        from xml_content_validator_v2 import extraction_version
+
+        super().__init__(path, max_bytes)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        with self.conn:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'extraction_version'").fetchone()
+            if row is None or row[0] != extraction_version():
+                # 抽出ロジックが変わった場合は保存済みの値をすべて破棄
+                self.conn.execute("DELETE FROM entries")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('extraction_version', ?)",
+                                  (extraction_version(),))
+        self.total_bytes = self._stored_bytes()
+
+    def get(self, file_path):
+        """ファイルの (ダイジェスト, 値リスト) を返す（キャッシュになければ抽出して保存）"""
+        from xml_content_validator_v2 import extract_values_from_bytes, values_digest
+
+        data = Path(file_path).read_bytes()
+        key = hashlib.sha256(data).hexdigest()
+        row = self.conn.execute("SELECT digest, data FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.hits += 1
+            self._touch([key])
+            return row[0], json.loads(zlib.decompress(row[1]).decode('utf-8'))
+
+        self.misses += 1
+        values = extract_values_from_bytes(data, file_path)
+        digest = values_digest(values)
+        self.put(key, digest, values)
+        return digest, values
+
+    def put(self, key, digest, values):
+        """値リストを圧縮して保存し、上限を超えた場合は古いものから削除"""
+        blob = zlib.compress(json.dumps(values, ensure_ascii=False).encode('utf-8'))
+        self._store([(key, digest, len(values), blob, len(blob))])
+
+    def clear(self):
+        """保存済みの値をすべて削除"""
+        self._delete_all()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Webアプリのセッション間で共有するワーカープール
+
+サーバープロセスごとに1つのプロセスプールを作成し、起動時にワーカーを立ち上げて
+変換・検証モジュールを読み込んでおきます（最初の変換でワーカーの起動を待たない）。
+すべてのセッションの変換はこのプールで実行し、同時に実行するタスク数を上限で抑えます。
+上限を超えたタスクはセッションごとの待ち行列に入れ、空きができるたびに最後に投入したのが
+最も前のセッションから1件ずつ投入するため、大きな一括変換を投入したセッションがあっても、
+他のセッションの変換がその後ろで待たされ続けることはありません。
+"""
+
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+def _preload_worker():
+    """ワーカーの起動時に変換・検証モジュールを読み込んでおく"""
+    import xml_converter  # noqa: F401
+    import xml_content_validator_v2  # noqa: F401
+    import xml_batch_job  # noqa: F401
+
+def _warm_up():
+    """ワーカーを起動させるための空のタスク"""
+
+class SessionExecutor:
+    """1つのセッションからプールにタスクを投入するためのエグゼキュータ（submit のみ）"""
+
+    def __init__(self, pool, session_id):
+        self.pool = pool
+        self.session_id = session_id
+
+    def submit(self, fn, *args, **kwargs):
+        return self.pool.submit(self.session_id, fn, *args, **kwargs)
+
+class SharedWorkerPool:
+    """セッション間で共有するプロセスプール（同時実行数の上限とセッションごとの公平な待ち行列付き）
+
+    Args:
+        max_workers: ワーカープロセス数（Noneの場合はCPU数）
+        max_running: 同時に実行するタスク数の上限（Noneの場合はワーカープロセス数）
+    """
+
+    def __init__(self, max_workers=None, max_running=None):
+        import os
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_running = max_running or self.max_workers
+        # 完了済みのタスクの完了処理は投入中（ロック内）に呼ばれることがあるため、再入可能なロックを使う
+        self.lock = threading.RLock()
+        # セッション → 投入待ちの (Future, 関数, 引数, キーワード引数)
+        self.queues = {}
+        # セッション → 最後に投入した順番・実行中のタスク数
+        self.served = {}
+        self.session_running = {}
+        self.ticks = itertools.count()
+        self.running = 0
+        self.executor = self._create_executor()
+
+    def _create_executor(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Streamlitのサーバーはマルチスレッドのため、fork ではなく spawn でワーカーを起動する
+        executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                       mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_preload_worker)
+        for _ in range(self.max_workers):
+            executor.submit(_warm_up)
+        return executor
+
+    def session(self, session_id):
+        """セッション用のエグゼキュータ（BatchJob などの executor に渡す）"""
+        return SessionExecutor(self, session_id)
+
+    def submit(self, session_id, fn, *args, **kwargs):
+        """タスクをセッションの待ち行列に入れ、空きがあれば投入する
+
+        返す Future は、待ち行列にある間は cancel で取り消せます。
+        """
+        future = Future()
+        with self.lock:
+            self.queues.setdefault(session_id, deque()).append((future, fn, args, kwargs))
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        """空きがある間、待ち行列の先頭のタスクを投入する（ロック内で呼ぶ）
+
+        最後に投入したのが最も前のセッション（まだ投入していないセッションを優先）から1件ずつ投入します。
+        """
+        from concurrent.futures.process import BrokenProcessPool
+
+        while self.running < self.max_running and self.queues:
+            session_id = min(self.queues, key=lambda sid: self.served.get(sid, -1))
+            queue = self.queues[session_id]
+            future, fn, args, kwargs = queue.popleft()
+            if not queue:
+                del self.queues[session_id]
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                inner = self.executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # 異常終了したワーカーがあるとプール全体が使えなくなるため、作り直して投入し直す
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._create_executor()
+                inner = self.executor.submit(fn, *args, **kwargs)
+            self.served[session_id] = next(self.ticks)
+            self.running += 1
+            self.session_running[session_id] = self.session_running.get(session_id, 0) + 1
+            inner.add_done_callback(lambda inner, future=future, session_id=session_id:
+                                    self._finished(inner, future, session_id))
+
+        # 実行中・待ちのタスクがなくなったセッションの記録は残さない
+        for session_id in [sid for sid, count in self.session_running.items() if not count]:
+            if session_id not in self.queues:
+                del self.session_running[session_id]
+                del self.served[session_id]
+
+    def _finished(self, inner, future, session_id):
+        try:
+            future.set_result(inner.result())
+        except BaseException as e:
+            future.set_exception(e)
+        with self.lock:
+            self.running -= 1
+            self.session_running[session_id] -= 1
+            self._dispatch()
+
+    def stats(self, session_id=None):
+        """実行中・待ち行列のタスク数
+
+        Returns:
+            {"running": 実行中, "max_running": 同時実行数の上限, "queued": 待ち行列の合計,
+             "sessions": 待ちのあるセッション数, "session_queued": session_id の待ち件数}
+        """
+        with self.lock:
+            queued = {sid: sum(1 for item in queue if not item[0].cancelled())
+                      for sid, queue in self.queues.items()}
+        return {
+            "running": self.running,
+            "max_running": self.max_running,
+            "queued": sum(queued.values()),
+            "sessions": sum(1 for count in queued.values() if count),
+            "session_queued": queued.get(session_id, 0),
+        }
+
+    def shutdown(self):
+        """待ち行列のタスクを取り消し、プールを終了する"""
+        with self.lock:
+            for queue in self.queues.values():
+                for future, _, _, _ in queue:
+                    future.cancel()
+            self.queues.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)